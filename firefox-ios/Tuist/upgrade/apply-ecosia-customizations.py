@@ -8,6 +8,13 @@ This script reads ecosia-customizations.json and applies each change:
 - Substitution: Comments out Firefox code and adds Ecosia replacement
 - Addition: Inserts new Ecosia code at the appropriate location
 
+Each change is located by its context within ±50 lines of the catalog line;
+if upstream moved it further, the whole file is searched and the drift is
+reported. If the file itself is gone, git rename detection between
+--old-tag and --new-tag is followed, falling back to a tree-wide index of
+line hashes. All changes to a file are located before it is rewritten, and
+changes whose line ranges overlap are reported and skipped.
+
 Usage:
     # Apply all customizations
     python3 apply-ecosia-customizations.py \\
@@ -30,15 +37,77 @@ Usage:
       --catalog firefox-ios/Tuist/upgrade/ecosia-customizations.json \\
       --target firefox-ios/ \\
       --verbose
+
+    # Rerun after fixing failures: unchanged files reuse their cached match lines
+    python3 apply-ecosia-customizations.py \\
+      --catalog firefox-ios/Tuist/upgrade/ecosia-customizations.json \\
+      --target firefox-ios/ \\
+      --dry-run --plan-cache .ecosia-apply-plans.json
+
+    # Apply files in parallel (output order is the same as a serial run)
+    python3 apply-ecosia-customizations.py \\
+      --catalog firefox-ios/Tuist/upgrade/ecosia-customizations.json \\
+      --target firefox-ios/ \\
+      --jobs 8
+
+    # Preview all changes as one patch (apply it later with `git apply`)
+    python3 apply-ecosia-customizations.py \\
+      --catalog firefox-ios/Tuist/upgrade/ecosia-customizations.json \\
+      --target firefox-ios/ \\
+      --diff ecosia.patch
+
+    # CI check: is every catalog customization still in the tree, at its line?
+    python3 apply-ecosia-customizations.py \\
+      --catalog firefox-ios/Tuist/upgrade/ecosia-customizations.json \\
+      --target firefox-ios/ \\
+      --verify --jobs 0
+
+    # Trial upgrade: apply to a tag's files and commit, without a checkout
+    python3 apply-ecosia-customizations.py \\
+      --catalog firefox-ios/Tuist/upgrade/ecosia-customizations.json \\
+      --target firefox-ios/ \\
+      --tree firefox-v147.0 --branch trial/firefox-v147.0
+
+    # Follow files renamed or split upstream between two Firefox tags
+    python3 apply-ecosia-customizations.py \\
+      --catalog firefox-ios/Tuist/upgrade/ecosia-customizations.json \\
+      --target firefox-ios/ \\
+      --old-tag firefox-v141.0 --new-tag firefox-v147.0
 """
 
+import io
+import os
 import re
 import json
+import hashlib
+import shutil
 import argparse
+import tempfile
+import sys
+from bisect import bisect_left
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from difflib import unified_diff
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Iterator, Optional, Tuple
 from dataclasses import dataclass
-from difflib import SequenceMatcher
+
+from ecosia_catalog import block_fingerprint, line_fingerprint, normalize_line, open_catalog
+from ecosia_git import (
+    GitCatFile, commit_tree, detect_renames, hash_files, repo_root, resolve_commit, run_git, tree_entries,
+    write_blobs
+)
+from ecosia_matching import default_matcher
+
+DEFAULT_EXCLUDES = ['Ecosia', 'EcosiaTests', 'Derived', 'build', '.build']
+
+# Bump when matching or plan semantics change, to invalidate cached plans
+PLAN_CACHE_VERSION = 4
+
+# Additions have no Firefox code to confirm a relocated match, so they only
+# move this far, and only on a context line more telling than `}` or a blank
+MAX_ADDITION_DRIFT = 1000
 
 
 @dataclass
@@ -52,6 +121,8 @@ class Customization:
     ecosia_code: List[str]
     context_before: List[str]
     context_after: List[str]
+    fingerprints: Optional[Dict] = None  # v2 line fingerprints (see ecosia_catalog)
+    moved_from: Optional[str] = None  # catalog path, if the file was renamed or split upstream
 
 
 @dataclass
@@ -62,13 +133,25 @@ class ApplyResult:
     line: int
     type: str
     message: str
+    drift: int = 0  # lines between the catalog position and where it was applied, if relocated
+    moved_from: Optional[str] = None  # catalog path, if applied to a renamed or split file
+    overlaps: Optional[int] = None  # line of the customization whose range this one overlaps
+
 
+@dataclass
+class PlanStep:
+    """Where a customization will be applied, in the file's original line numbers"""
+    order: int  # position in application_order()
+    customization: Customization
+    start: int  # 0-indexed first line the customization rewrites (or inserts before)
+    end: int    # exclusive; equal to start for additions
+    drift: int = 0
 
-def load_catalog(catalog_path: str) -> Dict:
-    """Load the Ecosia customizations catalog."""
+
+def load_catalog(catalog_path: str):
+    """Open the Ecosia customizations catalog (JSON v1/v2 or SQLite)."""
     try:
-        with open(catalog_path, 'r') as f:
-            return json.load(f)
+        return open_catalog(catalog_path)
     except FileNotFoundError:
         print(f"❌ Error: Catalog not found: {catalog_path}")
         exit(1)
@@ -77,36 +160,122 @@ def load_catalog(catalog_path: str) -> Dict:
         exit(1)
 
 
-def normalize_line(line: str) -> str:
-    """Normalize a line for comparison (strip whitespace, handle common variations)."""
-    return line.strip()
+class LineIndex:
+    """
+    Per-file index of normalized-line fingerprints.
+    
+    Maps each fingerprint to the (sorted) line numbers where it occurs, so an
+    exact context match is a dictionary lookup instead of a window scan.
+    Line numbers are also bucketed by normalized length, which is all the
+    fuzzy fallback needs to rule most positions out.
+    """
+    
+    def __init__(self, lines: List[str]):
+        # line -> (normalized, fingerprint), so repeated lines are hashed once
+        line_cache: Dict[str, Tuple[str, str]] = {}
+        self.normalized: List[str] = []
+        self.fingerprints: List[str] = []
+        self.positions: Dict[str, List[int]] = {}
+        self.by_length: Dict[int, List[int]] = {}
+        for number, line in enumerate(lines):
+            entry = line_cache.get(line)
+            if entry is None:
+                entry = line_cache[line] = (normalize_line(line), line_fingerprint(line))
+            self.normalized.append(entry[0])
+            self.fingerprints.append(entry[1])
+            self.positions.setdefault(entry[1], []).append(number)
+            self.by_length.setdefault(len(entry[0]), []).append(number)
+    
+    def find_block(self, expected: List[str], start: int, end: int) -> Optional[int]:
+        """
+        First line number i in [start, end) whose preceding len(expected) lines
+        have exactly the `expected` fingerprints.
+        """
+        k = len(expected)
+        # Anchor on the rarest expected line to keep the candidate list short
+        anchor = min(range(k), key=lambda j: len(self.positions.get(expected[j], ())))
+        positions = self.positions.get(expected[anchor], [])
+        # Line i - k + anchor must hold the anchor fingerprint
+        low = bisect_left(positions, start - k + anchor)
+        high = bisect_left(positions, end - k + anchor)
+        for position in positions[low:high]:
+            i = position + k - anchor
+            if self.fingerprints[i - k:i] == expected:
+                return i
+        return None
+    
+    def near_blocks(self, expected_lines: List[str], start: int, end: int, min_hits: int) -> List[int]:
+        """
+        Line numbers i in [start, end), ascending, where at least `min_hits`
+        of the preceding len(expected_lines) lines have a length that could
+        match the expected line at their offset (see LineMatcher.length_range).
+        """
+        k = len(expected_lines)
+        hits: Dict[int, int] = {}
+        for j, expected in enumerate(expected_lines):
+            shortest, longest = default_matcher.length_range(len(expected))
+            for length in range(shortest, longest + 1):
+                positions = self.by_length.get(length)
+                if not positions:
+                    continue
+                # Line i - k + j is compared with expected line j
+                low = bisect_left(positions, start - k + j)
+                high = bisect_left(positions, end - k + j)
+                for position in positions[low:high]:
+                    i = position + k - j
+                    hits[i] = hits.get(i, 0) + 1
+        return sorted(i for i, count in hits.items() if count >= min_hits)
 
 
 def find_context_match(lines: List[str], context_before: List[str], context_after: List[str], 
-                       original_line: int, tolerance: int = 50) -> Optional[int]:
+                       original_line: int, tolerance: int = 50,
+                       context_before_hashes: Optional[List[str]] = None,
+                       index: Optional[LineIndex] = None) -> Optional[int]:
     """
     Find the best match for context in the file.
     Returns the line number where the change should be applied, or None if not found.
-    Uses fuzzy matching to handle minor variations.
+    An exact match of the context line fingerprints is looked up in the file's
+    LineIndex; otherwise fuzzy matching is used to handle minor variations,
+    on the few positions where enough lines have a matching length.
     
     Note: Primarily uses context_before for matching since context_after may contain
     Ecosia customizations rather than original Firefox code.
     """
+    if index is None:
+        index = LineIndex(lines)
+    
     # Search within +/- tolerance lines of the original position
     search_start = max(0, original_line - tolerance)
     search_end = min(len(lines), original_line + tolerance)
     
+    if not context_before:
+        # Nothing to match against: any position is a perfect match
+        return search_start if search_start < search_end else None
+    
+    # Fast path: exact match on normalized line fingerprints
+    k = len(context_before)
+    expected = context_before_hashes or [line_fingerprint(line) for line in context_before]
+    match = index.find_block(expected, max(search_start, k), search_end)
+    if match is not None:
+        return match
+    
+    expected_lines = [normalize_line(line) for line in context_before]
     best_match_score = 0.0
     best_match_line = None
     
-    for i in range(search_start, search_end):
-        # Check if context_before matches
-        before_start = i - len(context_before)
-        if before_start < 0:
+    # Offsets with fewer length matches than 80% of the context can't qualify
+    min_hits = next(n for n in range(k + 1) if n / k >= 0.8)
+    for i in index.near_blocks(expected_lines, max(search_start, k), search_end, min_hits):
+        before_lines = index.normalized[i - k:i]
+        
+        # Only lines within the length bound can count; skip offsets that
+        # can't reach 80% or beat the best score even if all of them match
+        candidates = [j for j in range(k) if default_matcher.could_match(before_lines[j], expected_lines[j])]
+        bound = len(candidates) / k
+        if bound < 0.8 or bound <= best_match_score:
             continue
-            
-        before_lines = lines[before_start:i]
-        before_score = compare_context(before_lines, context_before)
+        
+        before_score = sum(1 for j in candidates if default_matcher.similar(before_lines[j], expected_lines[j])) / k
         
         # Use before_score as primary match criteria
         # (context_after may contain Ecosia code, not Firefox code)
@@ -121,26 +290,67 @@ def find_context_match(lines: List[str], context_before: List[str], context_afte
     return None
 
 
-def compare_context(actual: List[str], expected: List[str]) -> float:
-    """Compare two contexts and return similarity score (0.0 to 1.0)."""
-    if not expected:
-        return 1.0
+def distinctive(line: str) -> bool:
+    """Whether a context line says anything about its position (not blank or just `}`, `})`...)."""
+    return any(char.isalnum() for char in line)
+
+
+def relocate_context_match(lines: List[str], context_before: List[str], original_line: int,
+                           context_before_hashes: Optional[List[str]] = None,
+                           index: Optional[LineIndex] = None,
+                           distinctive_only: bool = False,
+                           max_drift: Optional[int] = None,
+                           fits: Optional[Callable[[int], bool]] = None) -> Optional[int]:
+    """
+    Search the whole file for a context that drifted beyond the tolerance window.
     
-    if len(actual) != len(expected):
-        return 0.0
+    Every line whose fingerprint equals one of the context lines votes for the
+    position it implies, via the file's inverted LineIndex. Only those
+    candidates are scored, with the same 80%/90% rules as find_context_match.
+    The best score wins; ties go to the candidate closest to the original line.
+    Returns None if no candidate reaches 80%.
     
-    matches = 0
-    for a, e in zip(actual, expected):
-        # Normalize both lines
-        a_norm = normalize_line(a)
-        e_norm = normalize_line(e)
+    With `distinctive_only`, only distinctive context lines vote, so every
+    candidate has one of them in place; `max_drift` bounds the distance from
+    the original line. Candidates where `fits` holds (e.g. the Firefox code
+    is there too) rank above all others.
+    """
+    if not context_before:
+        return None
+    if index is None:
+        index = LineIndex(lines)
+    
+    k = len(context_before)
+    expected = context_before_hashes or [line_fingerprint(line) for line in context_before]
+    expected_lines = [normalize_line(line) for line in context_before]
+    
+    candidates = set()
+    for j, fingerprint in enumerate(expected):
+        if distinctive_only and not distinctive(expected_lines[j]):
+            continue
+        for position in index.positions.get(fingerprint, ()):
+            i = position + k - j
+            if k <= i < len(lines) and (max_drift is None or abs(i - original_line) <= max_drift):
+                candidates.add(i)
+    
+    best_rank = None
+    best_match_line = None
+    for i in candidates:
+        before_lines = index.normalized[i - k:i]
+        possible = [j for j in range(k) if default_matcher.could_match(before_lines[j], expected_lines[j])]
+        bound = len(possible) / k
+        if bound < 0.8 or (best_rank is not None and best_rank[0] and bound < best_rank[1]):
+            continue
         
-        # Use SequenceMatcher for fuzzy comparison
-        similarity = SequenceMatcher(None, a_norm, e_norm).ratio()
-        if similarity >= 0.9:  # 90% similar
-            matches += 1
+        score = sum(1 for j in possible if default_matcher.similar(before_lines[j], expected_lines[j])) / k
+        if score < 0.8:
+            continue
+        rank = (fits is None or fits(i), score, -abs(i - original_line), -i)
+        if best_rank is None or rank > best_rank:
+            best_rank = rank
+            best_match_line = i
     
-    return matches / len(expected)
+    return best_match_line
 
 
 def apply_removal(lines: List[str], customization: Customization, match_line: int, 
@@ -292,8 +502,7 @@ def verify_lines_match(actual: List[str], expected: List[str], fuzzy: bool = Fal
         
         if fuzzy:
             # Allow 90% similarity
-            similarity = SequenceMatcher(None, a_norm, e_norm).ratio()
-            if similarity < 0.9:
+            if not default_matcher.similar(a_norm, e_norm):
                 return False
         else:
             if a_norm != e_norm:
@@ -308,77 +517,671 @@ def get_indent(line: str) -> str:
     return match.group(1) if match else ""
 
 
-def apply_customization(file_path: str, customization: Customization, 
-                        dry_run: bool = False, verbose: bool = False) -> ApplyResult:
-    """Apply a single customization to a file."""
-    try:
-        # Read file
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-        
-        # Find where to apply the change using context matching
-        match_line = find_context_match(
-            lines,
-            customization.context_before,
-            customization.context_after,
-            customization.line - 1  # Convert to 0-indexed
+def plan_customization(lines: List[str], customization: Customization,
+                       index: Optional[LineIndex] = None) -> Optional[Tuple[int, int]]:
+    """
+    Find where a customization applies: (match line, 0-indexed; drift), or None.
+    
+    Matching looks around the catalog line first and relocates using the
+    whole file if the context drifted beyond the tolerance window.
+    """
+    # Find where to apply the change using context matching
+    match_line = find_context_match(
+        lines,
+        customization.context_before,
+        customization.context_after,
+        customization.line - 1,  # Convert to 0-indexed
+        context_before_hashes=(customization.fingerprints or {}).get('context_before'),
+        index=index
+    )
+    if match_line is not None:
+        return match_line, 0
+    
+    # Drifted beyond the tolerance window: relocate using the whole file
+    is_addition = customization.type == 'addition'
+    match_line = relocate_context_match(
+        lines,
+        customization.context_before,
+        customization.line - 1,
+        context_before_hashes=(customization.fingerprints or {}).get('context_before'),
+        index=index,
+        distinctive_only=is_addition,
+        max_drift=MAX_ADDITION_DRIFT if is_addition else None,
+        fits=lambda i: span_matches(lines, customization, i)
+    )
+    if match_line is not None:
+        return match_line, match_line - (customization.line - 1)
+    return None
+
+
+def context_not_found(customization: Customization) -> ApplyResult:
+    """Result for a customization whose context is nowhere in the file."""
+    return ApplyResult(
+        success=False,
+        file=customization.file,
+        line=customization.line,
+        type=customization.type,
+        message=f"Context not found (searched around line {customization.line})",
+        moved_from=customization.moved_from
+    )
+
+
+def span_matches(lines: List[str], customization: Customization, match_line: int) -> bool:
+    """Whether apply_at() would succeed at `match_line` (without building the new lines)."""
+    if customization.type == 'addition':
+        return 0 <= match_line <= len(lines)
+    if customization.type not in ('removal', 'substitution'):
+        return False
+    end_line = match_line + len(customization.firefox_code)
+    if match_line < 0 or end_line > len(lines):
+        return False
+    return verify_lines_match(lines[match_line:end_line], customization.firefox_code,
+                              fuzzy=customization.type == 'substitution')
+
+
+def apply_at(lines: List[str], customization: Customization, match_line: int, drift: int = 0,
+             verbose: bool = False) -> Tuple[List[str], ApplyResult]:
+    """Apply a customization at a resolved line (0-indexed)."""
+    # Apply the appropriate transformation
+    if customization.type == "removal":
+        new_lines, msg = apply_removal(lines, customization, match_line, verbose)
+    elif customization.type == "substitution":
+        new_lines, msg = apply_substitution(lines, customization, match_line, verbose)
+    elif customization.type == "addition":
+        new_lines, msg = apply_addition(lines, customization, match_line, verbose)
+    else:
+        return lines, ApplyResult(
+            success=False,
+            file=customization.file,
+            line=customization.line,
+            type=customization.type,
+            message=f"Unknown customization type: {customization.type}"
         )
+    
+    if "Error:" in msg:
+        return lines, ApplyResult(
+            success=False,
+            file=customization.file,
+            line=customization.line,
+            type=customization.type,
+            message=msg
+        )
+    
+    return new_lines, ApplyResult(
+        success=True,
+        file=customization.file,
+        line=match_line + 1,  # Convert back to 1-indexed
+        type=customization.type,
+        message=msg,
+        drift=drift,
+        moved_from=customization.moved_from
+    )
+
+
+class TreeIndex:
+    """
+    Inverted index from normalized-line fingerprint to the Swift files containing it.
+    
+    Built once per run, and only if some customization's file has vanished
+    without a git rename to follow, to find where its code lives now.
+    """
+    
+    def __init__(self, root: Path, exclude_dirs: Optional[List[str]] = None):
+        exclude_dirs = DEFAULT_EXCLUDES if exclude_dirs is None else exclude_dirs
+        self.files_by_fingerprint: Dict[str, List[str]] = {}
+        for swift_file in sorted(root.rglob('*.swift')):
+            if any(excluded in swift_file.parts for excluded in exclude_dirs):
+                continue
+            try:
+                with open(swift_file, 'r') as f:
+                    fingerprints = {line_fingerprint(line) for line in f}
+            except (OSError, UnicodeDecodeError):
+                continue
+            for fingerprint in fingerprints:
+                self.files_by_fingerprint.setdefault(fingerprint, []).append(str(swift_file))
+    
+    def candidates(self, lines: List[str], limit: int = 5) -> List[str]:
+        """
+        Files sharing the most lines with `lines`, best first.
         
-        if match_line is None:
-            return ApplyResult(
-                success=False,
-                file=customization.file,
-                line=customization.line,
-                type=customization.type,
-                message=f"Context not found (searched around line {customization.line})"
-            )
+        Each shared line counts 1/(number of files containing it), so braces
+        and blank lines barely matter next to distinctive code.
+        """
+        scores: Dict[str, float] = {}
+        for fingerprint in {line_fingerprint(line) for line in lines if normalize_line(line)}:
+            files = self.files_by_fingerprint.get(fingerprint, [])
+            for file in files:
+                scores[file] = scores.get(file, 0.0) + 1.0 / len(files)
+        return sorted(scores, key=lambda file: (-scores[file], file))[:limit]
+
+
+def context_found_in(file_path: str, customization: Customization,
+                     indexed_files: Dict[str, Optional[Tuple[List[str], LineIndex]]]) -> bool:
+    """Check whether a customization's context exists anywhere in a file (files are indexed once)."""
+    if file_path not in indexed_files:
+        try:
+            with open(file_path, 'r') as f:
+                lines = f.readlines()
+            indexed_files[file_path] = (lines, LineIndex(lines))
+        except (OSError, UnicodeDecodeError):
+            indexed_files[file_path] = None
+    if indexed_files[file_path] is None:
+        return False
+    lines, index = indexed_files[file_path]
+    hashes = (customization.fingerprints or {}).get('context_before')
+    return relocate_context_match(lines, customization.context_before, customization.line - 1,
+                                  hashes, index, distinctive_only=customization.type == 'addition') is not None
+
+
+def resolve_moved_files(files_map: Dict[str, List[Customization]], renames: Dict[str, List[str]],
+                        tree_root: Optional[Path],
+                        exists: Callable[[str], bool] = os.path.exists) -> Dict[str, List[Customization]]:
+    """
+    Re-target customizations whose file no longer exists.
+    
+    A git rename is followed directly; for a split (several targets) the
+    target containing the customization's context wins. Without a rename, a
+    tree-wide TreeIndex (built on first use) ranks files by shared lines and
+    the first one containing the context is used. Customizations that can't
+    be placed stay on their original path and fail as before.
+    
+    `exists` decides whether a path is present (e.g. in a git tree rather
+    than on disk); without a `tree_root` only renames are followed.
+    """
+    resolved: Dict[str, List[Customization]] = {}
+    tree_index: Optional[TreeIndex] = None
+    indexed_files: Dict[str, Optional[Tuple[List[str], LineIndex]]] = {}
+    
+    for file_path, customizations in files_map.items():
+        if exists(file_path):
+            resolved.setdefault(file_path, []).extend(customizations)
+            continue
+        
+        targets = [t for t in renames.get(file_path, []) if exists(t)]
+        for customization in customizations:
+            if len(targets) == 1:
+                target = targets[0]
+            else:
+                candidates = targets
+                if not candidates and tree_root is not None:
+                    if tree_index is None:
+                        print(f"🗂️  Indexing {tree_root} to find moved customizations...")
+                        tree_index = TreeIndex(tree_root)
+                    candidates = tree_index.candidates(
+                        customization.context_before + customization.firefox_code + customization.context_after
+                    )
+                target = next((c for c in candidates if context_found_in(c, customization, indexed_files)), None)
+                if target is None and targets:
+                    target = targets[0]
+            
+            if target is not None:
+                customization.moved_from = file_path
+                customization.file = target
+            resolved.setdefault(customization.file, []).append(customization)
+    
+    return resolved
+
+
+def application_order(customizations: List[Customization]) -> List[Customization]:
+    """Sort by line number (descending) to apply from bottom to top."""
+    return sorted(customizations, key=lambda c: c.line, reverse=True)
+
+
+def plan_key(customization: Customization) -> str:
+    """Stable id of a customization within a catalog: its block fingerprint and catalog line."""
+    block = (customization.fingerprints or {}).get('block') or block_fingerprint(vars(customization))
+    return f"{block}:{customization.line}"
+
+
+class PlanCache:
+    """
+    Persistent cache of resolved application plans.
+    
+    Keyed by (catalog hash, target file blob SHA, customization id), each
+    entry records where a customization was applied and how. A rerun with
+    the same catalog skips context matching for every customization whose
+    file is unchanged, so only previous failures are matched again.
+    """
+    
+    def __init__(self, path: Path, catalog_hash: str):
+        self.path = path
+        self.catalog_hash = catalog_hash
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
         
-        # Apply the appropriate transformation
-        if customization.type == "removal":
-            new_lines, msg = apply_removal(lines, customization, match_line, verbose)
-        elif customization.type == "substitution":
-            new_lines, msg = apply_substitution(lines, customization, match_line, verbose)
-        elif customization.type == "addition":
-            new_lines, msg = apply_addition(lines, customization, match_line, verbose)
+        if not path.exists():
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Warning: Ignoring unreadable plan cache {path}: {e}")
+            return
+        if data.get('version') == PLAN_CACHE_VERSION and data.get('catalog') == catalog_hash:
+            self.entries = data.get('plans', {})
+    
+    def plans_for(self, blob_sha: str, customizations: List[Customization]) -> Dict[str, Dict]:
+        """Cached plan steps for a file's customizations, by plan_key()."""
+        plans = {}
+        for customization in customizations:
+            key = plan_key(customization)
+            step = self.entries.get(f"{blob_sha}:{key}")
+            if step is not None and step['type'] == customization.type:
+                plans[key] = step
+        self.hits += len(plans)
+        return plans
+    
+    def record(self, blob_sha: str, customizations: List[Customization], results: List[ApplyResult]):
+        """Remember the plan of every customization that applied successfully (results as from apply_file)."""
+        for customization, result in zip(application_order(customizations), results):
+            if result.success:
+                self.entries[f"{blob_sha}:{plan_key(customization)}"] = {
+                    'line': result.line - 1,
+                    'type': result.type,
+                    'drift': result.drift,
+                }
+    
+    def save(self, live_shas: set):
+        """Write the cache back, dropping plans for file contents no longer in the tree."""
+        plans = {key: step for key, step in self.entries.items() if key.split(':', 1)[0] in live_shas}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PLAN_CACHE_VERSION, 'catalog': self.catalog_hash, 'plans': plans}, f)
+
+
+def write_file_atomic(file_path: str, lines: List[str]):
+    """Write a file via a temporary file in the same directory and an atomic rename."""
+    path = Path(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(lines)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def failed_result(customization: Customization, message: str) -> ApplyResult:
+    """Result for a customization that could not be applied."""
+    return ApplyResult(
+        success=False,
+        file=customization.file,
+        line=customization.line,
+        type=customization.type,
+        message=message
+    )
+
+
+def find_overlaps(steps: List[PlanStep]) -> Dict[int, PlanStep]:
+    """
+    Customizations whose line ranges intersect, as {order: other step}.
+    
+    Steps are swept by start line, keeping the ranges that are still open,
+    so only ranges that really intersect are compared. Adjacent ranges don't
+    overlap, and neither does an addition right above a rewritten range (it
+    is inserted first-line-first). An addition inside a range, or two ranges
+    sharing a line, can't both be applied.
+    """
+    overlaps: Dict[int, PlanStep] = {}
+    open_steps: List[PlanStep] = []
+    for step in sorted(steps, key=lambda s: (s.start, s.end, s.order)):
+        open_steps = [other for other in open_steps if other.end > step.start]
+        for other in open_steps:
+            if step.start == step.end and step.start == other.start:
+                continue
+            overlaps.setdefault(step.order, other)
+            overlaps.setdefault(other.order, step)
+        if step.end > step.start:
+            open_steps.append(step)
+    return overlaps
+
+
+def plan_lines(lines: List[str], customizations: List[Customization],
+               plans: Optional[Dict[str, Dict]] = None) -> Tuple[List[PlanStep], Dict[int, ApplyResult]]:
+    """
+    Resolve where every customization of a file applies, before any edit.
+    
+    All customizations are matched against the original lines. Returns the
+    plan steps (in application order) and the results of customizations
+    that can't be planned, by their position in application_order().
+    
+    `plans` maps plan_key() to cached plan steps for this exact file content
+    (see PlanCache); those customizations skip context matching.
+    """
+    plans = plans or {}
+    steps: List[PlanStep] = []
+    failures: Dict[int, ApplyResult] = {}
+    # Only built once some customization actually needs matching
+    index: Optional[LineIndex] = None
+    for order, customization in enumerate(application_order(customizations)):
+        planned = plans.get(plan_key(customization))
+        if planned is not None and span_matches(lines, customization, planned['line']):
+            match = planned['line'], planned['drift']
         else:
-            return ApplyResult(
+            if index is None:
+                index = LineIndex(lines)
+            try:
+                match = plan_customization(lines, customization, index)
+            except Exception as e:
+                failures[order] = failed_result(customization, f"Exception: {str(e)}")
+                continue
+            if match is None:
+                failures[order] = context_not_found(customization)
+                continue
+        
+        start, drift = match
+        end = start if customization.type == 'addition' else start + len(customization.firefox_code)
+        steps.append(PlanStep(order, customization, start, end, drift))
+    return steps, failures
+
+
+def edit_lines(lines: List[str], customizations: List[Customization], verbose: bool = False,
+               plans: Optional[Dict[str, Dict]] = None) -> Tuple[List[str], List[ApplyResult]]:
+    """
+    Apply all customizations of one file's lines in memory.
+    
+    Every customization is planned against the original lines first (see
+    plan_lines), so overlapping ranges are detected before anything is
+    rewritten; those customizations fail and the rest of the file is still
+    applied. Steps are then applied from the bottom up, so earlier line
+    numbers stay valid. Returns the edited lines and one result per
+    customization, in application order.
+    """
+    steps, results = plan_lines(lines, customizations, plans)
+    # Only ranges that would really be rewritten can collide
+    overlaps = find_overlaps([step for step in steps if span_matches(lines, step.customization, step.start)])
+    
+    # Bottom up; at the same line a rewritten range goes before the additions above it
+    for step in sorted(steps, key=lambda s: (-s.start, s.start == s.end, s.order)):
+        customization = step.customization
+        other = overlaps.get(step.order)
+        if other is not None:
+            results[step.order] = ApplyResult(
                 success=False,
                 file=customization.file,
-                line=customization.line,
+                line=step.start + 1,
                 type=customization.type,
-                message=f"Unknown customization type: {customization.type}"
+                message=f"Overlaps the {other.customization.type} at line {other.start + 1}",
+                moved_from=customization.moved_from,
+                overlaps=other.start + 1
             )
+            continue
+        try:
+            lines, results[step.order] = apply_at(lines, customization, step.start, step.drift, verbose)
+        except Exception as e:
+            results[step.order] = failed_result(customization, f"Exception: {str(e)}")
+    
+    return lines, [results[order] for order in range(len(customizations))]
+
+
+def edit_file(file_path: str, customizations: List[Customization], verbose: bool = False,
+              plans: Optional[Dict[str, Dict]] = None
+              ) -> Tuple[Optional[List[str]], List[str], List[ApplyResult]]:
+    """
+    Read a file once and apply its customizations in memory (see edit_lines).
+    
+    Returns the original lines (None if the file couldn't be read), the
+    edited lines and the results.
+    """
+    try:
+        with open(file_path, 'r') as f:
+            original = f.readlines()
+    except Exception as e:
+        return None, [], [failed_result(c, f"Exception: {str(e)}") for c in application_order(customizations)]
+    
+    lines, results = edit_lines(original, customizations, verbose, plans)
+    return original, lines, results
+
+
+def apply_file(file_path: str, customizations: List[Customization],
+               dry_run: bool = False, verbose: bool = False,
+               plans: Optional[Dict[str, Dict]] = None) -> List[ApplyResult]:
+    """
+    Apply all customizations of one file.
+    
+    Edits are made in memory (see edit_file) and the result is written
+    once, atomically. Dry-run never touches the disk.
+    """
+    original, lines, results = edit_file(file_path, customizations, verbose, plans)
+    
+    # Write back once (unless dry-run)
+    if not dry_run and any(r.success for r in results):
+        try:
+            write_file_atomic(file_path, lines)
+        except Exception as e:
+            results = [
+                failed_result(c, f"Exception: {str(e)}") if r.success else r
+                for c, r in zip(application_order(customizations), results)
+            ]
+    
+    return results
+
+
+def split_lines(text: str) -> List[str]:
+    """Split text into lines on '\\n' only, keeping line endings (as git does)."""
+    return re.findall(r'[^\n]*\n|[^\n]+$', text)
+
+
+def unified_patch(patch_path: str, original: List[str], lines: List[str]) -> str:
+    """
+    Unified diff of one file in `git apply` format ('' if nothing changed).
+    
+    `patch_path` is the file's path relative to the repository root.
+    """
+    # Inserted code may hold several lines per list item; diff what would be written
+    old_text, new_text = ''.join(original), ''.join(lines)
+    if old_text == new_text:
+        return ''
+    
+    patch = [f"diff --git a/{patch_path} b/{patch_path}\n"]
+    for line in unified_diff(split_lines(old_text), split_lines(new_text), f"a/{patch_path}", f"b/{patch_path}"):
+        if line.endswith('\n'):
+            patch.append(line)
+        else:
+            # Last line of a file without a trailing newline
+            patch.append(line + '\n\\ No newline at end of file\n')
+    return ''.join(patch)
+
+
+def patch_file(file_path: str, customizations: List[Customization], verbose: bool = False,
+               plans: Optional[Dict[str, Dict]] = None, patch_root: Optional[Path] = None
+               ) -> Tuple[List[ApplyResult], str]:
+    """
+    Apply all customizations of one file in memory and return them as a patch.
+    
+    Nothing is written; the patch paths are relative to `patch_root`
+    (default: the current directory).
+    """
+    original, lines, results = edit_file(file_path, customizations, verbose, plans)
+    return results, unified_patch(repo_relative(file_path, patch_root or Path.cwd()), original or [], lines)
+
+
+def repo_relative(file_path: str, root: Path) -> str:
+    """Path of a file relative to `root`, with forward slashes (as git names it)."""
+    return Path(os.path.relpath(os.path.abspath(file_path), root)).as_posix()
+
+
+def apply_revision_files(files_map: Dict[str, List[Customization]], revision: str,
+                         entries: Dict[str, Tuple[str, str]], root: Path, updates: Dict[str, bytes],
+                         verbose: bool = False, plans_by_file: Optional[Dict[str, Dict[str, Dict]]] = None
+                         ) -> Iterator[Tuple[str, List[Customization], List[ApplyResult], str]]:
+    """
+    Apply customizations to the files of a git revision, without a checkout.
+    
+    Blobs are read through one `git cat-file --batch` process and edited in
+    memory; edited contents are collected in `updates` ({repo_path: bytes})
+    for write_blobs() and commit_tree(). `entries` is the revision's tree
+    (see tree_entries) and `root` the repository root. Yields the same
+    tuples as apply_files, sorted by path.
+    """
+    plans_by_file = plans_by_file or {}
+    with GitCatFile(root) as reader:
+        for file_path, customizations in sorted(files_map.items()):
+            repo_path = repo_relative(file_path, root)
+            try:
+                data = reader.read(f"{revision}:{repo_path}") if repo_path in entries else None
+                if data is None:
+                    raise FileNotFoundError(f"{file_path} not found in {revision}")
+                # Same newline handling as reading the file from disk
+                lines = io.StringIO(data.decode('utf-8'), newline=None).readlines()
+            except Exception as e:
+                results = [failed_result(c, f"Exception: {str(e)}") for c in application_order(customizations)]
+                yield file_path, customizations, results, ''
+                continue
+            
+            lines, results = edit_lines(lines, customizations, verbose, plans_by_file.get(file_path))
+            if any(r.success for r in results):
+                updates[repo_path] = ''.join(lines).encode('utf-8')
+            yield file_path, customizations, results, ''
+
+
+def uncomment(line: str) -> str:
+    """A normalized line without a leading `// Firefox:` or `//` comment marker."""
+    stripped = normalize_line(line)
+    for prefix in ('// Firefox:', '//'):
+        if stripped.startswith(prefix):
+            return stripped[len(prefix):].strip()
+    return stripped
+
+
+def block_present(lines: List[str], customization: Customization, marker_line: int) -> bool:
+    """
+    Whether a customization's marker and code are at `marker_line` (0-indexed).
+    
+    Accepts both the Ecosia source form the catalog is scanned from
+    (`/* Ecosia:` blocks, `// Ecosia:` followed by commented Firefox code)
+    and the form apply_at() writes (`// Firefox:` lines). Blank lines are
+    skipped, as the catalog scanner does inside removal blocks.
+    """
+    if not 0 <= marker_line < len(lines):
+        return False
+    marker = lines[marker_line]
+    if 'Ecosia:' not in marker or normalize_line(customization.comment) not in marker:
+        return False
+    
+    expected = [(line, True) for line in customization.firefox_code]
+    expected += [(line, False) for line in customization.ecosia_code]
+    body = (line for line in lines[marker_line + 1:] if line.strip())
+    matched = 0
+    for (expected_line, is_firefox), actual in zip(expected, body):
+        expected_line = normalize_line(expected_line)
+        # Firefox code is commented out, except inside a removal block
+        if normalize_line(actual) != expected_line and not (is_firefox and uncomment(actual) == expected_line):
+            return False
+        matched += 1
+    return matched == len(expected)
+
+
+def verify_file(file_path: str, customizations: List[Customization]) -> List[ApplyResult]:
+    """
+    Check, without writing, that a file still contains its customizations.
+    
+    Each customization is located by its context with the same matching as
+    apply (window first, then whole-file relocation). It is present if its
+    marker and code are at the catalog line; found elsewhere it is drifted
+    (`drift` is the offset), otherwise missing. Results are in catalog line
+    order.
+    """
+    customizations = sorted(customizations, key=lambda c: c.line)
+    try:
+        with open(file_path, 'r') as f:
+            lines = f.readlines()
+    except Exception as e:
+        return [failed_result(c, f"Missing file ({e.__class__.__name__})") for c in customizations]
+    
+    index = LineIndex(lines)
+    results = []
+    for customization in customizations:
+        expected_line = customization.line - 1
+        if block_present(lines, customization, expected_line):
+            match = expected_line, 0
+        else:
+            match = plan_customization(lines, customization, index)
+            if match is not None and not block_present(lines, customization, match[0]):
+                match = None
         
-        if "Error:" in msg:
-            return ApplyResult(
-                success=False,
+        if match is None:
+            results.append(failed_result(customization, "Missing"))
+        else:
+            drift = match[0] - expected_line
+            results.append(ApplyResult(
+                success=drift == 0,
                 file=customization.file,
                 line=customization.line,
                 type=customization.type,
-                message=msg
-            )
-        
-        # Write back (unless dry-run)
-        if not dry_run:
-            with open(file_path, 'w') as f:
-                f.writelines(new_lines)
-        
-        return ApplyResult(
-            success=True,
-            file=customization.file,
-            line=match_line + 1,  # Convert back to 1-indexed
-            type=customization.type,
-            message=msg
-        )
+                message="Present" if drift == 0 else f"Drifted to line {match[0] + 1}",
+                drift=drift
+            ))
+    return results
+
+
+def verify_files(files_map: Dict[str, List[Customization]], jobs: int = 1
+                 ) -> Iterator[Tuple[str, List[ApplyResult]]]:
+    """Verify files in parallel (see verify_file), yielding results sorted by path."""
+    paths = sorted(files_map)
+    outcomes = map_files(verify_file, len(paths), (paths, [files_map[path] for path in paths]), jobs)
+    yield from zip(paths, outcomes)
+
+
+def apply_files(files_map: Dict[str, List[Customization]], dry_run: bool = False, verbose: bool = False,
+                jobs: int = 1, plans_by_file: Optional[Dict[str, Dict[str, Dict]]] = None,
+                patch_root: Optional[Path] = None
+                ) -> Iterator[Tuple[str, List[Customization], List[ApplyResult], str]]:
+    """
+    Apply customizations file by file, sorted by path.
     
-    except Exception as e:
-        return ApplyResult(
-            success=False,
-            file=customization.file,
-            line=customization.line,
-            type=customization.type,
-            message=f"Exception: {str(e)}"
-        )
+    Files are independent, so with jobs > 1 they are applied by a process
+    pool; results are still yielded in path order, so output is identical
+    to a serial run.
+    
+    With `patch_root`, nothing is written and each file's changes are
+    yielded as a unified patch instead (see patch_file); otherwise the
+    patch is ''.
+    """
+    items = sorted(files_map.items())
+    paths = [file_path for file_path, _ in items]
+    customizations = [file_customizations for _, file_customizations in items]
+    plans = [(plans_by_file or {}).get(file_path) for file_path in paths]
+    
+    if patch_root is not None:
+        worker, worker_args = patch_file, (paths, customizations, repeat(verbose), plans, repeat(patch_root))
+    else:
+        worker, worker_args = apply_file_unpatched, (paths, customizations, repeat(dry_run), repeat(verbose), plans)
+    
+    outcomes = map_files(worker, len(items), worker_args, jobs)
+    for file_path, file_customizations, (results, patch) in zip(paths, customizations, outcomes):
+        yield file_path, file_customizations, results, patch
+
+
+def map_files(worker: Callable, count: int, worker_args: Tuple, jobs: int = 1) -> Iterator:
+    """
+    `map(worker, *worker_args)` over `count` files, in a process pool if jobs > 1.
+    
+    Outcomes are yielded in input order either way, and the matcher
+    statistics of worker processes are folded into this process.
+    """
+    if jobs <= 1 or count < 2:
+        yield from map(worker, *worker_args)
+        return
+    
+    chunksize = max(1, count // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for outcome, counters in executor.map(run_counted, repeat(worker), *worker_args, chunksize=chunksize):
+            default_matcher.merge_counters(counters)
+            yield outcome
+
+
+def apply_file_unpatched(*args) -> Tuple[List[ApplyResult], str]:
+    """apply_file with an empty patch, shaped like patch_file's return value."""
+    return apply_file(*args), ''
+
+
+def run_counted(function, *args):
+    """Call `function` in a worker process, also returning the matcher counters it added."""
+    before = dict(default_matcher.counters)
+    outcome = function(*args)
+    return outcome, {tier: count - before.get(tier, 0) for tier, count in default_matcher.counters.items()}
 
 
 def main():
@@ -387,23 +1190,92 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=__doc__
     )
-    parser.add_argument('--catalog', required=True, help='Path to ecosia-customizations.json')
+    parser.add_argument('--catalog', required=True, help='Path to ecosia-customizations.json (or a SQLite catalog)')
     parser.add_argument('--target', help='Target directory to apply customizations (e.g., firefox-ios/)')
     parser.add_argument('--file', help='Apply to specific file only')
     parser.add_argument('--dry-run', action='store_true', help='Preview changes without modifying files')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Number of worker processes applying files in parallel (default: 1, 0 = one per CPU)')
+    parser.add_argument('--plan-cache',
+                        help='Cache of resolved match lines; reruns only re-match changed files and past failures')
+    parser.add_argument('--old-tag', help='Firefox tag the catalog was generated against (enables git rename detection)')
+    parser.add_argument('--new-tag', help='Firefox tag being upgraded to (default: HEAD)')
+    parser.add_argument('--diff', nargs='?', const='-', metavar='FILE',
+                        help='Dry-run that writes all changes as one unified patch to FILE (default: stdout)')
+    parser.add_argument('--tree', metavar='REV',
+                        help='Apply to the files of a git revision and commit the result, without a checkout')
+    parser.add_argument('--branch', help='With --tree: point this branch at the new commit')
+    parser.add_argument('--verify', action='store_true',
+                        help='Only check that the tree still contains every customization at its catalog line; '
+                             'exits non-zero on missing or drifted ones')
+    parser.add_argument('--message', help='With --tree: commit message (default: "Apply Ecosia customizations to REV")')
     
     args = parser.parse_args()
     
+    if args.tree and args.diff:
+        parser.error('--tree and --diff cannot be combined')
+    if args.verify and (args.tree or args.diff):
+        parser.error('--verify cannot be combined with --tree or --diff')
+    if (args.branch or args.message) and not args.tree:
+        parser.error('--branch and --message require --tree')
+    
+    if args.diff == '-':
+        # Keep stdout for the patch; progress goes to stderr
+        patch_stream = sys.stdout
+        with redirect_stdout(sys.stderr):
+            run(args, patch_stream)
+    elif args.diff:
+        with open(args.diff, 'w') as patch_stream:
+            run(args, patch_stream)
+    else:
+        run(args)
+
+
+def verify(files_map: Dict[str, List[Customization]], jobs: int = 1):
+    """Print a compact report of missing or drifted customizations and exit non-zero if there are any."""
+    total = 0
+    missing = []
+    drifted = []
+    for _, file_results in verify_files(files_map, jobs):
+        total += len(file_results)
+        for result in file_results:
+            if result.drift:
+                drifted.append(result)
+                print(f"🧭 {result.file}:{result.line} {result.type} - {result.message} ({result.drift:+d} lines)")
+            elif not result.success:
+                missing.append(result)
+                print(f"❌ {result.file}:{result.line} {result.type} - {result.message}")
+    
+    print("\n" + "=" * 60)
+    print("🔎 VERIFY")
+    print("=" * 60)
+    print(f"✅ Present:    {total - len(missing) - len(drifted)}")
+    print(f"🧭 Drifted:    {len(drifted)}")
+    print(f"❌ Missing:    {len(missing)}")
+    print(f"📝 Total:      {total}")
+    print("=" * 60)
+    
+    if missing or drifted:
+        print("\n⚠️  The catalog is out of date: regenerate it or restore the customizations above.")
+        exit(1)
+    print("\n✨ Every customization is in place.")
+
+
+def run(args: argparse.Namespace, patch_stream=None):
+    """Apply (or preview) the catalog as requested on the command line."""
+    if patch_stream is not None:
+        args.dry_run = True
+    
     if not args.target and not args.file:
         print("❌ Error: Either --target or --file must be specified")
         exit(1)
     
     # Load catalog
     print(f"📖 Loading catalog: {args.catalog}")
-    catalog = load_catalog(args.catalog)
-    
-    customizations_data = catalog.get('customizations', [])
+    with load_catalog(args.catalog) as catalog:
+        # Filtering by file uses the JSON and SQLite stores' file-name index; JSONL skips other lines unparsed
+        customizations_data = list(catalog.customizations(file=args.file))
     print(f"   Found {len(customizations_data)} customizations")
     
     if args.dry_run:
@@ -420,21 +1292,18 @@ def main():
             firefox_code=c['firefox_code'],
             ecosia_code=c['ecosia_code'],
             context_before=c['context_before'],
-            context_after=c['context_after']
+            context_after=c['context_after'],
+            fingerprints=c.get('fingerprints')
         )
         
-        # Filter by file if specified
-        if args.file:
-            if customization.file != args.file and not customization.file.endswith('/' + args.file):
-                continue
         # Filter by target directory if specified
-        elif args.target:
+        if not args.file and args.target:
             if not customization.file.startswith(args.target):
                 continue
         
         customizations.append(customization)
     
-    print(f"📋 Applying {len(customizations)} customizations\n")
+    print(f"📋 {'Verifying' if args.verify else 'Applying'} {len(customizations)} customizations\n")
     
     # Group by file
     files_map: Dict[str, List[Customization]] = {}
@@ -443,27 +1312,105 @@ def main():
             files_map[c.file] = []
         files_map[c.file].append(c)
     
-    # Apply customizations file by file (in reverse line order to avoid shifts)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.verify:
+        verify(files_map, jobs)
+        return
+    
+    # In tree mode files are read from the revision instead of the disk
+    root = repo_root(Path.cwd()) or Path.cwd()
+    entries: Dict[str, Tuple[str, str]] = {}
+    exists = os.path.exists
+    if args.tree:
+        entries = tree_entries(args.tree)
+        if entries is None:
+            print(f"❌ Error: Cannot read git revision {args.tree}")
+            exit(1)
+        exists = lambda file_path: repo_relative(file_path, root) in entries
+        print(f"🌳 Applying to {args.tree} without a checkout\n")
+    
+    # Follow files that were renamed or split upstream
+    if any(not exists(file_path) for file_path in files_map):
+        new_revision = args.tree or args.new_tag or 'HEAD'
+        renames = detect_renames(args.old_tag, new_revision) if args.old_tag else {}
+        # The tree-wide index searches the disk, so a revision only follows renames
+        tree_root = None if args.tree else Path(args.target or '.')
+        files_map = resolve_moved_files(files_map, renames, tree_root, exists)
+    
+    # Look up cached plans for files whose content hasn't changed
+    plan_cache = None
+    plans_by_file: Dict[str, Dict[str, Dict]] = {}
+    blob_shas: Dict[str, str] = {}
+    if args.plan_cache:
+        with open(args.catalog, 'rb') as f:
+            catalog_hash = hashlib.sha1(f.read()).hexdigest()
+        plan_cache = PlanCache(Path(args.plan_cache), catalog_hash)
+        if args.tree:
+            blob_shas = {file_path: entries[repo_relative(file_path, root)][1]
+                         for file_path in files_map if exists(file_path)}
+        else:
+            blob_shas = {str(path): sha for path, sha in hash_files(list(files_map)).items()}
+        for file_path, blob_sha in blob_shas.items():
+            plans_by_file[file_path] = plan_cache.plans_for(blob_sha, files_map[file_path])
+        print(f"♻️  Reusing {plan_cache.hits} cached plan(s)\n")
+    
+    # Apply customizations file by file (each file is read and written once)
+    # Patch paths are relative to the repository root, as `git apply` expects
+    patch_root = root if patch_stream is not None else None
+    updates: Dict[str, bytes] = {}
+    if args.tree:
+        applied = apply_revision_files(files_map, args.tree, entries, root, updates, args.verbose, plans_by_file)
+    else:
+        applied = apply_files(files_map, args.dry_run, args.verbose, jobs, plans_by_file, patch_root)
     results = []
-    for file_path, file_customizations in sorted(files_map.items()):
-        # Sort by line number (descending) to apply from bottom to top
-        file_customizations.sort(key=lambda c: c.line, reverse=True)
-        
+    patched_files = 0
+    for file_path, file_customizations, file_results, patch in applied:
         print(f"📝 {file_path} ({len(file_customizations)} customization(s))")
+        if patch:
+            patch_stream.write(patch)
+            patched_files += 1
+        if plan_cache is not None and file_path in blob_shas:
+            plan_cache.record(blob_shas[file_path], file_customizations, file_results)
+        
+        # Overlaps are found while planning, before the file is rewritten
+        overlapping = [r for r in file_results if r.overlaps]
+        if overlapping:
+            print(f"   ⚠️  {len(overlapping)} customization(s) overlap another one's lines and were skipped")
         
-        for customization in file_customizations:
-            result = apply_customization(file_path, customization, args.dry_run, args.verbose)
+        for result in file_results:
             results.append(result)
             
+            moved = f" (moved from {result.moved_from})" if result.moved_from else ""
             if result.success:
                 icon = "✅"
+                relocated = f" (relocated, drift {result.drift:+d} lines)" if result.drift else ""
                 if args.verbose:
-                    print(f"   {icon} Line {result.line}: {result.type} - {result.message}")
+                    print(f"   {icon} Line {result.line}: {result.type} - {result.message}{relocated}{moved}")
                 else:
-                    print(f"   {icon} Line {result.line}: {result.type}")
+                    print(f"   {icon} Line {result.line}: {result.type}{relocated}{moved}")
             else:
                 icon = "❌"
-                print(f"   {icon} Line {result.line}: {result.type} - {result.message}")
+                print(f"   {icon} Line {result.line}: {result.type} - {result.message}{moved}")
+    
+    if plan_cache is not None:
+        plan_cache.save(set(blob_shas.values()))
+    
+    # Store the edited files as blobs and commit them on top of the revision
+    commit = None
+    if args.tree and updates and not args.dry_run:
+        paths = sorted(updates)
+        shas = write_blobs([updates[path] for path in paths], cwd=root)
+        parent = resolve_commit(args.tree)
+        message = args.message or f"Apply Ecosia customizations to {args.tree}"
+        if shas is not None and parent is not None:
+            commit = commit_tree(parent, {path: (entries[path][0], sha) for path, sha in zip(paths, shas)},
+                                 message, cwd=root)
+        if commit is None:
+            print(f"❌ Error: Could not commit the customized tree of {args.tree}")
+            exit(1)
+        if args.branch and run_git(['update-ref', f"refs/heads/{args.branch}", commit], cwd=root) is None:
+            print(f"❌ Error: Could not update branch {args.branch}")
+            exit(1)
     
     # Print summary
     print("\n" + "=" * 60)
@@ -477,6 +1424,22 @@ def main():
     print(f"❌ Failed:     {len(failed)}")
     print(f"📝 Total:      {len(results)}")
     
+    moved = [r for r in successful if r.moved_from]
+    if moved:
+        print(f"🚚 Moved:      {len(moved)} (file renamed or split upstream)")
+    
+    overlapping = [r for r in failed if r.overlaps]
+    if overlapping:
+        print(f"🧩 Overlapping: {len(overlapping)} (ranges intersect in the same file, not applied)")
+    
+    relocated = [r for r in successful if r.drift]
+    if relocated:
+        print(f"🧭 Relocated:  {len(relocated)} (drifted beyond the ±50 line window)")
+        for r in relocated[:10]:
+            print(f"  • {r.file}:{r.line} ({r.drift:+d} lines)")
+        if len(relocated) > 10:
+            print(f"  ... and {len(relocated) - 10} more")
+    
     # Breakdown by type
     removals = [r for r in successful if r.type == "removal"]
     substitutions = [r for r in successful if r.type == "substitution"]
@@ -487,6 +1450,9 @@ def main():
     print(f"  • Substitutions: {len(substitutions)}")
     print(f"  • Additions:     {len(additions)}")
     
+    if args.verbose:
+        print(f"\n🔬 Matcher: {default_matcher.report()}")
+    
     if failed:
         print(f"\n⚠️  {len(failed)} customization(s) could not be applied:")
         for r in failed[:10]:  # Show first 10
@@ -496,8 +1462,14 @@ def main():
     
     print("=" * 60)
     
-    if args.dry_run:
+    if patch_stream is not None:
+        target = 'stdout' if args.diff == '-' else args.diff
+        print(f"\n🩹 Wrote a patch for {patched_files} file(s) to {target}. No files were modified.")
+    elif args.dry_run:
         print("\n🔍 Dry-run complete. No files were modified.")
+    elif args.tree:
+        branch = f" (branch {args.branch})" if args.branch else ""
+        print(f"\n🌳 Committed {len(updates)} file(s) on top of {args.tree}: {commit or args.tree}{branch}")
     else:
         print(f"\n✨ Applied {len(successful)} customizations!")
     
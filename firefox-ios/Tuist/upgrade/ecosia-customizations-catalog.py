@@ -10,16 +10,36 @@ Usage:
     python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --output ecosia-customizations.json
     
 Output: JSON catalog of all Ecosia customizations
+
+Timeline mode summarizes the customizations at several git revisions (e.g.
+every upgrade tag), reading blobs straight from git objects without checkout:
+    python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --timeline-tags 'firefox-v*'
 """
 
+import io
+import os
 import re
 import json
+import mmap
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 
+from ecosia_catalog import CATALOG_VERSION, FINGERPRINT_ALGORITHM, JSONL_SUFFIX, JsonlCatalogWriter, fingerprint_customization
+from ecosia_git import GitCatFile, grep_files, grep_revision, hash_files, list_tags, repo_prefix, repo_root, resolve_commit
+
+
+# Bump whenever the scanner's output for a given file content changes,
+# so that entries written by an older scanner are discarded from the cache.
+SCANNER_VERSION = 3
+
+# Every customization marker contains this string, so files without it can be skipped
+MARKER = 'Ecosia:'
+
 
 @dataclass
 class EcosiaCustomization:
@@ -45,200 +65,286 @@ class EcosiaCustomization:
             'context_before': self.context_before,
             'context_after': self.context_after,
         }
-
-
-def extract_context(lines: List[str], index: int, before: int = 2, after: int = 2) -> tuple[List[str], List[str]]:
-    """Extract context lines before and after a given index."""
-    context_before = []
-    for i in range(max(0, index - before), index):
-        if i < len(lines):
-            context_before.append(lines[i].rstrip())
     
-    context_after = []
-    # After extraction depends on what we've already processed
-    # This is filled in by the caller
-    
-    return context_before, context_after
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], file_path: str) -> 'EcosiaCustomization':
+        """Rebuild a customization from its dictionary form (see `to_dict`)."""
+        return cls(
+            file_path=file_path,
+            line_number=data['line'],
+            customization_type=data['type'],
+            comment=data['comment'],
+            firefox_code=data['firefox_code'],
+            ecosia_code=data['ecosia_code'],
+            context_before=data['context_before'],
+            context_after=data['context_after'],
+        )
 
 
-def scan_file_for_customizations(file_path: Path) -> List[EcosiaCustomization]:
+class ScanCache:
     """
-    Scan a single Swift file for Ecosia customizations.
+    Persistent scan cache keyed by git blob SHA.
     
-    Returns list of EcosiaCustomization objects.
+    Maps the blob SHA of each scanned Swift file to the customizations found in
+    it, so unchanged files don't need to be parsed again on the next run.
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    except Exception as e:
-        print(f"⚠️  Warning: Could not read {file_path}: {e}")
-        return []
-    
-    customizations = []
-    i = 0
     
-    while i < len(lines):
-        line = lines[i]
-        
-        # Pattern 1: Multiline comment removal (/* Ecosia: ... */)
-        if re.search(r'/\*\s*Ecosia:', line):
-            custom = extract_multiline_removal(lines, i, file_path)
-            if custom:
-                customizations.append(custom)
-                # Skip past the entire comment block
-                i = custom.line_number + len(custom.firefox_code) + 3
-                continue
-        
-        # Pattern 2: Inline comment (// Ecosia:)
-        elif re.search(r'//\s*Ecosia:', line):
-            custom = extract_inline_customization(lines, i, file_path)
-            if custom:
-                customizations.append(custom)
-                # Continue from next line
-                i += 1
-                continue
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.hits = 0
         
-        i += 1
-    
-    return customizations
+        if not path.exists():
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Warning: Ignoring unreadable scan cache {path}: {e}")
+            return
+        if data.get('scanner_version') == SCANNER_VERSION:
+            self.entries = data.get('entries', {})
+    
+    def get(self, blob_sha: str, file_path: Path) -> Optional[List[EcosiaCustomization]]:
+        """Return cached customizations for a blob, or None on a cache miss."""
+        cached = self.entries.get(blob_sha)
+        if cached is None:
+            return None
+        self.hits += 1
+        return [EcosiaCustomization.from_dict(c, str(file_path)) for c in cached]
+    
+    def put(self, blob_sha: str, customizations: List[EcosiaCustomization]):
+        """Record the customizations found in a blob (file path is not stored)."""
+        self.entries[blob_sha] = [
+            {k: v for k, v in c.to_dict().items() if k != 'file'} for c in customizations
+        ]
+    
+    def save(self, live_shas: set):
+        """Write the cache back, dropping entries for blobs no longer in the tree."""
+        entries = {sha: c for sha, c in self.entries.items() if sha in live_shas}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'scanner_version': SCANNER_VERSION, 'entries': entries}, f, ensure_ascii=False)
+
+
+# Marker patterns; only evaluated on lines that contain MARKER at all
+REMOVAL_MARKER = re.compile(r'/\*\s*Ecosia:\s*(.*)')
+INLINE_MARKER = re.compile(r'//\s*Ecosia:\s*(.*)')
 
+# Number of lines captured before/after each customization
+CONTEXT_LINES = 2
 
-def extract_multiline_removal(lines: List[str], start: int, file_path: Path) -> Optional[EcosiaCustomization]:
+
+def tokenize_customizations(lines: List[str], file_path: str) -> List[EcosiaCustomization]:
     """
-    Extract a multiline removal customization.
+    Extract customizations from a file's lines in a single forward pass.
+    
+    A small state machine walks the file once and emits three kinds of records:
     
-    Pattern:
+    Removal:
         /* Ecosia: Remove Glean
         import Glean
          */
-    """
-    try:
-        comment_line = lines[start].strip()
-        match = re.search(r'/\*\s*Ecosia:\s*(.*)', comment_line)
-        if not match:
-            return None
-        
-        comment = match.group(1).strip()
-        
-        # Find the closing */
-        firefox_code = []
-        i = start + 1
-        while i < len(lines):
-            if '*/' in lines[i]:
-                break
-            # Don't include empty lines
-            code_line = lines[i].rstrip()
-            if code_line:
-                firefox_code.append(code_line)
-            i += 1
-        
-        # Get context
-        context_before, _ = extract_context(lines, start)
-        context_after = []
-        # Context after is lines after the closing */
-        for j in range(i + 1, min(i + 3, len(lines))):
-            context_after.append(lines[j].rstrip())
-        
-        return EcosiaCustomization(
-            file_path=str(file_path),
-            line_number=start + 1,  # 1-indexed
-            customization_type='removal',
-            comment=comment,
-            firefox_code=firefox_code,
-            ecosia_code=[],
-            context_before=context_before,
-            context_after=context_after,
-        )
-    except Exception as e:
-        print(f"⚠️  Warning: Failed to extract multiline removal at {file_path}:{start+1}: {e}")
-        return None
-
-
-def extract_inline_customization(lines: List[str], start: int, file_path: Path) -> Optional[EcosiaCustomization]:
-    """
-    Extract an inline customization (addition or substitution).
     
-    Pattern (Substitution):
+    Substitution:
         // Ecosia: update UA prefix
         // return clientUserAgent(prefix: "Firefox-iOS-Sync")
         return clientUserAgent(prefix: "Ecosia-iOS-Sync")
     
-    Pattern (Addition):
+    Addition:
         // Ecosia: Searches counter
         private let searchesCounter = SearchesCounter()
+    
+    Lines inside a removal block are never treated as markers; scanning resumes
+    right after its closing `*/`. Context after each record is filled in as the
+    following lines stream past, so no line is read more than once.
+    
+    Inline records may overlap (e.g. a run of trailing `// Ecosia:` markers),
+    and each one runs to its own end. Records in the same phase see the same
+    lines, so they share one run of collected lines and each keeps only where
+    it joined; a record copies its slice out when it leaves the phase.
     """
-    try:
-        comment_line = lines[start].strip()
-        match = re.search(r'//\s*Ecosia:\s*(.*)', comment_line)
-        if not match:
-            return None
+    customizations: List[EcosiaCustomization] = []
+    recent: deque = deque(maxlen=CONTEXT_LINES)
+    removal: Optional[EcosiaCustomization] = None
+    collecting_firefox: List[List[Any]] = []  # [customization, start in firefox_run]
+    collecting_ecosia: List[List[Any]] = []   # [customization, start in ecosia_run]
+    firefox_run: List[str] = []
+    ecosia_run: List[str] = []
+    awaiting_context: List[List[Any]] = []    # [customization, lines still needed]
+    
+    def close_inline(custom: EcosiaCustomization):
+        custom.customization_type = 'substitution' if custom.firefox_code else 'addition'
+        awaiting_context.append([custom, CONTEXT_LINES])
+    
+    for index, raw_line in enumerate(lines):
+        line = raw_line.rstrip()
+        stripped = line.strip()
+        closed_removal = None
+        in_removal = removal is not None
         
-        comment = match.group(1).strip()
+        if in_removal:
+            if '*/' in raw_line:
+                closed_removal, removal = removal, None
+            elif line:
+                # Don't include empty lines
+                removal.firefox_code.append(line)
         
-        # Check if next lines are also comments (commented Firefox code)
-        firefox_code = []
-        i = start + 1
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith('//') and not line.startswith('// Ecosia'):
-                # This is commented-out Firefox code
-                firefox_code.append(line[2:].strip())  # Remove //
-                i += 1
+        ends_code = not stripped or stripped.startswith('//')
+        if collecting_ecosia:
+            if ends_code or stripped == '}':
+                # Stop at blank line, next comment, or closing brace at same level
+                for custom, start in collecting_ecosia:
+                    custom.ecosia_code = ecosia_run[start:]
+                    close_inline(custom)
+                collecting_ecosia, ecosia_run = [], []
             else:
-                break
-        
-        # Next non-comment, non-empty lines are Ecosia code
-        ecosia_code = []
-        while i < len(lines):
-            line = lines[i].rstrip()
-            stripped = line.strip()
-            
-            # Stop at blank line, next comment, or closing brace at same level
-            if not stripped or stripped.startswith('//') or (stripped == '}' and len(ecosia_code) > 0):
-                break
-            
-            ecosia_code.append(line)
-            i += 1
+                ecosia_run.append(line)
+        if collecting_firefox:
+            if stripped.startswith('//') and not stripped.startswith('// Ecosia'):
+                # Commented-out Firefox code
+                firefox_run.append(stripped[2:].strip())
+            else:
+                for record in collecting_firefox:
+                    custom, start = record
+                    custom.firefox_code = firefox_run[start:]
+                    if ends_code:
+                        close_inline(custom)
+                    else:
+                        # Starts the Ecosia code, even at a closing brace
+                        if not collecting_ecosia:
+                            ecosia_run.append(line)
+                        collecting_ecosia.append([custom, len(ecosia_run) - 1])
+                collecting_firefox, firefox_run = [], []
         
-        # Determine type
-        customization_type = 'substitution' if firefox_code else 'addition'
+        for entry in awaiting_context:
+            entry[0].context_after.append(line)
+            entry[1] -= 1
+        awaiting_context = [entry for entry in awaiting_context if entry[1] > 0]
         
-        # Get context
-        context_before, _ = extract_context(lines, start)
-        context_after = []
-        for j in range(i, min(i + 2, len(lines))):
-            context_after.append(lines[j].rstrip())
+        if closed_removal is not None:
+            # Context after a removal starts below the closing */
+            awaiting_context.append([closed_removal, CONTEXT_LINES])
+        elif not in_removal and MARKER in raw_line:
+            removal_match = REMOVAL_MARKER.search(raw_line)
+            if removal_match or INLINE_MARKER.search(raw_line):
+                pattern = REMOVAL_MARKER if removal_match else INLINE_MARKER
+                custom = EcosiaCustomization(
+                    file_path=file_path,
+                    line_number=index + 1,  # 1-indexed
+                    customization_type='removal' if removal_match else 'addition',
+                    comment=pattern.search(stripped).group(1).strip(),
+                    firefox_code=[],
+                    ecosia_code=[],
+                    context_before=list(recent),
+                    context_after=[],
+                )
+                customizations.append(custom)
+                
+                if removal_match:
+                    removal = custom
+                else:
+                    collecting_firefox.append([custom, len(firefox_run)])
         
-        return EcosiaCustomization(
-            file_path=str(file_path),
-            line_number=start + 1,  # 1-indexed
-            customization_type=customization_type,
-            comment=comment,
-            firefox_code=firefox_code,
-            ecosia_code=ecosia_code,
-            context_before=context_before,
-            context_after=context_after,
-        )
+        recent.append(line)
+    
+    for custom, start in collecting_firefox:
+        custom.firefox_code = firefox_run[start:]
+        close_inline(custom)
+    for custom, start in collecting_ecosia:
+        custom.ecosia_code = ecosia_run[start:]
+        close_inline(custom)
+    
+    return customizations
+
+
+def scan_file_for_customizations(file_path: Path) -> List[EcosiaCustomization]:
+    """
+    Scan a single Swift file for Ecosia customizations.
+    
+    Returns list of EcosiaCustomization objects.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
     except Exception as e:
-        print(f"⚠️  Warning: Failed to extract inline customization at {file_path}:{start+1}: {e}")
-        return None
+        print(f"⚠️  Warning: Could not read {file_path}: {e}")
+        return []
+    
+    return tokenize_customizations(lines, str(file_path))
+
 
+def file_contains_marker(file_path: Path) -> bool:
+    """Check for the Ecosia marker with a memory-mapped byte search (no line splitting)."""
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm.find(MARKER.encode()) != -1
+    except OSError:
+        # Let the scanner report unreadable files
+        return True
 
-def scan_directory(scan_dir: Path, exclude_dirs: List[str] = None) -> tuple[List[EcosiaCustomization], Path]:
+
+def prefilter_files(swift_files: List[Path], scan_dir: Path, mode: str) -> List[Path]:
     """
-    Recursively scan a directory for Swift files with Ecosia customizations.
+    Drop files that cannot contain customizations before they are parsed.
+    
+    Modes:
+        none:     keep every file
+        git-grep: one `git grep -l` over the scan directory
+        mmap:     memory-mapped byte search per file
+    """
+    if mode == 'git-grep':
+        matches = grep_files(MARKER, scan_dir)
+        if matches is not None:
+            return [f for f in swift_files if f in matches]
+        print("⚠️  Warning: git grep unavailable, falling back to mmap pre-filter")
+        mode = 'mmap'
+    
+    if mode == 'mmap':
+        return [f for f in swift_files if file_contains_marker(f)]
+    
+    return swift_files
+
+
+def scan_files(swift_files: List[Path], jobs: int = 1) -> Iterator[List[EcosiaCustomization]]:
+    """
+    Scan a list of Swift files, optionally spreading the work over a process pool.
+    
+    Results are yielded lazily in the same order as `swift_files`, so the
+    parallel path produces exactly the same catalog as the serial one.
+    """
+    if jobs <= 1 or len(swift_files) < 2:
+        for swift_file in swift_files:
+            yield scan_file_for_customizations(swift_file)
+        return
+    
+    # Hand out files in chunks to keep inter-process overhead low
+    chunksize = max(1, len(swift_files) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(scan_file_for_customizations, swift_files, chunksize=chunksize)
+
+
+def iter_scan_directory(scan_dir: Path, exclude_dirs: List[str] = None, jobs: int = 1,
+                        cache: Optional[ScanCache] = None,
+                        prefilter: str = 'none') -> Iterator[Tuple[Path, List[EcosiaCustomization]]]:
+    """
+    Recursively scan a directory, yielding (file, customizations) as each file is done.
+    
+    Files are visited in sorted path order, so streamed output is already in
+    catalog order. Files without customizations are not yielded.
     
     Args:
         scan_dir: Directory to scan
         exclude_dirs: List of directory names to exclude (e.g., ['Ecosia', 'EcosiaTests'])
-    
-    Returns:
-        Tuple of (list of customizations, base_path for relative paths)
+        jobs: Number of worker processes to scan with (1 = serial)
+        cache: Optional scan cache; only files whose blob SHA is not cached are parsed
+        prefilter: Candidate selection stage ('none', 'git-grep' or 'mmap')
     """
     if exclude_dirs is None:
         exclude_dirs = ['Ecosia', 'EcosiaTests', 'Derived', 'build', '.build']
     
-    all_customizations = []
     swift_files = []
     
     # Find all Swift files
@@ -247,21 +353,83 @@ def scan_directory(scan_dir: Path, exclude_dirs: List[str] = None) -> tuple[List
         if any(excluded in swift_file.parts for excluded in exclude_dirs):
             continue
         swift_files.append(swift_file)
-    
-    print(f"📁 Scanning {len(swift_files)} Swift files in {scan_dir}...")
-    
-    # Scan each file
+    swift_files.sort(key=str)
+    
+    if jobs > 1:
+        print(f"📁 Scanning {len(swift_files)} Swift files in {scan_dir} ({jobs} jobs)...")
+    else:
+        print(f"📁 Scanning {len(swift_files)} Swift files in {scan_dir}...")
+    
+    if prefilter != 'none':
+        candidates = prefilter_files(swift_files, scan_dir, prefilter)
+        print(f"⏭️  Pre-filter ({prefilter}) skipped {len(swift_files) - len(candidates)} file(s) without markers")
+        swift_files = candidates
+    
+    # Reuse cached results for files whose content hasn't changed
+    cached: Dict[Path, List[EcosiaCustomization]] = {}
+    blob_shas: Dict[Path, str] = {}
+    if cache is not None:
+        blob_shas = hash_files(swift_files)
+        for swift_file, blob_sha in blob_shas.items():
+            hit = cache.get(blob_sha, swift_file)
+            if hit is not None:
+                cached[swift_file] = hit
+    
+    # Merge cached results with freshly parsed ones, keeping path order
+    to_scan = [f for f in swift_files if f not in cached]
+    parsed = zip(to_scan, scan_files(to_scan, jobs))
     for swift_file in swift_files:
-        customizations = scan_file_for_customizations(swift_file)
+        if swift_file in cached:
+            customizations = cached[swift_file]
+        else:
+            _, customizations = next(parsed)
+            if cache is not None and swift_file in blob_shas:
+                cache.put(blob_shas[swift_file], customizations)
+        
         if customizations:
             print(f"   ✓ {swift_file.relative_to(scan_dir)}: {len(customizations)} customization(s)")
-            all_customizations.extend(customizations)
+            yield swift_file, sorted(customizations, key=lambda c: c.line_number)
+    
+    if cache is not None:
+        print(f"♻️  Reused {cache.hits} cached file(s), parsed {len(to_scan)}")
+        cache.save(set(blob_shas.values()))
+
+
+def scan_directory(scan_dir: Path, exclude_dirs: List[str] = None, jobs: int = 1,
+                   cache: Optional[ScanCache] = None,
+                   prefilter: str = 'none') -> tuple[List[EcosiaCustomization], Path]:
+    """
+    Recursively scan a directory for Swift files with Ecosia customizations.
+    
+    Takes the same arguments as `iter_scan_directory`.
+    
+    Returns:
+        Tuple of (list of customizations, base_path for relative paths)
+    """
+    all_customizations = []
+    for _, customizations in iter_scan_directory(scan_dir, exclude_dirs, jobs, cache, prefilter):
+        all_customizations.extend(customizations)
     
     return all_customizations, scan_dir.absolute()
 
 
-def generate_catalog(customizations: List[EcosiaCustomization]) -> Dict[str, Any]:
-    """Generate the JSON catalog structure."""
+def relative_path(file_path: str, base_path: Path) -> str:
+    """Make a scanned path relative to the scan directory (kept as-is if it isn't below it)."""
+    try:
+        return str(Path(file_path).relative_to(base_path))
+    except ValueError:
+        return file_path
+
+
+def catalog_entry(custom: EcosiaCustomization) -> Dict[str, Any]:
+    """Catalog representation of a customization, including its v2 fingerprints."""
+    entry = custom.to_dict()
+    entry['fingerprints'] = fingerprint_customization(entry)
+    return entry
+
+
+def summarize_customizations(customizations: List[EcosiaCustomization]) -> Dict[str, Any]:
+    """Count customizations by type and by file."""
     # Count by type
     removals = [c for c in customizations if c.customization_type == 'removal']
     substitutions = [c for c in customizations if c.customization_type == 'substitution']
@@ -275,9 +443,6 @@ def generate_catalog(customizations: List[EcosiaCustomization]) -> Dict[str, Any
         by_file[custom.file_path].append(custom)
     
     return {
-        'version': '1.0',
-        'generated_at': datetime.now().isoformat(),
-        'total_customizations': len(customizations),
         'summary': {
             'total': len(customizations),
             'removals': len(removals),
@@ -288,10 +453,161 @@ def generate_catalog(customizations: List[EcosiaCustomization]) -> Dict[str, Any
         'by_file': {
             file: len(customs) for file, customs in sorted(by_file.items())
         },
-        'customizations': [c.to_dict() for c in sorted(customizations, key=lambda x: (x.file_path, x.line_number))],
     }
 
 
+def generate_catalog(customizations: List[EcosiaCustomization]) -> Dict[str, Any]:
+    """Generate the JSON catalog structure."""
+    counts = summarize_customizations(customizations)
+    
+    return {
+        'version': CATALOG_VERSION,
+        'generated_at': datetime.now().isoformat(),
+        'fingerprint_algorithm': FINGERPRINT_ALGORITHM,
+        'total_customizations': len(customizations),
+        'summary': counts['summary'],
+        'by_file': counts['by_file'],
+        'customizations': [catalog_entry(c) for c in sorted(customizations, key=lambda x: (x.file_path, x.line_number))],
+    }
+
+
+def decode_lines(data: bytes) -> List[str]:
+    """Split blob content into lines the same way reading the file in text mode would."""
+    return io.StringIO(data.decode('utf-8', errors='replace'), newline=None).readlines()
+
+
+def scan_revision(task: tuple) -> Dict[str, Any]:
+    """
+    Summarize the customizations at one revision without checking it out.
+    
+    `git grep` over the commit's tree selects files containing a marker, and
+    their blobs are streamed through one `git cat-file --batch` process.
+    
+    Args:
+        task: (revision, commit, repo_root, scan_prefix, exclude_dirs)
+    """
+    revision, commit, root, prefix, exclude_dirs = task
+    customizations = []
+    
+    paths = grep_revision(commit, MARKER, prefix or '.', cwd=root) or []
+    with GitCatFile(cwd=root) as cat_file:
+        for path in paths:
+            if not path.endswith('.swift') or any(excluded in Path(path).parts for excluded in exclude_dirs):
+                continue
+            data = cat_file.read(f"{commit}:{path}")
+            if data is not None:
+                customizations.extend(tokenize_customizations(decode_lines(data), path))
+    
+    return {'revision': revision, 'commit': commit, **summarize_customizations(customizations)}
+
+
+def build_timeline(revisions: List[str], scan_dir: Path, exclude_dirs: List[str], jobs: int = 1,
+                   cache_path: Optional[Path] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Summarize customizations at each revision, in the order given.
+    
+    Revisions are scanned in parallel and results are cached per commit, so
+    extending the timeline with a new tag only scans that tag.
+    """
+    root = repo_root(scan_dir)
+    prefix = repo_prefix(scan_dir)
+    if root is None or prefix is None:
+        print(f"❌ Error: {scan_dir} is not inside a git repository")
+        return None
+    
+    cache: Dict[str, Any] = {}
+    if cache_path and cache_path.exists():
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('scanner_version') == SCANNER_VERSION:
+                cache = data.get('entries', {})
+        except Exception as e:
+            print(f"⚠️  Warning: Ignoring unreadable timeline cache {cache_path}: {e}")
+    
+    def cache_key(commit: str) -> str:
+        return f"{commit}:{prefix}:{','.join(sorted(exclude_dirs))}"
+    
+    commits = {}
+    for revision in revisions:
+        commit = resolve_commit(revision, cwd=root)
+        if commit is None:
+            print(f"⚠️  Warning: Skipping unknown revision {revision}")
+            continue
+        commits[revision] = commit
+    
+    tasks = [
+        (revision, commit, root, prefix, exclude_dirs)
+        for revision, commit in commits.items() if cache_key(commit) not in cache
+    ]
+    print(f"🕰️  {len(commits)} revision(s): {len(commits) - len(tasks)} cached, scanning {len(tasks)}...")
+    
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            scanned = list(executor.map(scan_revision, tasks))
+    else:
+        scanned = [scan_revision(task) for task in tasks]
+    
+    for result in scanned:
+        cache[cache_key(result['commit'])] = result
+    
+    if cache_path:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'scanner_version': SCANNER_VERSION, 'entries': cache}, f, ensure_ascii=False)
+    
+    return [dict(cache[cache_key(commit)], revision=revision) for revision, commit in commits.items()]
+
+
+def print_timeline(timeline: List[Dict[str, Any]]):
+    """Print the customization counts per revision."""
+    print("\n" + "="*60)
+    print("🕰️  ECOSIA CUSTOMIZATIONS TIMELINE")
+    print("="*60)
+    print(f"{'Revision':<24} {'Total':>6} {'Rem':>5} {'Sub':>5} {'Add':>5} {'Files':>6}")
+    print("-"*60)
+    for entry in timeline:
+        summary = entry['summary']
+        print(f"{entry['revision'][:24]:<24} {summary['total']:6d} {summary['removals']:5d} "
+              f"{summary['substitutions']:5d} {summary['additions']:5d} {summary['files_affected']:6d}")
+    print("="*60)
+
+
+def write_jsonl_catalog(scanned: Iterator[Tuple[Path, List[EcosiaCustomization]]], output_path: Path,
+                        base_path: Path) -> Dict[str, Any]:
+    """
+    Stream scan results to a JSONL catalog as each file is finished.
+    
+    Only one file's customizations are held in memory at a time. Returns the
+    catalog metadata and counts (everything but the customizations). If
+    nothing was found, `output_path` is left as it was.
+    """
+    writer = JsonlCatalogWriter(str(output_path), {
+        'generated_at': datetime.now().isoformat(),
+        'fingerprint_algorithm': FINGERPRINT_ALGORITHM,
+    })
+    try:
+        for _, customizations in scanned:
+            for custom in customizations:
+                custom.file_path = relative_path(custom.file_path, base_path)
+                writer.write(catalog_entry(custom))
+    except BaseException:
+        writer.abort()
+        raise
+    if not writer.by_file:
+        writer.abort()
+        return dict(writer.meta, total_customizations=0)
+    return writer.close()
+
+
+def print_nothing_found():
+    """Explain an empty scan."""
+    print("\n⚠️  No Ecosia customizations found.")
+    print("   This might indicate:")
+    print("   - Scan directory doesn't contain Firefox code with Ecosia changes")
+    print("   - Customizations use a different comment format")
+    print("   - Customizations are in excluded directories")
+
+
 def print_summary(catalog: Dict[str, Any]):
     """Print a human-readable summary of the catalog."""
     print("\n" + "="*60)
@@ -325,8 +641,24 @@ Examples:
   # Scan with custom output path
   python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --output custom-catalog.json
   
+  # Stream a JSON Lines catalog while scanning (format inferred from the .jsonl suffix)
+  python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --output ecosia-customizations.jsonl
+  
   # Scan and only show summary (no file output)
   python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --no-output
+  
+  # Scan using 8 worker processes
+  python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --jobs 8
+  
+  # Skip marker-free files with git grep before parsing
+  python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --prefilter git-grep
+  
+  # Only re-parse files that changed since the last run
+  python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ --cache .ecosia-scan-cache.json
+  
+  # Patch surface at every upgrade tag, 8 revisions at a time, written as JSON for charting
+  python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/ \
+    --timeline-tags 'firefox-v*' --jobs 8 --timeline-cache .ecosia-timeline-cache.json --timeline-output timeline.json
         """
     )
     
@@ -340,6 +672,12 @@ Examples:
         default='ecosia-customizations.json',
         help='Output JSON file path (default: ecosia-customizations.json)'
     )
+    parser.add_argument(
+        '--format',
+        choices=['json', 'jsonl'],
+        help='Catalog format: one JSON document, or JSON Lines streamed while scanning '
+             '(default: inferred from the --output suffix)'
+    )
     parser.add_argument(
         '--no-output',
         action='store_true',
@@ -351,6 +689,41 @@ Examples:
         default=['Ecosia', 'EcosiaTests', 'Derived', 'build', '.build'],
         help='Directories to exclude from scan (default: Ecosia EcosiaTests Derived build .build)'
     )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of worker processes used to scan files (default: 1, 0 = one per CPU)'
+    )
+    parser.add_argument(
+        '--cache',
+        help='Scan cache file keyed by git blob SHA; unchanged files are not re-parsed'
+    )
+    parser.add_argument(
+        '--prefilter',
+        choices=['none', 'git-grep', 'mmap'],
+        default='none',
+        help='Skip files without an Ecosia marker before parsing them (default: none)'
+    )
+    parser.add_argument(
+        '--timeline',
+        nargs='+',
+        metavar='REV',
+        help='Summarize customizations at these git revisions instead of the working tree'
+    )
+    parser.add_argument(
+        '--timeline-tags',
+        metavar='PATTERN',
+        help="Add every tag matching this glob (oldest first) to the timeline, e.g. 'firefox-v*'"
+    )
+    parser.add_argument(
+        '--timeline-cache',
+        help='Per-revision results cache for timeline mode'
+    )
+    parser.add_argument(
+        '--timeline-output',
+        help='Write the timeline as JSON to this file'
+    )
     
     args = parser.parse_args()
     
@@ -364,9 +737,47 @@ Examples:
         print(f"❌ Error: Not a directory: {scan_dir}")
         return 1
     
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
+    if args.timeline or args.timeline_tags:
+        revisions = list(args.timeline or [])
+        if args.timeline_tags:
+            revisions += list_tags(args.timeline_tags, cwd=scan_dir)
+        if not revisions:
+            print("❌ Error: No revisions to scan")
+            return 1
+        
+        timeline = build_timeline(revisions, scan_dir, args.exclude, jobs=jobs,
+                                  cache_path=Path(args.timeline_cache) if args.timeline_cache else None)
+        if timeline is None:
+            return 1
+        if args.timeline_output:
+            with open(args.timeline_output, 'w', encoding='utf-8') as f:
+                json.dump(timeline, f, indent=2, ensure_ascii=False)
+            print(f"\n📝 Timeline written to: {args.timeline_output}")
+        print_timeline(timeline)
+        return 0
+    
     # Scan for customizations
     print(f"🔍 Scanning for Ecosia customizations in {scan_dir}...\n")
-    customizations, base_path = scan_directory(scan_dir, exclude_dirs=args.exclude)
+    cache = ScanCache(Path(args.cache)) if args.cache else None
+    
+    output_format = args.format or ('jsonl' if Path(args.output).suffix == JSONL_SUFFIX else 'json')
+    if output_format == 'jsonl' and not args.no_output:
+        output_path = Path(args.output)
+        scanned = iter_scan_directory(scan_dir, exclude_dirs=args.exclude, jobs=jobs, cache=cache,
+                                      prefilter=args.prefilter)
+        catalog = write_jsonl_catalog(scanned, output_path, scan_dir.absolute())
+        if not catalog['total_customizations']:
+            print_nothing_found()
+            return 1
+        print(f"\n📝 Catalog written to: {output_path}")
+        print(f"   Size: {output_path.stat().st_size / 1024:.1f} KB")
+        print_summary(catalog)
+        return 0
+    
+    customizations, base_path = scan_directory(scan_dir, exclude_dirs=args.exclude, jobs=jobs, cache=cache,
+                                              prefilter=args.prefilter)
     
     # Make paths relative to base_path
     for custom in customizations:
@@ -376,11 +787,7 @@ Examples:
             pass  # Keep absolute if relative_to fails
     
     if not customizations:
-        print("\n⚠️  No Ecosia customizations found.")
-        print("   This might indicate:")
-        print("   - Scan directory doesn't contain Firefox code with Ecosia changes")
-        print("   - Customizations use a different comment format")
-        print("   - Customizations are in excluded directories")
+        print_nothing_found()
         return 1
     
     # Generate catalog
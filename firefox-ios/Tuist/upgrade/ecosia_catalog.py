@@ -0,0 +1,691 @@
+#!/usr/bin/env python3
+"""
+Ecosia Catalog
+
+Shared catalog format helpers for the upgrade tools.
+
+Catalog v2 stores, next to the raw strings of each customization, a
+fingerprint of every normalized line and one for the whole block:
+
+    "fingerprints": {
+        "context_before": ["3f2a...", ...],
+        "context_after":  [...],
+        "firefox_code":   [...],
+        "ecosia_code":    [...],
+        "block": "9c41..."
+    }
+
+so consumers can locate candidates with hash lookups before falling back to
+fuzzy matching. v1 catalogs are still accepted: fingerprints are computed
+when they are loaded.
+
+A catalog can also be stored in SQLite, with indexes on file, type, comment
+and line fingerprints, or as JSON Lines: a header record, one customization
+per line and a closing summary record, streamed by the scanner as it goes.
+`open_catalog` reads every backend behind one interface; JSONL catalogs are
+read lazily, so filtering by file never loads the whole catalog.
+
+Usage:
+    # Build a SQLite catalog from the JSON one
+    python3 firefox-ios/Tuist/upgrade/ecosia_catalog.py build-sqlite \
+      --catalog ecosia-customizations.json --output ecosia-customizations.sqlite
+
+    # Query it (works on JSON catalogs too)
+    python3 firefox-ios/Tuist/upgrade/ecosia_catalog.py query \
+      --catalog ecosia-customizations.sqlite --file AppDelegate.swift --type substitution
+
+    # Compare two catalog snapshots (e.g. before and after an upgrade)
+    python3 firefox-ios/Tuist/upgrade/ecosia_catalog.py catalog-diff \
+      catalog-v141.json catalog-v147.json
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from collections import deque
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+CATALOG_VERSION = '2.0'
+FINGERPRINT_ALGORITHM = 'blake2b-64'
+
+FINGERPRINTED_FIELDS = ['context_before', 'context_after', 'firefox_code', 'ecosia_code']
+
+JSONL_SUFFIX = '.jsonl'
+
+
+def normalize_line(line: str) -> str:
+    """Normalize a line for comparison (strip whitespace, handle common variations)."""
+    return line.strip()
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def line_fingerprint(line: str) -> str:
+    """Fingerprint of a single normalized line."""
+    return _digest(normalize_line(line))
+
+
+def block_fingerprint(customization: Dict[str, Any]) -> str:
+    """
+    Fingerprint of a customization's content.
+
+    Covers the type, comment and normalized Firefox/Ecosia code, but not the
+    file, line or context, so it stays stable when a customization moves.
+    """
+    parts = [customization['type'], normalize_line(customization['comment'])]
+    for field in ('firefox_code', 'ecosia_code'):
+        parts.append(field)
+        parts.extend(normalize_line(line) for line in customization[field])
+    return _digest('\n'.join(parts))
+
+
+def fingerprint_customization(customization: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the v2 fingerprints for a customization dictionary."""
+    fingerprints: Dict[str, Any] = {
+        field: [line_fingerprint(line) for line in customization.get(field, [])]
+        for field in FINGERPRINTED_FIELDS
+    }
+    fingerprints['block'] = block_fingerprint(customization)
+    return fingerprints
+
+
+def upgrade_catalog(catalog: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Bring a loaded catalog up to the current schema in memory.
+
+    v1 entries get their fingerprints computed; v2 entries are left untouched.
+    """
+    for customization in catalog.get('customizations', []):
+        if 'fingerprints' not in customization:
+            customization['fingerprints'] = fingerprint_customization(customization)
+    return catalog
+
+
+def load_catalog(catalog_path: str) -> Dict[str, Any]:
+    """
+    Load a catalog from any backend (JSON v1/v2, JSONL or SQLite) as a dictionary.
+
+    Raises the underlying exception on failure; callers decide whether a
+    missing catalog is fatal.
+    """
+    with open_catalog(catalog_path) as store:
+        return store.to_dict()
+
+
+def file_matches(path: str, file_filter: str) -> bool:
+    """Match a catalog path against a filter: exact path or a trailing path suffix."""
+    return path == file_filter or path.endswith('/' + file_filter)
+
+
+def file_name(path: str) -> str:
+    """Last component of a path; every path a file filter matches has the filter's."""
+    return path.rsplit('/', 1)[-1]
+
+
+def customization_matches(customization: Dict[str, Any], file: Optional[str] = None,
+                          type: Optional[str] = None, grep: Optional[str] = None) -> bool:
+    """Apply the store query filters to a single customization dictionary."""
+    if file and not file_matches(customization['file'], file):
+        return False
+    if type and customization['type'] != type:
+        return False
+    if grep:
+        haystack = [customization['comment']] + customization['firefox_code'] + customization['ecosia_code']
+        if not any(grep in text for text in haystack):
+            return False
+    return True
+
+
+class CatalogStore:
+    """Common base of the catalog stores: usable as a context manager that closes it."""
+
+    def close(self):
+        """Release the store's resources (nothing to release by default)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonCatalog(CatalogStore):
+    """Catalog store backed by an in-memory JSON catalog."""
+
+    def __init__(self, catalog: Dict[str, Any]):
+        self.catalog = upgrade_catalog(catalog)
+        self._by_file: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for customization in self.catalog.get('customizations', []):
+            self._by_file.setdefault(customization['file'], []).append(customization)
+            self._by_name.setdefault(file_name(customization['file']), []).append(customization)
+
+    def files(self) -> List[str]:
+        """All files that have customizations, sorted."""
+        return sorted(self._by_file)
+
+    def customizations(self, file: Optional[str] = None, type: Optional[str] = None,
+                       grep: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate customizations in catalog order, optionally filtered.
+
+        Filtering by file only looks at entries with the same file name.
+        """
+        candidates = self._by_name.get(file_name(file), []) if file else self.catalog.get('customizations', [])
+        for customization in candidates:
+            if customization_matches(customization, file, type, grep):
+                yield customization
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The full catalog as a dictionary."""
+        return self.catalog
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE customizations (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    comment TEXT NOT NULL,
+    code TEXT NOT NULL,
+    block TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE line_fingerprints (
+    customization_id INTEGER NOT NULL REFERENCES customizations(id),
+    field TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX idx_customizations_file ON customizations(file);
+CREATE INDEX idx_customizations_name ON customizations(name);
+CREATE INDEX idx_customizations_type ON customizations(type);
+CREATE INDEX idx_customizations_comment ON customizations(comment);
+CREATE INDEX idx_customizations_block ON customizations(block);
+CREATE INDEX idx_line_fingerprints_fingerprint ON line_fingerprints(fingerprint);
+"""
+
+
+def build_sqlite(catalog: Dict[str, Any], db_path: str):
+    """Write a catalog (v1 or v2 dictionary) to a new SQLite database."""
+    catalog = upgrade_catalog(catalog)
+    path = Path(db_path)
+    if path.exists():
+        path.unlink()
+
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.executescript(SQLITE_SCHEMA)
+        meta = {k: v for k, v in catalog.items() if k != 'customizations'}
+        meta['version'] = CATALOG_VERSION
+        conn.executemany(
+            'INSERT INTO meta (key, value) VALUES (?, ?)',
+            [(key, json.dumps(value)) for key, value in meta.items()]
+        )
+        for index, c in enumerate(catalog.get('customizations', [])):
+            conn.execute(
+                'INSERT INTO customizations (id, file, name, line, type, comment, code, block, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (index, c['file'], file_name(c['file']), c['line'], c['type'], c['comment'],
+                 '\n'.join(c['firefox_code'] + c['ecosia_code']),
+                 c['fingerprints']['block'], json.dumps(c, ensure_ascii=False))
+            )
+            conn.executemany(
+                'INSERT INTO line_fingerprints (customization_id, field, position, fingerprint) '
+                'VALUES (?, ?, ?, ?)',
+                [(index, field, position, fingerprint)
+                 for field in FINGERPRINTED_FIELDS
+                 for position, fingerprint in enumerate(c['fingerprints'][field])]
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class SqliteCatalog(CatalogStore):
+    """Catalog store backed by a SQLite database (see `build_sqlite`)."""
+
+    def __init__(self, db_path: str):
+        # as_uri() percent-encodes '?', '#' and '%' in the path
+        self.conn = sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True)
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(customizations)')}
+        # Databases built before the name column fall back to scanning by suffix
+        self.has_names = 'name' in columns
+
+    def close(self):
+        self.conn.close()
+
+    def files(self) -> List[str]:
+        """All files that have customizations, sorted."""
+        return [row[0] for row in self.conn.execute('SELECT DISTINCT file FROM customizations ORDER BY file')]
+
+    def customizations(self, file: Optional[str] = None, type: Optional[str] = None,
+                       grep: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate customizations in catalog order, optionally filtered.
+
+        Filtering by file looks up the file name in its index. `grep` is
+        matched per line like the other stores: the query only narrows the
+        rows down, as code lines are stored joined with newlines.
+        """
+        clauses, params = [], []
+        if file:
+            if self.has_names:
+                clauses.append('name = ?')
+                params.append(file_name(file))
+            # Case-sensitive like file_matches (LIKE would ignore ASCII case)
+            clauses.append("(file = ? OR substr(file, -?) = ?)")
+            params += [file, len(file) + 1, '/' + file]
+        if type:
+            clauses.append('type = ?')
+            params.append(type)
+        if grep:
+            clauses.append("(instr(comment, ?) > 0 OR instr(code, ?) > 0)")
+            params += [grep, grep]
+
+        query = 'SELECT data FROM customizations'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        for (data,) in self.conn.execute(query + ' ORDER BY id', params):
+            customization = json.loads(data)
+            if not grep or customization_matches(customization, grep=grep):
+                yield customization
+
+    def with_line_fingerprint(self, fingerprint: str, field: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate customizations that contain a line with the given fingerprint."""
+        query = ('SELECT DISTINCT c.id, c.data FROM line_fingerprints f '
+                 'JOIN customizations c ON c.id = f.customization_id WHERE f.fingerprint = ?')
+        params = [fingerprint]
+        if field:
+            query += ' AND f.field = ?'
+            params.append(field)
+        for _, data in self.conn.execute(query + ' ORDER BY c.id', params):
+            yield json.loads(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The full catalog as a dictionary."""
+        catalog = {key: json.loads(value) for key, value in self.conn.execute('SELECT key, value FROM meta')}
+        catalog['customizations'] = list(self.customizations())
+        return catalog
+
+
+class JsonlCatalogWriter:
+    """
+    Stream a catalog as JSON Lines.
+
+    The first line is a header record, then one customization per line, then
+    a summary record with the counts `print_summary` needs. Lines go to a
+    temporary file that replaces `path` on `close`, so a failed scan never
+    leaves a truncated catalog behind.
+    """
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.file = open(self.tmp_path, 'w', encoding='utf-8')
+        self.meta = dict(meta, version=CATALOG_VERSION, format='jsonl')
+        self.counts = {'removal': 0, 'substitution': 0, 'addition': 0}
+        self.by_file: Dict[str, int] = {}
+        self._write_record(dict(self.meta, record='header'))
+
+    def _write_record(self, record: Dict[str, Any]):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def write(self, customization: Dict[str, Any]):
+        """Append one customization (fingerprints are added if missing)."""
+        if 'fingerprints' not in customization:
+            customization = dict(customization, fingerprints=fingerprint_customization(customization))
+        self._write_record(customization)
+        self.counts[customization['type']] = self.counts.get(customization['type'], 0) + 1
+        self.by_file[customization['file']] = self.by_file.get(customization['file'], 0) + 1
+
+    def close(self) -> Dict[str, Any]:
+        """Write the summary record, move the file into place and return the catalog metadata."""
+        total = sum(self.counts.values())
+        summary = {
+            'total_customizations': total,
+            'summary': {
+                'total': total,
+                'removals': self.counts['removal'],
+                'substitutions': self.counts['substitution'],
+                'additions': self.counts['addition'],
+                'files_affected': len(self.by_file),
+            },
+            'by_file': dict(sorted(self.by_file.items())),
+        }
+        self._write_record(dict(summary, record='summary'))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        return dict(self.meta, **summary)
+
+    def abort(self):
+        """Discard the partially written catalog."""
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def iter_jsonl(catalog_path: str, file: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily iterate the customizations of a JSONL catalog.
+
+    With `file`, lines that can't mention that path are skipped before they
+    are parsed.
+    """
+    # Paths are written unescaped (ensure_ascii=False), so the JSON-escaped
+    # filter must appear verbatim in any matching line
+    needle = json.dumps(file, ensure_ascii=False)[1:-1] if file else None
+    with open(catalog_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if needle and needle not in line:
+                continue
+            record = json.loads(line)
+            if 'record' in record:
+                continue
+            if file and not file_matches(record['file'], file):
+                continue
+            if 'fingerprints' not in record:
+                record['fingerprints'] = fingerprint_customization(record)
+            yield record
+
+
+def read_jsonl_records(catalog_path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Header and summary records of a JSONL catalog (summary is empty if the file is truncated)."""
+    with open(catalog_path, 'rb') as f:
+        header = json.loads(f.readline())
+        # The summary is the last line; read backwards from the end instead of scanning the file
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        block = b''
+        while size > 0 and block.rstrip(b'\n').count(b'\n') < 1:
+            step = min(size, 64 * 1024)
+            size -= step
+            f.seek(size)
+            block = f.read(step) + block
+        last = json.loads(block.rstrip(b'\n').rsplit(b'\n', 1)[-1])
+    header.pop('record', None)
+    if last.pop('record', None) != 'summary':
+        return header, {}
+    return header, last
+
+
+class JsonlCatalog(CatalogStore):
+    """Catalog store backed by a JSON Lines file, read lazily on every query."""
+
+    def __init__(self, catalog_path: str):
+        self.path = catalog_path
+        self.meta, self.summary = read_jsonl_records(catalog_path)
+
+    def files(self) -> List[str]:
+        """All files that have customizations, sorted."""
+        if 'by_file' in self.summary:
+            return sorted(self.summary['by_file'])
+        return sorted({c['file'] for c in iter_jsonl(self.path)})
+
+    def customizations(self, file: Optional[str] = None, type: Optional[str] = None,
+                       grep: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate customizations in catalog order, optionally filtered."""
+        for customization in iter_jsonl(self.path, file):
+            if customization_matches(customization, None, type, grep):
+                yield customization
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The full catalog as a dictionary."""
+        catalog = dict(self.meta, **self.summary)
+        catalog['customizations'] = list(self.customizations())
+        return catalog
+
+
+def is_jsonl_file(path: str) -> bool:
+    """A `.jsonl` suffix, or a first line that is a complete catalog header record."""
+    if Path(path).suffix == JSONL_SUFFIX:
+        return True
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            first = f.readline(4096)
+        return first.rstrip().endswith('}') and json.loads(first).get('record') == 'header'
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def is_sqlite_file(path: str) -> bool:
+    """Check the SQLite file header."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(16) == b'SQLite format 3\x00'
+    except OSError:
+        return False
+
+
+def open_catalog(catalog_path: str):
+    """
+    Open a catalog store for any supported backend (JSON v1/v2, JSONL or SQLite).
+
+    Raises FileNotFoundError if the catalog doesn't exist.
+    """
+    if not Path(catalog_path).exists():
+        raise FileNotFoundError(catalog_path)
+    if is_sqlite_file(catalog_path):
+        return SqliteCatalog(catalog_path)
+    if is_jsonl_file(catalog_path):
+        return JsonlCatalog(catalog_path)
+    with open(catalog_path, 'r', encoding='utf-8') as f:
+        return JsonCatalog(json.load(f))
+
+
+def diff_catalogs(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List]:
+    """
+    Compare two catalog snapshots.
+
+    Customizations are hash-joined in passes, from the strictest key to the
+    loosest, and each pass only sees entries that earlier passes left unpaired:
+
+        1. block fingerprint + file + line     -> unchanged
+        2. block fingerprint + file            -> moved (within the file)
+        3. block fingerprint                   -> moved (to another file)
+        4. file + type + comment               -> changed
+        5. file + context_before fingerprints  -> changed
+
+    Pass 5 skips entries without context_before, which says nothing about
+    them. Whatever is left is added (only in `new`) or removed (only in
+    `old`). Every pass is linear in the number of unpaired entries.
+    """
+    old_left = upgrade_catalog(old).get('customizations', [])
+    new_left = upgrade_catalog(new).get('customizations', [])
+
+    # A key of None leaves the entry out of the pass
+    passes: List[Tuple[str, Callable[[Dict[str, Any]], Any]]] = [
+        ('unchanged', lambda c: (c['fingerprints']['block'], c['file'], c['line'])),
+        ('moved', lambda c: (c['fingerprints']['block'], c['file'])),
+        ('moved', lambda c: c['fingerprints']['block']),
+        ('changed', lambda c: (c['file'], c['type'], normalize_line(c['comment']))),
+        ('changed', lambda c: (c['file'], tuple(c['fingerprints']['context_before']))
+                              if c['fingerprints']['context_before'] else None),
+    ]
+
+    result: Dict[str, List] = {'unchanged': [], 'moved': [], 'changed': [], 'added': [], 'removed': []}
+    for category, key in passes:
+        buckets: Dict[Any, deque] = {}
+        for c in old_left:
+            buckets.setdefault(key(c), deque()).append(c)
+
+        unpaired_new = []
+        for c in new_left:
+            new_key = key(c)
+            bucket = buckets.get(new_key) if new_key is not None else None
+            if bucket:
+                # Pair in catalog order, so repeated identical blocks pair up top to bottom
+                result[category].append((bucket.popleft(), c))
+            else:
+                unpaired_new.append(c)
+
+        old_left = [c for bucket in buckets.values() for c in bucket]
+        new_left = unpaired_new
+
+    result['removed'] = sorted(old_left, key=lambda c: (c['file'], c['line']))
+    result['added'] = sorted(new_left, key=lambda c: (c['file'], c['line']))
+    for category in ('unchanged', 'moved', 'changed'):
+        result[category].sort(key=lambda pair: (pair[1]['file'], pair[1]['line']))
+    return result
+
+
+def location(customization: Dict[str, Any]) -> str:
+    return f"{customization['file']}:{customization['line']}"
+
+
+def print_catalog_diff(diff: Dict[str, List], verbose: bool = False):
+    """Print a human-readable catalog diff."""
+    print("=" * 60)
+    print("📊 CATALOG DIFF")
+    print("=" * 60)
+    print(f"  • Unchanged: {len(diff['unchanged']):4d}")
+    print(f"  • Moved:     {len(diff['moved']):4d}")
+    print(f"  • Changed:   {len(diff['changed']):4d}")
+    print(f"  • Added:     {len(diff['added']):4d}")
+    print(f"  • Removed:   {len(diff['removed']):4d}")
+
+    if diff['moved']:
+        print("\n🔀 Moved:")
+        for old, new in diff['moved']:
+            if old['file'] == new['file']:
+                print(f"  {location(new)}  ({new['line'] - old['line']:+d} lines)  {new['comment']}")
+            else:
+                print(f"  {location(old)} → {location(new)}  {new['comment']}")
+
+    if diff['changed']:
+        print("\n✏️  Changed:")
+        for old, new in diff['changed']:
+            print(f"  {location(old)} → {location(new)}  {new['comment']}")
+
+    for category, icon in (('added', '➕'), ('removed', '➖')):
+        if diff[category]:
+            print(f"\n{icon} {category.capitalize()}:")
+            for c in diff[category]:
+                print(f"  {location(c)}  {c['type']:<12}  {c['comment']}")
+
+    if verbose and diff['unchanged']:
+        print("\n✅ Unchanged:")
+        for _, new in diff['unchanged']:
+            print(f"  {location(new)}  {new['comment']}")
+
+    print("=" * 60)
+
+
+def print_customization(customization: Dict[str, Any]):
+    """Print a one-line description of a customization."""
+    print(f"{location(customization)}  {customization['type']:<12}  {customization['comment']}")
+
+
+def read_store(catalog_path: str):
+    """Open a catalog store, printing an error and returning None on failure."""
+    try:
+        return open_catalog(catalog_path)
+    except FileNotFoundError:
+        print(f"❌ Error: Catalog not found: {catalog_path}")
+    except Exception as e:
+        print(f"❌ Error loading catalog {catalog_path}: {e}")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build, query and compare Ecosia customization catalogs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Build a SQLite catalog from the JSON one
+  python3 firefox-ios/Tuist/upgrade/ecosia_catalog.py build-sqlite --catalog ecosia-customizations.json --output ecosia-customizations.sqlite
+  
+  # All substitutions in AppDelegate.swift
+  python3 firefox-ios/Tuist/upgrade/ecosia_catalog.py query --catalog ecosia-customizations.sqlite --file AppDelegate.swift --type substitution
+  
+  # Customizations mentioning "Glean" in their comment or code, as JSON
+  python3 firefox-ios/Tuist/upgrade/ecosia_catalog.py query --catalog ecosia-customizations.sqlite --grep Glean --json
+  
+  # What changed between two upgrade snapshots
+  python3 firefox-ios/Tuist/upgrade/ecosia_catalog.py catalog-diff catalog-v141.json catalog-v147.json
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build-sqlite', help='Build a SQLite catalog from a JSON or JSONL catalog')
+    build.add_argument('--catalog', required=True, help='Path to ecosia-customizations.json (or .jsonl)')
+    build.add_argument('--output', required=True, help='SQLite file to write')
+
+    query = subparsers.add_parser('query', help='Query a catalog (JSON, JSONL or SQLite)')
+    query.add_argument('--catalog', required=True, help='Path to the catalog')
+    query.add_argument('--file', help='Only customizations in this file (exact path or path suffix)')
+    query.add_argument('--type', choices=['removal', 'substitution', 'addition'], help='Only this type')
+    query.add_argument('--grep', help='Only customizations whose comment or code contains this text')
+    query.add_argument('--json', action='store_true', help='Print matching customizations as JSON lines')
+
+    catalog_diff = subparsers.add_parser('catalog-diff', help='Compare two catalog snapshots')
+    catalog_diff.add_argument('old', help='Older catalog (JSON or SQLite)')
+    catalog_diff.add_argument('new', help='Newer catalog (JSON or SQLite)')
+    catalog_diff.add_argument('--json', action='store_true', help='Print the diff as JSON')
+    catalog_diff.add_argument('--verbose', '-v', action='store_true', help='Also list unchanged customizations')
+
+    args = parser.parse_args()
+
+    if args.command == 'catalog-diff':
+        with ExitStack() as stack:
+            stores = []
+            for path in (args.old, args.new):
+                store = read_store(path)
+                if store is None:
+                    return 1
+                stores.append(stack.enter_context(store))
+            old_catalog, new_catalog = (store.to_dict() for store in stores)
+
+        start = time.perf_counter()
+        diff = diff_catalogs(old_catalog, new_catalog)
+        elapsed = time.perf_counter() - start
+
+        if args.json:
+            print(json.dumps({
+                category: [[old, new] for old, new in entries] if category in ('unchanged', 'moved', 'changed')
+                else entries
+                for category, entries in diff.items()
+            }, indent=2, ensure_ascii=False))
+        else:
+            print_catalog_diff(diff, verbose=args.verbose)
+            print(f"⏱️  Compared in {elapsed * 1000:.0f} ms")
+        return 0
+
+    store = read_store(args.catalog)
+    if store is None:
+        return 1
+    with store:
+        if args.command == 'build-sqlite':
+            catalog = store.to_dict()
+            build_sqlite(catalog, args.output)
+            print(f"📝 SQLite catalog written to: {args.output}")
+            print(f"   Customizations: {len(catalog.get('customizations', []))}")
+            return 0
+
+        count = 0
+        for customization in store.customizations(file=args.file, type=args.type, grep=args.grep):
+            if args.json:
+                print(json.dumps(customization, ensure_ascii=False))
+            else:
+                print_customization(customization)
+            count += 1
+
+        if not args.json:
+            print(f"\n{count} customization(s)")
+        return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
@@ -21,17 +21,26 @@ Usage:
     
     # Use custom catalog
     python3 firefox-ios/Tuist/upgrade/ecosia-conflict-helper --all --catalog my-catalog.json
+
+Conflicts are read from the git index stages (base, ours = Ecosia, theirs =
+Firefox) when git has them, and from the conflict markers otherwise.
 """
 
-import re
-import json
+import os
+import shutil
 import subprocess
+import tempfile
 import argparse
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Iterable, Iterator, Tuple, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
 
+from ecosia_catalog import load_catalog as read_catalog, normalize_line, open_catalog
+from ecosia_git import GitCatFile, conflict_label, merge_file
+from ecosia_matching import AhoCorasick, default_matcher
+from ecosia_merge import merge_lines, split_lines
+
 
 class ConflictType(Enum):
     """Types of conflicts"""
@@ -46,6 +55,7 @@ class ResolutionStrategy(Enum):
     KEEP_ECOSIA = "keep_ecosia"  # Keep Ecosia customization as-is
     UPDATE_COMMENT = "update_comment"  # Update commented Firefox code
     MERGE_BOTH = "merge_both"  # Merge Firefox and Ecosia changes
+    THREE_WAY_MERGE = "three_way_merge"  # Reapply Ecosia's changes to the merge base onto Firefox's
     MANUAL = "manual"  # Requires manual resolution
 
 
@@ -57,17 +67,26 @@ class ConflictRegion:
     ecosia_version: str
     firefox_version: str
     firefox_branch: str
+    end_line: int = 0  # line of the closing >>>>>>> marker
+    base_version: Optional[str] = None  # merge base, with merge.conflictStyle=diff3
     ecosia_customization: Optional[Dict] = None
     conflict_type: ConflictType = ConflictType.UNKNOWN
     resolution_strategy: ResolutionStrategy = ResolutionStrategy.MANUAL
     suggested_resolution: Optional[str] = None
 
 
-def load_catalog(catalog_path: str) -> Dict:
-    """Load the Ecosia customizations catalog."""
+def load_catalog(catalog_path: str, files: Optional[List[str]] = None) -> Dict:
+    """
+    Load the Ecosia customizations catalog (JSON v1/v2, JSONL or SQLite).
+    
+    With `files`, only the customizations of those files are loaded; JSONL
+    and SQLite catalogs are then never read in full.
+    """
     try:
-        with open(catalog_path, 'r') as f:
-            return json.load(f)
+        if files is None:
+            return read_catalog(catalog_path)
+        with open_catalog(catalog_path) as store:
+            return {'customizations': [c for file in files for c in store.customizations(file=file)]}
     except FileNotFoundError:
         print(f"⚠️  Warning: Catalog not found: {catalog_path}")
         print("   Run: python3 firefox-ios/Tuist/upgrade/ecosia-customizations-catalog.py --scan firefox-ios/")
@@ -77,6 +96,90 @@ def load_catalog(catalog_path: str) -> Dict:
         return {'customizations': []}
 
 
+class CatalogIndex:
+    """
+    Catalog lookups for conflict attribution, built once per run.
+
+    Customizations are grouped by file, and each file's comments and
+    non-blank Ecosia lines go into one Aho-Corasick automaton (built on
+    first use), so a conflict is attributed in one pass over each side.
+    For the fuzzy fallback, each file's normalized Ecosia lines are also
+    bucketed by length, so only lines that could be similar get compared.
+    """
+
+    def __init__(self, catalog: Dict):
+        self.by_file: Dict[str, List[Dict]] = {}
+        for custom in catalog['customizations']:
+            self.by_file.setdefault(custom['file'], []).append(custom)
+        # file -> (automaton, [(customization position, is_comment)] per pattern)
+        self.automata: Dict[str, Tuple[AhoCorasick, List[Tuple[int, bool]]]] = {}
+        # file -> {length: [(normalized Ecosia line, customization position)]}
+        self.lengths: Dict[str, Dict[int, List[Tuple[str, int]]]] = {}
+
+    def customizations(self, file_path: str) -> List[Dict]:
+        return self.by_file.get(file_path, [])
+
+    def automaton(self, file_path: str) -> Tuple[AhoCorasick, List[Tuple[int, bool]]]:
+        if file_path not in self.automata:
+            patterns: List[str] = []
+            owners: List[Tuple[int, bool]] = []
+            for position, custom in enumerate(self.customizations(file_path)):
+                patterns.append(custom['comment'])
+                owners.append((position, True))
+                for line in custom['ecosia_code']:
+                    if line.strip():
+                        patterns.append(line.strip())
+                        owners.append((position, False))
+            self.automata[file_path] = (AhoCorasick(patterns), owners)
+        return self.automata[file_path]
+
+    def exact_match(self, conflict: ConflictRegion) -> Optional[Dict]:
+        """
+        First customization (in catalog order) whose comment appears in
+        either side, or any of whose Ecosia lines appears in Ecosia's side.
+        """
+        file_customizations = self.customizations(conflict.file_path)
+        if not file_customizations:
+            return None
+        automaton, owners = self.automaton(conflict.file_path)
+        hits = {owners[found][0] for found in automaton.search(conflict.ecosia_version)}
+        hits.update(owners[found][0] for found in automaton.search(conflict.firefox_version)
+                    if owners[found][1])
+        return file_customizations[min(hits)] if hits else None
+
+    def lines_by_length(self, file_path: str) -> Dict[int, List[Tuple[str, int]]]:
+        if file_path not in self.lengths:
+            buckets: Dict[int, List[Tuple[str, int]]] = {}
+            for position, custom in enumerate(self.customizations(file_path)):
+                for line in custom['ecosia_code']:
+                    expected = normalize_line(line)
+                    if expected:
+                        buckets.setdefault(len(expected), []).append((expected, position))
+            self.lengths[file_path] = buckets
+        return self.lengths[file_path]
+
+    def fuzzy_match(self, conflict: ConflictRegion) -> Optional[Dict]:
+        """
+        First customization (in catalog order) with an Ecosia line at least
+        90% similar to a line of Ecosia's side.
+        
+        Only the length buckets a line can reach the threshold against (see
+        LineMatcher.length_range) are compared.
+        """
+        buckets = self.lines_by_length(conflict.file_path)
+        best = None
+        for line in conflict.ecosia_version.splitlines():
+            if not line.strip():
+                continue
+            actual = normalize_line(line)
+            shortest, longest = default_matcher.length_range(len(actual))
+            for length in range(shortest, longest + 1):
+                for expected, position in buckets.get(length, ()):
+                    if (best is None or position < best) and default_matcher.similar(actual, expected):
+                        best = position
+        return self.customizations(conflict.file_path)[best] if best is not None else None
+
+
 def find_conflicted_files() -> List[str]:
     """Find all files with unresolved merge conflicts."""
     try:
@@ -95,87 +198,201 @@ def find_conflicted_files() -> List[str]:
         return []
 
 
-def extract_conflicts(file_path: str) -> List[ConflictRegion]:
+# Conflict markers are exactly this long; longer runs (e.g. markers of an
+# inner conflict in a recursive merge base) are ordinary content
+MARKER_SIZE = 7
+
+
+def conflict_marker(line: str) -> Optional[str]:
     """
-    Extract conflict regions from a file.
+    The marker character of a conflict marker line ('<', '|', '=' or '>'), else None.
     
-    Parses conflict markers:
+    `<<<<<<<`, `|||||||` and `>>>>>>>` may be followed by a label;
+    `=======` stands alone.
+    """
+    text = line.rstrip('\r\n')
+    char = text[:1]
+    if char not in ('<', '|', '=', '>') or text[:MARKER_SIZE] != char * MARKER_SIZE:
+        return None
+    if len(text) == MARKER_SIZE or (char != '=' and text[MARKER_SIZE] == ' '):
+        return char
+    return None
+
+
+def parse_conflicts(lines: Iterable[str], file_path: str) -> Iterator[ConflictRegion]:
+    """
+    Yield the conflict regions of a file in a single pass over its lines.
+    
+    Handles both conflict styles:
         <<<<<<< HEAD
         ... Ecosia version ...
+        ||||||| merged common ancestors     (diff3 only)
+        ... base version ...
         =======
         ... Firefox version ...
         >>>>>>> firefox-v141.0
+    
+    Line endings (LF or CRLF) are stripped; each version is its lines joined
+    with '\n'. A conflict opened again before it is closed, or closed before
+    its `=======`, is malformed: it is skipped with a warning and parsing
+    goes on with the next marker.
+    """
+    state: Optional[str] = None  # 'ours', 'base' or 'theirs' inside a conflict
+    sides: Dict[str, List[str]] = {}
+    start = 0
+    
+    def skip_malformed():
+        print(f"⚠️  Warning: Skipping malformed conflict markers at {file_path}:{start}")
+    
+    for number, line in enumerate(lines, 1):
+        marker = conflict_marker(line)
+        if marker == '<':
+            if state is not None:
+                skip_malformed()
+            state, start, sides = 'ours', number, {'ours': [], 'theirs': []}
+            continue
+        if state is None:
+            continue
+        
+        if marker == '|' and state == 'ours':
+            state = 'base'
+            sides['base'] = []
+        elif marker == '=' and state in ('ours', 'base'):
+            state = 'theirs'
+        elif marker == '>' and state == 'theirs':
+            base = sides.get('base')
+            yield ConflictRegion(
+                file_path=file_path,
+                start_line=start,
+                ecosia_version='\n'.join(sides['ours']),
+                firefox_version='\n'.join(sides['theirs']),
+                firefox_branch=line.rstrip('\r\n')[MARKER_SIZE + 1:].strip(),
+                end_line=number,
+                base_version='\n'.join(base) if base is not None else None,
+            )
+            state = None
+        elif marker == '>':
+            skip_malformed()
+            state = None
+        else:
+            sides[state].append(line.rstrip('\r\n'))
+    
+    if state is not None:
+        skip_malformed()
+
+
+def extract_conflicts(file_path: str) -> List[ConflictRegion]:
+    """
+    Extract conflict regions from a file (see parse_conflicts).
+    
+    The file is streamed line by line, so line numbers come for free and
+    large files are never held in memory as a whole.
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            return list(parse_conflicts(f, file_path))
     except Exception as e:
         print(f"⚠️  Warning: Could not read {file_path}: {e}")
         return []
+
+
+def merge_index_stages(file_path: str, base: Optional[bytes], ours: bytes, theirs: bytes,
+                       label: str) -> Optional[Tuple[List[str], List[ConflictRegion]]]:
+    """
+    Merge a file's index stages into conflicted content and its conflict regions.
     
-    conflicts = []
-    
-    # Regex to find conflict regions
-    pattern = r'<<<<<<< HEAD\n(.*?)\n=======\n(.*?)\n>>>>>>> (.+?)\n'
+    The stages are merged by `git merge-file`, so the content is exactly what
+    git wrote to the working file and region line numbers refer to it. `base`
+    is None when the file has no merge base (both sides added it).
     
-    # Track line numbers
-    lines_before = 0
-    for match in re.finditer(pattern, content, re.DOTALL):
-        ecosia_version = match.group(1)
-        firefox_version = match.group(2)
-        firefox_branch = match.group(3)
-        
-        # Calculate line number
-        lines_before = content[:match.start()].count('\n')
-        
-        conflicts.append(ConflictRegion(
-            file_path=file_path,
-            start_line=lines_before + 1,
-            ecosia_version=ecosia_version,
-            firefox_version=firefox_version,
-            firefox_branch=firefox_branch,
-        ))
+    Unless the conflict style already shows it, a region's base_version is
+    taken from git's diff3 merge, which doesn't trim lines both sides share.
+    It stays None for regions that trimming split or joined, since their
+    base isn't known. Returns None if git failed.
+    """
+    labels = ('HEAD', 'merged common ancestors', label)
+    merged = merge_file(ours, base or b'', theirs, labels)
+    if merged is None:
+        return None
+    lines = split_lines(merged.decode('utf-8'))
+    conflicts = list(parse_conflicts(lines, file_path))
     
-    return conflicts
+    if base is None:
+        for conflict in conflicts:
+            conflict.base_version = None
+    elif any(conflict.base_version is None for conflict in conflicts):
+        with_base = merge_file(ours, base, theirs, labels, diff3=True)
+        bases: Dict[Tuple[str, str], set] = {}
+        for region in parse_conflicts(split_lines((with_base or b'').decode('utf-8')), file_path):
+            bases.setdefault((region.ecosia_version, region.firefox_version), set()).add(region.base_version)
+        for conflict in conflicts:
+            candidates = bases.get((conflict.ecosia_version, conflict.firefox_version), set())
+            if conflict.base_version is None and len(candidates) == 1:
+                conflict.base_version = next(iter(candidates))
+    return lines, conflicts
+
+
+def read_index_conflicts(files: List[str]) -> Dict[str, Tuple[List[str], List[ConflictRegion]]]:
+    """
+    Conflicts of files read from their index stages instead of the working files.
+    
+    During a merge or rebase git keeps the base, ours (Ecosia, HEAD) and
+    theirs (Firefox) versions of every conflicted path as stages 1, 2 and 3.
+    All files are read through one `git cat-file --batch` process and merged
+    by git again (see merge_index_stages), so marker edits in the working
+    files don't matter. Files without both sides in the index (e.g. deleted
+    on one side) or that aren't UTF-8 are left out.
+    """
+    label = conflict_label() or 'theirs'
+    merged = {}
+    try:
+        with GitCatFile() as reader:
+            for file_path in files:
+                base, ours, theirs = [reader.read(f":{stage}:{file_path}") for stage in (1, 2, 3)]
+                if ours is None or theirs is None:
+                    continue
+                try:
+                    result = merge_index_stages(file_path, base, ours, theirs, label)
+                except UnicodeDecodeError:
+                    continue
+                if result is not None:
+                    merged[file_path] = result
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Warning: Could not read the git index ({e}); parsing conflict markers instead")
+    return merged
 
 
 def find_customization_in_conflict(
     conflict: ConflictRegion,
-    catalog: Dict
+    catalog: Union[Dict, CatalogIndex]
 ) -> Optional[Dict]:
     """
     Find if this conflict involves an Ecosia customization.
     
     Checks if the conflict contains:
     - Ecosia comment markers (// Ecosia: or /* Ecosia:)
-    - Code from known Ecosia customizations
+    - Code from known Ecosia customizations, verbatim or at least 90% similar
+      (e.g. re-indented or slightly edited during an earlier upgrade)
+    
+    Pass a `CatalogIndex` when attributing many conflicts; a plain catalog
+    dict is indexed on every call.
     """
-    # Get customizations for this file
-    file_customizations = [
-        c for c in catalog['customizations']
-        if c['file'] == conflict.file_path
-    ]
+    index = catalog if isinstance(catalog, CatalogIndex) else CatalogIndex(catalog)
+    file_customizations = index.customizations(conflict.file_path)
     
     if not file_customizations:
         return None
     
-    # Check if Ecosia version contains any Ecosia markers
-    for custom in file_customizations:
-        comment = custom['comment']
-        
-        # Simple heuristic: Check if comment text appears in conflict
-        if comment in conflict.ecosia_version or comment in conflict.firefox_version:
-            return custom
-        
-        # Check if any Ecosia code appears in conflict
-        for line in custom['ecosia_code']:
-            if line.strip() and line.strip() in conflict.ecosia_version:
-                return custom
+    # Comment markers or verbatim Ecosia code, in one pass over each side
+    custom = index.exact_match(conflict)
+    if custom:
+        return custom
     
-    return None
+    # Fall back to fuzzy line matching through the shared tiered matcher
+    return index.fuzzy_match(conflict)
 
 
-def analyze_conflict(conflict: ConflictRegion, catalog: Dict) -> ConflictRegion:
+def analyze_conflict(conflict: ConflictRegion, catalog: Union[Dict, CatalogIndex]) -> ConflictRegion:
     """
     Analyze a conflict and determine type and resolution strategy.
     """
@@ -211,9 +428,35 @@ def analyze_conflict(conflict: ConflictRegion, catalog: Dict) -> ConflictRegion:
         conflict.resolution_strategy = ResolutionStrategy.MERGE_BOTH
         conflict.suggested_resolution = generate_addition_resolution(conflict, customization)
     
+    # With the merge base known, an exact merge beats the heuristics above
+    if custom_type in ('substitution', 'addition'):
+        merged = generate_three_way_resolution(conflict)
+        if merged is not None:
+            conflict.resolution_strategy = ResolutionStrategy.THREE_WAY_MERGE
+            conflict.suggested_resolution = merged
+    
     return conflict
 
 
+def generate_three_way_resolution(conflict: ConflictRegion) -> Optional[str]:
+    """
+    Generate resolution by three-way merging the conflict's sides.
+    
+    Strategy: Reapply Ecosia's changes (base → Ecosia) onto Firefox's new
+    code, line by line. Only possible when the base version is known
+    (index stages or diff3 markers) and no Ecosia change touches lines
+    Firefox also changed.
+    """
+    if conflict.base_version is None:
+        return None
+    
+    def lines(text: str) -> List[str]:
+        return text.split('\n') if text else []
+    
+    merged = merge_lines(lines(conflict.base_version), lines(conflict.ecosia_version), lines(conflict.firefox_version))
+    return '\n'.join(merged) if merged is not None else None
+
+
 def generate_removal_resolution(conflict: ConflictRegion, customization: Dict) -> str:
     """
     Generate resolution for REMOVAL conflicts.
@@ -284,6 +527,9 @@ def print_conflict_analysis(conflict: ConflictRegion):
     print(f"\n📝 Current Conflict:")
     print("┌─ Ecosia Version (HEAD) ─────────────────────────────────┐")
     print_indented(conflict.ecosia_version, "│ ", " │")
+    if conflict.base_version is not None:
+        print("├─ Merge Base ─────────────────────────────────────────────┤")
+        print_indented(conflict.base_version, "│ ", " │")
     print("├─ Firefox Version ({}) ─────────────────┤".format(conflict.firefox_branch))
     print_indented(conflict.firefox_version, "│ ", " │")
     print("└──────────────────────────────────────────────────────────┘")
@@ -348,51 +594,81 @@ ADDITION GUIDELINES:
 """)
 
 
-def apply_resolution(conflict: ConflictRegion, dry_run: bool = False) -> bool:
+def write_file_atomic(file_path: str, lines: List[str]):
+    """Write a file via a temporary file in the same directory and an atomic rename."""
+    path = Path(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def apply_resolutions(file_path: str, conflicts: List[ConflictRegion]) -> int:
     """
-    Apply the suggested resolution to the file.
+    Apply the suggested resolutions of one file's conflicts, writing it once.
     
-    Returns True if resolution was applied, False otherwise.
-    """
-    if not conflict.suggested_resolution:
-        return False
+    The working file is read once and its conflict regions located with
+    parse_conflicts. Each resolution replaces the region with the same
+    sides, preferring the one at the conflict's recorded line, so conflicts
+    with identical text each get their own region. The regions are spliced
+    by line offset in one pass, keeping the file's line endings.
     
-    if dry_run:
-        print(f"   [DRY-RUN] Would apply resolution to {conflict.file_path}:{conflict.start_line}")
-        return False
+    Returns the number of resolutions applied.
+    """
+    resolved = [c for c in conflicts if c.suggested_resolution]
+    if not resolved:
+        return 0
     
-    # Read file
     try:
-        with open(conflict.file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            lines = f.readlines()
     except Exception as e:
         print(f"❌ Error reading file: {e}")
-        return False
-    
-    # Build conflict pattern to replace
-    conflict_pattern = f"""<<<<<<< HEAD
-{conflict.ecosia_version}
-=======
-{conflict.firefox_version}
->>>>>>> {conflict.firefox_branch}
-"""
+        return 0
     
-    # Replace with resolution
-    if conflict_pattern in content:
-        new_content = content.replace(conflict_pattern, conflict.suggested_resolution)
-        
-        # Write back
-        try:
-            with open(conflict.file_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            print(f"   ✅ Applied resolution to {conflict.file_path}:{conflict.start_line}")
-            return True
-        except Exception as e:
-            print(f"❌ Error writing file: {e}")
-            return False
-    else:
-        print(f"⚠️  Could not find exact conflict pattern (file may have changed)")
-        return False
+    regions: Dict[Tuple[str, str], List[ConflictRegion]] = {}
+    for region in parse_conflicts(lines, file_path):
+        regions.setdefault((region.ecosia_version, region.firefox_version), []).append(region)
+    
+    splices: List[Tuple[ConflictRegion, str]] = []
+    for conflict in resolved:
+        candidates = regions.get((conflict.ecosia_version, conflict.firefox_version), [])
+        region = next((r for r in candidates if r.start_line == conflict.start_line),
+                      candidates[0] if candidates else None)
+        if region is None:
+            print(f"⚠️  Could not find conflict {file_path}:{conflict.start_line} (file may have changed)")
+            continue
+        candidates.remove(region)
+        splices.append((region, conflict.suggested_resolution))
+    
+    if not splices:
+        return 0
+    
+    output: List[str] = []
+    position = 0
+    for region, resolution in sorted(splices, key=lambda splice: splice[0].start_line):
+        output.extend(lines[position:region.start_line - 1])
+        closing = lines[region.end_line - 1]
+        newline = '\r\n' if closing.endswith('\r\n') else '\n'
+        text = newline.join(resolution.split('\n'))
+        output.append(text + newline if closing.endswith('\n') else text)
+        position = region.end_line
+    output.extend(lines[position:])
+    
+    try:
+        write_file_atomic(file_path, output)
+    except Exception as e:
+        print(f"❌ Error writing file: {e}")
+        return 0
+    
+    for region, _ in splices:
+        print(f"   ✅ Applied resolution to {file_path}:{region.start_line}")
+    return len(splices)
 
 
 def main():
@@ -444,6 +720,11 @@ Examples:
         action='store_true',
         help='Automatically apply suggested resolutions (USE WITH CAUTION)'
     )
+    parser.add_argument(
+        '--from-markers',
+        action='store_true',
+        help='Parse conflict markers in the working files instead of reading the git index stages'
+    )
     parser.add_argument(
         '--summary-only',
         action='store_true',
@@ -452,9 +733,6 @@ Examples:
     
     args = parser.parse_args()
     
-    # Load catalog
-    catalog = load_catalog(args.catalog)
-    
     # Get files to analyze
     if args.file:
         files = [args.file]
@@ -468,12 +746,23 @@ Examples:
             print("   - Run 'git status' to check")
             return 0
     
+    # Load catalog entries for the conflicted files only, indexed by file
+    catalog = CatalogIndex(load_catalog(args.catalog, files))
+    
     print(f"🔍 Analyzing {len(files)} file(s) with conflicts...\n")
     
+    # Read conflicts from the index stages where git has them, markers otherwise
+    index_conflicts = {} if args.from_markers else read_index_conflicts(files)
+    if index_conflicts:
+        print(f"📚 Read {len(index_conflicts)} file(s) from the git index stages\n")
+    
     # Analyze all conflicts
     all_conflicts = []
     for file_path in files:
-        conflicts = extract_conflicts(file_path)
+        if file_path in index_conflicts:
+            conflicts = index_conflicts[file_path][1]
+        else:
+            conflicts = extract_conflicts(file_path)
         for conflict in conflicts:
             analyzed = analyze_conflict(conflict, catalog)
             all_conflicts.append(analyzed)
@@ -504,7 +793,10 @@ Examples:
         print(f"  • Addition Context Changed: {addition_count}")
         
         auto_resolvable = len([c for c in ecosia_conflicts if c.suggested_resolution])
+        three_way_count = len([c for c in ecosia_conflicts
+                               if c.resolution_strategy == ResolutionStrategy.THREE_WAY_MERGE])
         print(f"\nAuto-Resolvable: {auto_resolvable}/{len(ecosia_conflicts)}")
+        print(f"  • Three-Way Merged: {three_way_count}")
     
     print("="*70)
     print()
@@ -522,10 +814,11 @@ Examples:
         print("🔧 APPLYING RESOLUTIONS")
         print("="*70)
         
-        applied_count = 0
+        # One read and one write per file
+        by_file: Dict[str, List[ConflictRegion]] = {}
         for conflict in ecosia_conflicts:
-            if apply_resolution(conflict, dry_run=False):
-                applied_count += 1
+            by_file.setdefault(conflict.file_path, []).append(conflict)
+        applied_count = sum(apply_resolutions(file_path, conflicts) for file_path, conflicts in by_file.items())
         
         print(f"\n✅ Applied {applied_count} automatic resolutions")
         print(f"⚠️  {len(all_conflicts) - applied_count} conflicts require manual resolution")
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Ecosia Git Helpers
+
+Small wrappers around git plumbing commands shared by the upgrade tools.
+Everything here degrades gracefully when git is not available, so the tools
+keep working on plain directory trees.
+"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def git_blob_sha(data: bytes) -> str:
+    """Compute the git blob SHA-1 of raw file content (same as `git hash-object --no-filters`)."""
+    header = f"blob {len(data)}\0".encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def hash_files(paths: List[Path]) -> Dict[Path, str]:
+    """
+    Compute git blob SHAs for a list of files.
+
+    Uses a single `git hash-object --stdin-paths` call for the whole list and
+    falls back to hashing in Python if git is unavailable.
+    """
+    if not paths:
+        return {}
+
+    try:
+        result = subprocess.run(
+            ['git', 'hash-object', '--no-filters', '--stdin-paths'],
+            input='\n'.join(str(p) for p in paths) + '\n',
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        shas = result.stdout.split()
+        if len(shas) == len(paths):
+            return dict(zip(paths, shas))
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        pass
+
+    shas = {}
+    for path in paths:
+        try:
+            shas[path] = git_blob_sha(Path(path).read_bytes())
+        except OSError:
+            continue
+    return shas
+
+
+def grep_files(fixed_string: str, directory: Path) -> Optional[Set[Path]]:
+    """
+    List files under `directory` containing `fixed_string`, using `git grep -l`.
+
+    Searches every file in the working tree, tracked, untracked and ignored
+    alike, as a directory walk would. Returns paths joined onto `directory`,
+    or None if git grep can't be used here.
+    """
+    try:
+        result = subprocess.run(
+            ['git', '-C', str(directory), 'grep', '-l', '-z', '--untracked', '--no-exclude-standard',
+             '-F', fixed_string, '--', '.'],
+            capture_output=True,
+            text=True
+        )
+    except FileNotFoundError:
+        return None
+
+    # Exit code 1 means "no matches"; anything else is an error
+    if result.returncode not in (0, 1):
+        return None
+    return {directory / name for name in result.stdout.split('\0') if name}
+
+
+def run_git(args: List[str], cwd: Optional[Path] = None, input: Optional[str] = None,
+            env: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """Run a git command and return its stdout, or None if it failed."""
+    try:
+        result = subprocess.run(
+            ['git'] + args,
+            cwd=str(cwd) if cwd else None,
+            input=input,
+            env={**os.environ, **env} if env else None,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return result.stdout
+
+
+def repo_root(path: Path) -> Optional[Path]:
+    """Top-level directory of the repository containing `path`."""
+    output = run_git(['rev-parse', '--show-toplevel'], cwd=path)
+    return Path(output.strip()) if output else None
+
+
+def repo_prefix(path: Path) -> Optional[str]:
+    """Path of directory `path` relative to its repository root ('' at the root)."""
+    output = run_git(['rev-parse', '--show-prefix'], cwd=path)
+    return output.strip() if output is not None else None
+
+
+def resolve_commit(revision: str, cwd: Optional[Path] = None) -> Optional[str]:
+    """Resolve a revision (tag, branch, SHA) to a commit SHA."""
+    output = run_git(['rev-parse', '--verify', '--quiet', f"{revision}^{{commit}}"], cwd=cwd)
+    return output.strip() if output else None
+
+
+def list_tags(pattern: str, cwd: Optional[Path] = None) -> List[str]:
+    """Tags matching a glob pattern, oldest first."""
+    output = run_git(['tag', '--list', '--sort=creatordate', pattern], cwd=cwd)
+    return output.split() if output else []
+
+
+def conflict_label(cwd: Optional[Path] = None) -> Optional[str]:
+    """
+    Name of the commit being merged, rebased or cherry-picked (e.g. a tag).
+
+    This is what git writes after `>>>>>>>`; None outside of those operations.
+    """
+    for head in ('MERGE_HEAD', 'REBASE_HEAD', 'CHERRY_PICK_HEAD'):
+        if resolve_commit(head, cwd) is None:
+            continue
+        output = run_git(['name-rev', '--name-only', '--always', head], cwd=cwd)
+        if output:
+            return output.strip().removeprefix('tags/').removesuffix('^0')
+    return None
+
+
+def grep_revision(revision: str, fixed_string: str, pathspec: str,
+                  cwd: Optional[Path] = None) -> Optional[List[str]]:
+    """
+    List files at `revision` containing `fixed_string`, straight from git objects.
+
+    Returns repository-relative paths, or None if the revision can't be searched.
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'grep', '-l', '-z', '-F', fixed_string, revision, '--', pathspec],
+            cwd=str(cwd) if cwd else None,
+            capture_output=True,
+            text=True
+        )
+    except FileNotFoundError:
+        return None
+
+    if result.returncode not in (0, 1):
+        return None
+    # Matches are reported as "<revision>:<path>"
+    prefix = f"{revision}:"
+    return [name[len(prefix):] for name in result.stdout.split('\0') if name.startswith(prefix)]
+
+
+def detect_renames(old_revision: str, new_revision: str, cwd: Optional[Path] = None) -> Dict[str, List[str]]:
+    """
+    Files renamed or copied between two revisions (`git diff -M -C --name-status`).
+
+    Paths are relative to `cwd`. Returns {old_path: [new_path, ...]}, renames
+    before copies, or an empty mapping if the revisions can't be compared.
+    """
+    output = run_git(['diff', '-M', '-C', '--name-status', '-z', '--relative', old_revision, new_revision], cwd=cwd)
+    if not output:
+        return {}
+
+    renames: Dict[str, List[str]] = {}
+    copies: Dict[str, List[str]] = {}
+    fields = output.split('\0')
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i]
+        if status[0] in 'RC':
+            # "<status>\0<old>\0<new>"
+            target = renames if status[0] == 'R' else copies
+            target.setdefault(fields[i + 1], []).append(fields[i + 2])
+            i += 3
+        else:
+            i += 2
+    for old_path, new_paths in copies.items():
+        renames.setdefault(old_path, []).extend(new_paths)
+    return renames
+
+
+def tree_entries(revision: str, cwd: Optional[Path] = None) -> Optional[Dict[str, Tuple[str, str]]]:
+    """
+    Every blob in the tree of `revision`: {repo_path: (mode, blob_sha)}.
+
+    Paths are relative to the repository root. Returns None if the revision
+    can't be read.
+    """
+    output = run_git(['ls-tree', '-r', '-z', '--full-tree', revision], cwd=cwd)
+    if output is None:
+        return None
+
+    entries = {}
+    for record in output.split('\0'):
+        if not record:
+            continue
+        # "<mode> <type> <sha>\t<path>"
+        info, path = record.split('\t', 1)
+        mode, kind, sha = info.split()
+        if kind == 'blob':
+            entries[path] = (mode, sha)
+    return entries
+
+
+def write_blobs(contents: List[bytes], cwd: Optional[Path] = None) -> Optional[List[str]]:
+    """
+    Store contents as blobs in the object database (`git hash-object -w`).
+
+    All blobs are written with a single git call. Returns their SHAs in
+    order, or None if they couldn't be written.
+    """
+    if not contents:
+        return []
+
+    with tempfile.TemporaryDirectory(prefix='ecosia-blobs-') as tmp_dir:
+        paths = []
+        for n, data in enumerate(contents):
+            path = Path(tmp_dir) / str(n)
+            path.write_bytes(data)
+            paths.append(str(path))
+        output = run_git(['hash-object', '-w', '--no-filters', '--stdin-paths'], cwd=cwd,
+                         input='\n'.join(paths) + '\n')
+
+    shas = output.split() if output else []
+    return shas if len(shas) == len(contents) else None
+
+
+def commit_tree(parent: str, updates: Dict[str, Tuple[str, str]], message: str,
+                cwd: Optional[Path] = None) -> Optional[str]:
+    """
+    Commit `parent`'s tree with some blobs replaced, without touching the worktree.
+
+    `updates` maps repository-relative paths to (mode, blob_sha). The tree is
+    built in a temporary index file (read-tree, update-index, write-tree), so
+    neither the real index nor the working tree change. Returns the new
+    commit SHA, or None if git failed.
+    """
+    with tempfile.TemporaryDirectory(prefix='ecosia-index-') as tmp_dir:
+        env = {'GIT_INDEX_FILE': str(Path(tmp_dir) / 'index')}
+        if run_git(['read-tree', parent], cwd=cwd, env=env) is None:
+            return None
+        index_info = ''.join(f"{mode} {sha}\t{path}\n" for path, (mode, sha) in sorted(updates.items()))
+        if run_git(['update-index', '--index-info'], cwd=cwd, input=index_info, env=env) is None:
+            return None
+        tree = run_git(['write-tree'], cwd=cwd, env=env)
+    if tree is None:
+        return None
+
+    commit = run_git(['commit-tree', tree.strip(), '-p', parent, '-m', message], cwd=cwd)
+    return commit.strip() if commit else None
+
+
+def merge_file(ours: bytes, base: bytes, theirs: bytes, labels: Tuple[str, str, str],
+               diff3: bool = False, cwd: Optional[Path] = None) -> Optional[bytes]:
+    """
+    Three-way merge of file contents with `git merge-file -p`.
+
+    The result is what `git merge` writes to the working file: git's own
+    diff, with conflict markers in the repository's merge.conflictStyle (or
+    always with the base section, given `diff3`). `labels` name the ours,
+    base and theirs sides. Returns None if git failed.
+    """
+    with tempfile.TemporaryDirectory(prefix='ecosia-merge-') as tmp_dir:
+        paths = []
+        for name, data in zip(('ours', 'base', 'theirs'), (ours, base, theirs)):
+            path = Path(tmp_dir) / name
+            path.write_bytes(data)
+            paths.append(str(path))
+        args = ['git', 'merge-file', '-p'] + (['--diff3'] if diff3 else [])
+        for label in labels:
+            args += ['-L', label]
+        try:
+            result = subprocess.run(args + paths, cwd=str(cwd) if cwd else None, capture_output=True)
+        except FileNotFoundError:
+            return None
+
+    # The exit code is the number of conflicts (at most 127); errors are negative
+    if not 0 <= result.returncode <= 127:
+        return None
+    return result.stdout
+
+
+class GitCatFile:
+    """
+    Persistent `git cat-file --batch` process.
+
+    Reading many blobs through one process avoids spawning git per object.
+    Object names use the usual `<rev>:<path>` or `:<stage>:<path>` syntax.
+    """
+
+    def __init__(self, cwd: Optional[Path] = None):
+        self.process = subprocess.Popen(
+            ['git', 'cat-file', '--batch'],
+            cwd=str(cwd) if cwd else None,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+
+    def read(self, object_name: str) -> Optional[bytes]:
+        """Return the content of an object, or None if it doesn't exist."""
+        self.process.stdin.write(object_name.encode('utf-8') + b'\n')
+        self.process.stdin.flush()
+
+        header = self.process.stdout.readline().rstrip(b'\n')
+        if not header or header.endswith(b' missing') or header.endswith(b' ambiguous'):
+            return None
+        # "<sha> <type> <size>"
+        data = self.process.stdout.read(int(header.split()[2]))
+        self.process.stdout.read(1)  # trailing newline
+        return data
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def __enter__(self) -> 'GitCatFile':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
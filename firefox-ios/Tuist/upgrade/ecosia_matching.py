@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Ecosia Matching
+
+Tiered fuzzy line comparison shared by the upgrade tools.
+
+`SequenceMatcher.ratio()` is expensive, so each comparison goes through
+cheaper filters first and stops at the first one that decides it:
+
+    1. equal        identical lines are always similar
+    2. length       2 * min(len) / (len + len), i.e. real_quick_ratio(),
+                    computed without building a SequenceMatcher
+    3. quick_ratio  upper bound from the shared character multiset
+    4. ratio        the full comparison
+
+Every tier after the first is an upper bound of the next, so the result is
+the same as calling `ratio()` directly. Results are memoized per
+(actual, expected) pair, and `LineMatcher.counters` records how many
+comparisons each tier decided.
+
+`AhoCorasick` answers the exact counterpart, "which of these strings occur
+in this text?", in one pass over the text however many strings there are.
+"""
+
+import math
+from collections import deque
+from difflib import SequenceMatcher
+from typing import Dict, List, Set, Tuple
+
+
+SIMILARITY_THRESHOLD = 0.9
+
+TIERS = ['memoized', 'equal', 'length', 'quick_ratio', 'ratio_rejected', 'ratio_accepted']
+
+
+class LineMatcher:
+    """Decide whether two (normalized) lines are at least `threshold` similar."""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, max_memo: int = 200_000):
+        self.threshold = threshold
+        self.max_memo = max_memo
+        self.memo: Dict[Tuple[str, str], bool] = {}
+        self.counters: Dict[str, int] = {tier: 0 for tier in TIERS}
+
+    def lengths_could_match(self, actual: str, expected: str) -> bool:
+        """The length tier: 2 * min(len) / (len + len) reaches the threshold."""
+        return 2.0 * min(len(actual), len(expected)) / (len(actual) + len(expected)) >= self.threshold
+
+    def length_range(self, length: int) -> Tuple[int, int]:
+        """
+        Shortest and longest lengths that can pass the length tier against a
+        line of `length`: [n * t / (2 - t), n * (2 - t) / t], rounded outwards.
+        """
+        return (math.floor(length * self.threshold / (2 - self.threshold)),
+                math.ceil(length * (2 - self.threshold) / self.threshold))
+
+    def could_match(self, actual: str, expected: str) -> bool:
+        """
+        Cheap tiers only: can the pair reach the threshold at all?
+
+        A pair ruled out here is counted as decided by the length tier, so
+        callers that filter with it before calling `similar()` keep the
+        counters complete.
+        """
+        if actual == expected or self.lengths_could_match(actual, expected):
+            return True
+        self.counters['length'] += 1
+        return False
+
+    def similar(self, actual: str, expected: str) -> bool:
+        """Whether SequenceMatcher(None, actual, expected).ratio() >= threshold."""
+        if actual == expected:
+            self.counters['equal'] += 1
+            return True
+
+        key = (actual, expected)
+        cached = self.memo.get(key)
+        if cached is not None:
+            self.counters['memoized'] += 1
+            return cached
+
+        if not self.lengths_could_match(actual, expected):
+            self.counters['length'] += 1
+            result = False
+        else:
+            matcher = SequenceMatcher(None, actual, expected)
+            if matcher.quick_ratio() < self.threshold:
+                self.counters['quick_ratio'] += 1
+                result = False
+            elif matcher.ratio() < self.threshold:
+                self.counters['ratio_rejected'] += 1
+                result = False
+            else:
+                self.counters['ratio_accepted'] += 1
+                result = True
+
+        if len(self.memo) >= self.max_memo:
+            self.memo.clear()
+        self.memo[key] = result
+        return result
+
+    def merge_counters(self, counters: Dict[str, int]):
+        """Add counters collected elsewhere (e.g. in a worker process)."""
+        for tier, count in counters.items():
+            self.counters[tier] = self.counters.get(tier, 0) + count
+
+    def report(self) -> str:
+        """One-line summary of which tier decided how many comparisons."""
+        total = sum(self.counters.values())
+        parts = ', '.join(f"{tier} {self.counters[tier]}" for tier in TIERS)
+        return f"{total} line comparison(s): {parts}"
+
+
+# Shared by every tool in the process
+default_matcher = LineMatcher()
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton: finds which of many patterns occur in a text.
+
+    Same answer as `{i for i, p in enumerate(patterns) if p in text}`, but
+    in a single pass over the text.
+    """
+
+    def __init__(self, patterns: List[str]):
+        # Trie of the patterns; node 0 is the root
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                child = self.goto[node].get(char)
+                if child is None:
+                    child = self.goto[node][char] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = child
+            self.output[node].append(pattern_id)
+
+        # Failure links, breadth first: the longest proper suffix that is also
+        # in the trie (the root's children fail to the root)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child].extend(self.output[self.fail[child]])
+
+    def search(self, text: str) -> Set[int]:
+        """Ids (positions in `patterns`) of the patterns occurring in `text`."""
+        found = set(self.output[0])  # empty patterns occur everywhere
+        node = 0
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            if self.output[node]:
+                found.update(self.output[node])
+        return found
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Ecosia Merge
+
+Line-based three-way merge shared by the upgrade tools.
+
+`merge_lines` resolves a conflict git reported: it reapplies both sides'
+individual changes to the base as long as no two of them touch the same
+base lines, so edits to adjacent lines merge cleanly. Conflicts themselves
+come from git (`git merge-file`, see ecosia_git.merge_file), not from here.
+
+Lines are compared exactly, line endings included.
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+# A change to the base: (base_start, base_end, replacement lines)
+Edit = Tuple[int, int, List[str]]
+
+
+def split_lines(text: str) -> List[str]:
+    """Split text into lines on '\\n' only, keeping line endings (as git does)."""
+    return re.findall(r'[^\n]*\n|[^\n]+$', text)
+
+
+def edits(base: List[str], other: List[str]) -> List[Edit]:
+    """The changes turning `base` into `other`, in base order."""
+    matcher = SequenceMatcher(None, base, other, autojunk=False)
+    return [(i1, i2, other[j1:j2]) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def edits_overlap(a: Edit, b: Edit) -> bool:
+    """
+    Whether two changes touch the same base lines.
+
+    An insertion overlaps a replaced range only if it falls strictly inside
+    it; at either end it simply goes before or after. Two insertions at the
+    same place overlap, since their order is ambiguous.
+    """
+    a_start, a_end, _ = a
+    b_start, b_end, _ = b
+    if a_start == a_end and b_start == b_end:
+        return a_start == b_start
+    if a_start == a_end:
+        return b_start < a_start < b_end
+    if b_start == b_end:
+        return a_start < b_start < a_end
+    return a_start < b_end and b_start < a_end
+
+
+def merge_lines(base: List[str], ours: List[str], theirs: List[str]) -> Optional[List[str]]:
+    """
+    Reapply both sides' changes to `base`, or None if any two of them overlap.
+
+    Changes made identically on both sides are applied once.
+    """
+    ours_edits = edits(base, ours)
+    theirs_edits = [edit for edit in edits(base, theirs) if edit not in ours_edits]
+    for ours_edit in ours_edits:
+        if any(edits_overlap(ours_edit, theirs_edit) for theirs_edit in theirs_edits):
+            return None
+
+    merged: List[str] = []
+    position = 0
+    # An insertion sorts before a range starting at the same line
+    for start, end, replacement in sorted(ours_edits + theirs_edits, key=lambda edit: (edit[0], edit[1])):
+        merged.extend(base[position:start])
+        merged.extend(replacement)
+        position = end
+    merged.extend(base[position:])
+    return merged
@@ -0,0 +1,815 @@
+"""
+Test suite for apply-ecosia-customizations.py
+
+- Given: a Firefox file and catalog customizations for it
+- Expect: all customizations applied bottom-up in one read and one write
+- Expect: dry-run leaves the file untouched
+- Expect: parallel apply gives the same files and results, in the same order
+- Expect: reruns reuse cached plans instead of matching again
+- Expect: indexed context matching finds the same lines as the window scan
+- Expect: customizations that drifted beyond the window are relocated
+- Expect: additions only relocate on distinctive context, within a bounded drift
+- Expect: overlapping customizations are skipped before the file is rewritten
+- Expect: customizations follow files renamed or split upstream
+- Expect: diff mode streams a patch that `git apply` accepts, without writing
+- Expect: tree mode commits the customized files of a revision without a checkout
+- Expect: verify mode reports missing and drifted customizations without writing
+"""
+
+import os
+import time
+import random
+import shutil
+import hashlib
+import subprocess
+import importlib.util
+import json
+import pytest
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import List
+
+# Import the module we're testing (its file name isn't a valid module name)
+import sys
+sys.path.insert(0, str(Path(__file__).parent))
+
+_spec = importlib.util.spec_from_file_location(
+    'apply_ecosia_customizations',
+    Path(__file__).parent / 'apply-ecosia-customizations.py'
+)
+apply_tool = importlib.util.module_from_spec(_spec)
+# Registered so worker processes can unpickle its functions
+sys.modules[_spec.name] = apply_tool
+_spec.loader.exec_module(apply_tool)
+
+Customization = apply_tool.Customization
+apply_file = apply_tool.apply_file
+find_context_match = apply_tool.find_context_match
+
+
+# ============================================================================
+# Test Fixtures
+# ============================================================================
+
+FIREFOX_SOURCE = """import Foundation
+import Shared
+import Glean
+import Common
+
+class AppDelegate {
+    let logger = DefaultLogger.shared
+    lazy var themeManager = DefaultThemeManager()
+
+    func application() {
+        start()
+    }
+}
+"""
+
+
+@pytest.fixture
+def firefox_file(tmp_path) -> Path:
+    """A clean Firefox file on disk."""
+    path = tmp_path / 'AppDelegate.swift'
+    path.write_text(FIREFOX_SOURCE)
+    return path
+
+
+@pytest.fixture
+def customizations(firefox_file) -> List[Customization]:
+    """A removal near the top and a substitution further down."""
+    return [
+        Customization(
+            file=str(firefox_file), line=3, type='removal', comment='Remove Glean',
+            firefox_code=['import Glean'], ecosia_code=[],
+            context_before=['import Foundation', 'import Shared'], context_after=['import Common'],
+        ),
+        Customization(
+            file=str(firefox_file), line=8, type='substitution', comment="Swap Theme Manager with Ecosia's",
+            firefox_code=['lazy var themeManager = DefaultThemeManager()'],
+            ecosia_code=['    lazy var themeManager = EcosiaThemeManager()'],
+            context_before=['class AppDelegate {', '    let logger = DefaultLogger.shared'], context_after=[''],
+        ),
+    ]
+
+
+# ============================================================================
+# Test: Per-file batched apply
+# ============================================================================
+
+def test_apply_file_applies_all_customizations_in_one_write(firefox_file, customizations, monkeypatch):
+    """
+    GIVEN two customizations in the same file
+    WHEN the file is applied
+    THEN both should succeed and the file should be written exactly once
+    """
+    # Arrange
+    writes = []
+    write_file_atomic = apply_tool.write_file_atomic
+    monkeypatch.setattr(apply_tool, 'write_file_atomic',
+                        lambda path, lines: writes.append(path) or write_file_atomic(path, lines))
+
+    # Act
+    results = apply_file(str(firefox_file), customizations)
+
+    # Assert
+    assert [(r.success, r.type, r.line) for r in results] == [(True, 'substitution', 8), (True, 'removal', 3)]
+    assert writes == [str(firefox_file)]
+    content = firefox_file.read_text()
+    assert '// Ecosia: Remove Glean\n// Firefox: import Glean\n' in content
+    assert '    // Firefox: lazy var themeManager = DefaultThemeManager()\n' in content
+    assert '    lazy var themeManager = EcosiaThemeManager()\n' in content
+    assert list(firefox_file.parent.iterdir()) == [firefox_file]
+
+
+def test_apply_file_dry_run_does_not_write(firefox_file, customizations):
+    """
+    GIVEN customizations for a file
+    WHEN the file is applied in dry-run mode
+    THEN the results should be reported but the file left untouched
+    """
+    results = apply_file(str(firefox_file), customizations, dry_run=True)
+
+    assert all(r.success for r in results)
+    assert firefox_file.read_text() == FIREFOX_SOURCE
+
+
+def test_apply_file_reports_missing_file(tmp_path, customizations):
+    """
+    GIVEN a catalog entry for a file that doesn't exist
+    WHEN the file is applied
+    THEN every customization should fail with the read error
+    """
+    results = apply_file(str(tmp_path / 'Missing.swift'), customizations)
+
+    assert [r.success for r in results] == [False, False]
+    assert all(r.message.startswith('Exception:') for r in results)
+
+
+def test_parallel_apply_matches_serial_apply(tmp_path, customizations):
+    """
+    GIVEN the same customizations for several files, in two identical trees
+    WHEN one tree is applied serially and the other with a process pool
+    THEN results should come back in the same order and the files should be identical
+    """
+    # Arrange
+    def make_tree(root: Path):
+        files_map = {}
+        for n in range(6):
+            path = root / f"File{n}.swift"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(FIREFOX_SOURCE)
+            files_map[str(path)] = [
+                Customization(**dict(vars(c), file=str(path))) for c in customizations
+            ]
+        return files_map
+
+    serial_map, parallel_map = make_tree(tmp_path / 'serial'), make_tree(tmp_path / 'parallel')
+
+    # Act
+    serial = list(apply_tool.apply_files(serial_map, jobs=1))
+    parallel = list(apply_tool.apply_files(parallel_map, jobs=3))
+
+    # Assert
+    def summary(applied, root):
+        return [(Path(path).relative_to(root), [(r.success, r.line, r.type) for r in results])
+                for path, _, results, _ in applied]
+    assert summary(parallel, tmp_path / 'parallel') == summary(serial, tmp_path / 'serial')
+    for n in range(6):
+        assert (tmp_path / 'parallel' / f"File{n}.swift").read_text() == \
+            (tmp_path / 'serial' / f"File{n}.swift").read_text()
+
+
+# ============================================================================
+# Test: Plan cache
+# ============================================================================
+
+def test_plan_cache_skips_matching_on_rerun(tmp_path, firefox_file, customizations, monkeypatch):
+    """
+    GIVEN a dry-run whose plans were cached
+    WHEN the same catalog is applied to the unchanged file again
+    THEN the cached match lines should be used without any context matching
+    """
+    # Arrange
+    cache_path = tmp_path / 'plans.json'
+    blob_sha = apply_tool.hash_files([str(firefox_file)])[str(firefox_file)]
+    first_cache = apply_tool.PlanCache(cache_path, 'catalog-sha')
+    first = apply_file(str(firefox_file), customizations, dry_run=True,
+                       plans=first_cache.plans_for(blob_sha, customizations))
+    first_cache.record(blob_sha, customizations, first)
+    first_cache.save({blob_sha})
+
+    def no_matching(*args, **kwargs):
+        raise AssertionError('context matching should be skipped')
+    monkeypatch.setattr(apply_tool, 'find_context_match', no_matching)
+    monkeypatch.setattr(apply_tool, 'LineIndex', no_matching)
+
+    # Act
+    second_cache = apply_tool.PlanCache(cache_path, 'catalog-sha')
+    plans = second_cache.plans_for(blob_sha, customizations)
+    second = apply_file(str(firefox_file), customizations, plans=plans)
+
+    # Assert
+    assert second_cache.hits == 2
+    assert [(r.success, r.line) for r in second] == [(r.success, r.line) for r in first]
+    assert '    lazy var themeManager = EcosiaThemeManager()\n' in firefox_file.read_text()
+
+
+def test_plan_cache_is_discarded_for_another_catalog(tmp_path, firefox_file, customizations):
+    """
+    GIVEN plans cached for one catalog
+    WHEN the cache is opened for a different catalog
+    THEN no plans should be reused
+    """
+    cache_path = tmp_path / 'plans.json'
+    cache = apply_tool.PlanCache(cache_path, 'catalog-a')
+    cache.record('blob', customizations, apply_file(str(firefox_file), customizations, dry_run=True))
+    cache.save({'blob'})
+
+    assert apply_tool.PlanCache(cache_path, 'catalog-a').plans_for('blob', customizations)
+    assert apply_tool.PlanCache(cache_path, 'catalog-b').plans_for('blob', customizations) == {}
+
+
+# ============================================================================
+# Test: Indexed context matching
+# ============================================================================
+
+def reference_context_match(lines: List[str], context_before: List[str], original_line: int,
+                            tolerance: int = 50) -> int:
+    """
+    The window scan: the first exact context match in the window wins, otherwise
+    SequenceMatcher runs on every context line at every offset.
+    """
+    search_start = max(0, original_line - tolerance)
+    search_end = min(len(lines), original_line + tolerance)
+    expected = [line.strip() for line in context_before]
+    for i in range(max(search_start, len(expected)), search_end):
+        if expected and [line.strip() for line in lines[i - len(expected):i]] == expected:
+            return i
+
+    best_score, best_line = 0.0, None
+    for i in range(search_start, search_end):
+        before_start = i - len(context_before)
+        if before_start < 0:
+            continue
+        if not context_before:
+            score = 1.0
+        else:
+            matches = sum(
+                1 for a, e in zip(lines[before_start:i], context_before)
+                if SequenceMatcher(None, a.strip(), e.strip()).ratio() >= 0.9
+            )
+            score = matches / len(context_before)
+        if score > best_score:
+            best_score, best_line = score, i
+    return best_line if best_score >= 0.8 else None
+
+
+def test_index_lookup_finds_exact_context_far_from_window_start():
+    """
+    GIVEN a file whose context lines repeat many times outside the search window
+    WHEN the context is matched
+    THEN the exact match inside the window should be returned
+    """
+    # Arrange
+    lines = ['}\n', '\n'] * 200 + ['    let a = 1\n', '    let b = 2\n', '    let c = 3\n'] + ['}\n'] * 100
+
+    # Act
+    match = find_context_match(lines, ['let a = 1', 'let b = 2'], [], 380)
+
+    # Assert
+    assert match == 402
+
+
+def test_fuzzy_fallback_matches_reference_window_scan():
+    """
+    GIVEN random files with near-duplicate lines and slightly edited contexts
+    WHEN contexts are matched with the index and with the original window scan
+    THEN both should pick the same line (or both none)
+    """
+    rng = random.Random(1234)
+    vocabulary = [
+        'let value = compute()', 'let value = computed()', 'return value', 'return values',
+        'self.view.addSubview(button)', 'self.view.addSubview(buttons)', '}', '', 'guard let x else { return }',
+        'NotificationCenter.default.post(name: .didChange)', 'NotificationCenter.default.post(name: .didChanged)',
+    ]
+
+    for _ in range(200):
+        lines = [' ' * rng.choice([0, 4, 8]) + rng.choice(vocabulary) + '\n' for _ in range(rng.randint(5, 160))]
+        size = rng.randint(1, 3)
+        context = [rng.choice(vocabulary) for _ in range(size)]
+        original_line = rng.randint(0, len(lines))
+
+        expected = reference_context_match(lines, context, original_line)
+        actual = find_context_match(lines, context, [], original_line)
+
+        assert actual == expected, (context, original_line)
+
+
+def test_fuzzy_fallback_scores_only_offsets_with_enough_length_matches(monkeypatch):
+    """
+    GIVEN a window where the context's lengths line up at one offset only
+    WHEN no exact match exists and the fuzzy fallback runs
+    THEN only that offset should be compared, not every offset in the window
+    """
+    # Arrange
+    lines = [f"{'x' * (n % 7)}\n" for n in range(100)]
+    lines[60:62] = ['let value = compute()\n', 'return values\n']
+    compared = []
+    could_match = apply_tool.default_matcher.could_match
+    monkeypatch.setattr(apply_tool.default_matcher, 'could_match',
+                        lambda actual, expected: compared.append(actual) or could_match(actual, expected))
+
+    # Act
+    match = find_context_match(lines, ['let value = compute()', 'return value'], [], 50)
+
+    # Assert
+    assert match == 62
+    assert compared == ['let value = compute()', 'return values']
+
+
+# ============================================================================
+# Test: Whole-file relocation
+# ============================================================================
+
+def test_apply_file_relocates_customization_beyond_tolerance(firefox_file, customizations):
+    """
+    GIVEN upstream inserted 300 lines above both customizations
+    WHEN the file is applied
+    THEN both should be relocated and their drift reported
+    """
+    # Arrange
+    inserted = ''.join(f"// Upstream line {n}\n" for n in range(300))
+    firefox_file.write_text(inserted + FIREFOX_SOURCE)
+
+    # Act
+    results = apply_file(str(firefox_file), customizations)
+
+    # Assert
+    assert [(r.success, r.line, r.drift) for r in results] == [(True, 308, 300), (True, 303, 300)]
+    assert '    lazy var themeManager = EcosiaThemeManager()\n' in firefox_file.read_text()
+
+
+def test_relocation_picks_nearest_full_match():
+    """
+    GIVEN a context that appears three times far from the catalog line, and half of it nearby
+    WHEN the customization is relocated
+    THEN the full occurrence closest to the original line should win
+    """
+    # Arrange
+    block = ['    let value = compute()\n', '    return value\n', '    next()\n']
+    partial = ['    let value = compute()\n', '    return nothing\n', '    next()\n']
+    lines = block + ['}\n'] * 400 + partial + ['}\n'] * 400 + block + ['}\n'] * 400 + block
+
+    # Act
+    match = apply_tool.relocate_context_match(lines, ['let value = compute()', 'return value'], 500)
+
+    # Assert
+    assert match == 808
+
+
+def addition_after(context_before: List[str], line: int) -> Customization:
+    """An addition whose context is nowhere near its catalog line."""
+    return Customization(
+        file='Sample.swift', line=line, type='addition', comment='Add tracker',
+        firefox_code=[], ecosia_code=['    track()'],
+        context_before=context_before, context_after=[],
+    )
+
+
+@pytest.mark.parametrize('context_before', [['}', ''], ['    }', '}']])
+def test_addition_is_not_relocated_on_generic_context(context_before):
+    """
+    GIVEN an addition whose only context is closing braces and blank lines
+    WHEN that context drifted beyond the tolerance window
+    THEN the addition should be reported as not found rather than placed at a random brace
+    """
+    # Arrange
+    lines = [f"let value{n} = {n}\n" for n in range(300)] + ['    }\n', '}\n', '\n', 'let last = 0\n']
+
+    # Act
+    plan = apply_tool.plan_customization(lines, addition_after(context_before, 10))
+
+    # Assert
+    assert plan is None
+
+
+def test_addition_is_relocated_on_distinctive_context_within_bound():
+    """
+    GIVEN an addition whose context includes a distinctive line
+    WHEN that context moved 300 lines, and another copy sits beyond the drift bound
+    THEN the addition should move to the nearby copy only
+    """
+    # Arrange
+    context = ['func start() {', '}']
+    filler = [f"let value{n} = {n}\n" for n in range(300)]
+    far = ['\n'] * apply_tool.MAX_ADDITION_DRIFT
+    lines = filler + ['func start() {\n', '}\n'] + far + ['func start() {\n', '}\n', 'let last = 0\n']
+
+    # Act
+    nearby = apply_tool.plan_customization(lines, addition_after(context, 3))
+    too_far = apply_tool.plan_customization(lines[:300] + far + lines[302:], addition_after(context, 3))
+
+    # Assert
+    assert nearby == (302, 300)
+    assert too_far is None
+
+
+def test_relocation_prefers_candidate_where_the_firefox_code_is():
+    """
+    GIVEN a removal whose context moved twice over, and only the farther copy is followed by its code
+    WHEN the customization is relocated
+    THEN it should go to the copy where the removal can apply
+    """
+    # Arrange
+    filler = [f"let value{n} = {n}\n" for n in range(200)]
+    context = ['import Foundation\n', 'import Shared\n']
+    lines = filler + context + ['import Common\n'] + filler + context + ['import Glean\n', 'import Common\n']
+    removal = Customization(
+        file='Sample.swift', line=3, type='removal', comment='Remove Glean',
+        firefox_code=['import Glean'], ecosia_code=[],
+        context_before=['import Foundation', 'import Shared'], context_after=['import Common'],
+    )
+
+    # Act
+    plan = apply_tool.plan_customization(lines, removal)
+
+    # Assert
+    assert plan == (405, 403)
+
+
+def test_relocation_is_fast_on_large_files():
+    """
+    GIVEN a 20,000-line file where the context moved 10,000 lines
+    WHEN the customization is relocated
+    THEN it should be found quickly through the inverted index
+    """
+    # Arrange
+    lines = [f"    let {hashlib.sha1(str(n).encode()).hexdigest()} = {n}\n" for n in range(20000)] + ['}\n']
+    context = [lines[15000], lines[15001]]
+
+    # Act
+    start = time.perf_counter()
+    match = find_context_match(lines, context, [], 5000)
+    relocated = apply_tool.relocate_context_match(lines, context, 5000)
+    elapsed = time.perf_counter() - start
+
+    # Assert
+    assert match is None
+    assert relocated == 15002
+    assert elapsed < 1.0
+
+
+# ============================================================================
+# Test: Overlap detection
+# ============================================================================
+
+def test_overlapping_customizations_are_skipped_and_the_rest_applied(firefox_file, customizations):
+    """
+    GIVEN two customizations rewriting the same line, and one elsewhere in the file
+    WHEN the file is applied
+    THEN both overlapping ones should fail naming each other, and the other should apply
+    """
+    # Arrange
+    substitution = customizations[1]
+    removal = Customization(**dict(vars(substitution), type='removal', comment='Remove theme manager',
+                                   line=substitution.line + 1, ecosia_code=[]))
+
+    # Act
+    results = apply_file(str(firefox_file), customizations + [removal])
+
+    # Assert
+    assert [(r.success, r.line, r.overlaps) for r in results] == [(False, 8, 8), (False, 8, 8), (True, 3, None)]
+    assert results[0].message == 'Overlaps the substitution at line 8'
+    content = firefox_file.read_text()
+    assert '// Firefox: import Glean\n' in content
+    assert '    lazy var themeManager = DefaultThemeManager()\n' in content
+
+
+def test_addition_above_rewritten_range_is_applied_in_order(firefox_file, customizations):
+    """
+    GIVEN an addition inserted right above the lines a substitution rewrites
+    WHEN the file is applied
+    THEN both should apply, with the addition above the substitution
+    """
+    # Arrange
+    substitution = customizations[1]
+    addition = Customization(**dict(vars(substitution), type='addition', comment='Add tracker',
+                                    firefox_code=[], ecosia_code=['let tracker = Analytics.shared']))
+
+    # Act
+    results = apply_file(str(firefox_file), [substitution, addition])
+
+    # Assert
+    assert all(r.success for r in results)
+    assert '    // Ecosia: Add tracker\n    let tracker = Analytics.shared\n    // Ecosia: ' in firefox_file.read_text()
+
+
+def test_addition_inside_rewritten_range_overlaps():
+    """
+    GIVEN an addition planned strictly inside a three-line removal
+    WHEN overlaps are detected
+    THEN both should be reported, and a removal right below should not be
+    """
+    # Arrange
+    removal = Customization(file='F.swift', line=1, type='removal', comment='', firefox_code=['a', 'b', 'c'],
+                            ecosia_code=[], context_before=[], context_after=[])
+    addition = Customization(**dict(vars(removal), type='addition', firefox_code=[]))
+    PlanStep = apply_tool.PlanStep
+    steps = [PlanStep(0, removal, 10, 13), PlanStep(1, addition, 11, 11), PlanStep(2, removal, 13, 16)]
+
+    # Act
+    overlaps = apply_tool.find_overlaps(steps)
+
+    # Assert
+    assert {order: other.order for order, other in overlaps.items()} == {0: 1, 1: 0}
+
+
+# ============================================================================
+# Test: Verify mode
+# ============================================================================
+
+ECOSIA_SOURCE = """import Foundation
+import Shared
+/* Ecosia: Remove Glean
+import Glean
+ */
+import Common
+
+class AppDelegate {
+    // Ecosia: Use Ecosia theme manager
+    // lazy var themeManager = DefaultThemeManager()
+    lazy var themeManager = EcosiaThemeManager()
+}
+"""
+
+
+@pytest.fixture
+def ecosia_catalog(tmp_path) -> List[Customization]:
+    """Catalog entries as the scanner records them for ECOSIA_SOURCE."""
+    path = str(tmp_path / 'AppDelegate.swift')
+    return [
+        Customization(
+            file=path, line=3, type='removal', comment='Remove Glean',
+            firefox_code=['import Glean'], ecosia_code=[],
+            context_before=['import Foundation', 'import Shared'], context_after=['import Common', ''],
+        ),
+        Customization(
+            file=path, line=9, type='substitution', comment='Use Ecosia theme manager',
+            firefox_code=['lazy var themeManager = DefaultThemeManager()'],
+            ecosia_code=['    lazy var themeManager = EcosiaThemeManager()'],
+            context_before=['', 'class AppDelegate {'], context_after=['}', ''],
+        ),
+    ]
+
+
+def test_verify_finds_every_customization_in_place(tmp_path, ecosia_catalog):
+    """
+    GIVEN the Ecosia file the catalog was generated from
+    WHEN it is verified
+    THEN every customization should be present and the file left untouched
+    """
+    path = tmp_path / 'AppDelegate.swift'
+    path.write_text(ECOSIA_SOURCE)
+
+    results = apply_tool.verify_file(str(path), ecosia_catalog)
+
+    assert [(r.success, r.message) for r in results] == [(True, 'Present'), (True, 'Present')]
+    assert path.read_text() == ECOSIA_SOURCE
+
+
+def test_verify_reports_drifted_and_missing_customizations(tmp_path, ecosia_catalog):
+    """
+    GIVEN a file where lines were added above one customization and the other was edited away
+    WHEN the files are verified in parallel
+    THEN one should be reported as drifted with its offset and the other as missing
+    """
+    # Arrange
+    path = tmp_path / 'AppDelegate.swift'
+    path.write_text(('// Copyright\n\n' + ECOSIA_SOURCE)
+                    .replace('EcosiaThemeManager', 'OtherThemeManager'))
+    other = tmp_path / 'Other.swift'
+    other.write_text(ECOSIA_SOURCE)
+    files_map = {str(path): ecosia_catalog,
+                 str(other): [Customization(**dict(vars(c), file=str(other))) for c in ecosia_catalog]}
+
+    # Act
+    verified = dict(apply_tool.verify_files(files_map, jobs=2))
+
+    # Assert
+    assert [(r.success, r.drift, r.message) for r in verified[str(path)]] == [
+        (False, 2, 'Drifted to line 5'),
+        (False, 0, 'Missing'),
+    ]
+    assert all(r.success for r in verified[str(other)])
+
+
+# ============================================================================
+# Test: Cross-file relocation
+# ============================================================================
+
+def git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+        cwd=repo, capture_output=True, text=True, check=True
+    ).stdout
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_customizations_follow_git_rename(tmp_path, customizations, monkeypatch):
+    """
+    GIVEN upstream renamed the file between the old and new tags
+    WHEN the moved files are resolved with git rename detection
+    THEN the customizations should be applied to the renamed file
+    """
+    # Arrange
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    git(repo, 'init', '-q')
+    (repo / 'AppDelegate.swift').write_text(FIREFOX_SOURCE)
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'old')
+    git(repo, 'tag', 'v1')
+    git(repo, 'mv', 'AppDelegate.swift', 'ApplicationDelegate.swift')
+    git(repo, 'commit', '-q', '-m', 'rename')
+    monkeypatch.chdir(repo)
+    for customization in customizations:
+        customization.file = 'AppDelegate.swift'
+
+    # Act
+    renames = apply_tool.detect_renames('v1', 'HEAD')
+    files_map = apply_tool.resolve_moved_files({'AppDelegate.swift': customizations}, renames, Path('.'))
+    results = apply_file('ApplicationDelegate.swift', files_map['ApplicationDelegate.swift'])
+
+    # Assert
+    assert renames == {'AppDelegate.swift': ['ApplicationDelegate.swift']}
+    assert list(files_map) == ['ApplicationDelegate.swift']
+    assert [(r.success, r.file, r.moved_from) for r in results] == [
+        (True, 'ApplicationDelegate.swift', 'AppDelegate.swift')
+    ] * 2
+
+
+def test_customizations_follow_split_file_through_tree_index(tmp_path, firefox_file, customizations):
+    """
+    GIVEN upstream split the file in two, with no git history to follow
+    WHEN the moved files are resolved
+    THEN each customization should be sent to the file that now holds its context
+    """
+    # Arrange
+    old_path = str(firefox_file)
+    firefox_file.unlink()
+    imports, body = FIREFOX_SOURCE.split('\nclass ')
+    (tmp_path / 'Imports.swift').write_text(imports + '\n')
+    (tmp_path / 'Delegate.swift').write_text('\nclass ' + body)
+    for customization in customizations:
+        customization.file = old_path
+
+    # Act
+    files_map = apply_tool.resolve_moved_files({old_path: customizations}, {}, tmp_path)
+
+    # Assert
+    assert {file: [c.type for c in customizations] for file, customizations in files_map.items()} == {
+        str(tmp_path / 'Imports.swift'): ['removal'],
+        str(tmp_path / 'Delegate.swift'): ['substitution'],
+    }
+
+
+# ============================================================================
+# Test: Unified-diff output
+# ============================================================================
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_patch_applies_with_git_and_matches_real_apply(tmp_path, customizations, monkeypatch):
+    """
+    GIVEN a repository with a Firefox file in a subdirectory
+    WHEN its customizations are rendered as a patch
+    THEN the tree should be untouched and `git apply` should give the same file as a real apply
+    """
+    # Arrange
+    repo = tmp_path / 'repo'
+    (repo / 'Client').mkdir(parents=True)
+    git(repo, 'init', '-q')
+    target = repo / 'Client' / 'AppDelegate.swift'
+    target.write_text(FIREFOX_SOURCE)
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'firefox')
+    monkeypatch.chdir(repo / 'Client')
+    for customization in customizations:
+        customization.file = 'AppDelegate.swift'
+
+    # Act
+    applied = list(apply_tool.apply_files({'AppDelegate.swift': customizations}, patch_root=repo))
+    patch = ''.join(patch for _, _, _, patch in applied)
+
+    # Assert
+    assert [r.success for _, _, results, _ in applied for r in results] == [True, True]
+    assert patch.startswith('diff --git a/Client/AppDelegate.swift b/Client/AppDelegate.swift\n')
+    assert target.read_text() == FIREFOX_SOURCE
+    (tmp_path / 'ecosia.patch').write_text(patch)
+    git(repo, 'apply', '--check', str(tmp_path / 'ecosia.patch'))
+    git(repo, 'apply', str(tmp_path / 'ecosia.patch'))
+    patched = target.read_text()
+    target.write_text(FIREFOX_SOURCE)
+    apply_file(str(target), customizations)
+    assert patched == target.read_text()
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_patch_handles_file_without_trailing_newline(tmp_path, customizations):
+    """
+    GIVEN a file whose last line has no trailing newline and is customized
+    WHEN the patch is rendered
+    THEN it should mark the missing newline so `git apply` accepts it
+    """
+    # Arrange
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    git(repo, 'init', '-q')
+    source = 'import Foundation\nimport Shared\nimport Glean\nimport Common'
+    (repo / 'AppDelegate.swift').write_text(source)
+    removal = Customization(**dict(vars(customizations[0]), file=str(repo / 'AppDelegate.swift'),
+                                   line=4, firefox_code=['import Common'],
+                                   context_before=['import Shared', 'import Glean'], context_after=[]))
+
+    # Act
+    results, patch = apply_tool.patch_file(removal.file, [removal], patch_root=repo)
+
+    # Assert
+    assert results[0].success
+    assert '-import Common\n\\ No newline at end of file\n' in patch
+    (tmp_path / 'ecosia.patch').write_text(patch)
+    git(repo, 'apply', '--check', str(tmp_path / 'ecosia.patch'))
+
+
+# ============================================================================
+# Test: Git tree mode
+# ============================================================================
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_tree_mode_commits_customized_revision_without_checkout(tmp_path, customizations):
+    """
+    GIVEN a tagged Firefox revision whose file was deleted from the working tree
+    WHEN the catalog is applied with --tree and --branch
+    THEN a commit on top of the tag should hold the customized file
+         and the working tree, index and HEAD should be untouched
+    """
+    # Arrange
+    repo = tmp_path / 'repo'
+    (repo / 'Client').mkdir(parents=True)
+    git(repo, 'init', '-q')
+    (repo / 'Client' / 'AppDelegate.swift').write_text(FIREFOX_SOURCE)
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'firefox')
+    git(repo, 'tag', 'firefox-v1')
+    head = git(repo, 'rev-parse', 'HEAD')
+    (repo / 'Client' / 'AppDelegate.swift').unlink()
+    catalog = tmp_path / 'catalog.json'
+    catalog.write_text(json.dumps({'customizations': [
+        dict(vars(c), file='Client/AppDelegate.swift', moved_from=None) for c in customizations
+    ]}))
+
+    # Act
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).parent / 'apply-ecosia-customizations.py'),
+         '--catalog', str(catalog), '--target', 'Client/', '--tree', 'firefox-v1', '--branch', 'trial'],
+        cwd=repo, capture_output=True, text=True,
+        env={**os.environ, 'GIT_AUTHOR_NAME': 'Test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+             'GIT_COMMITTER_NAME': 'Test', 'GIT_COMMITTER_EMAIL': 'test@example.com'}
+    )
+
+    # Assert
+    assert result.returncode == 0, result.stdout + result.stderr
+    expected = tmp_path / 'AppDelegate.swift'
+    expected.write_text(FIREFOX_SOURCE)
+    apply_file(str(expected), [Customization(**dict(vars(c), file=str(expected))) for c in customizations])
+    assert git(repo, 'show', 'trial:Client/AppDelegate.swift') == expected.read_text()
+    assert git(repo, 'rev-parse', 'trial^') == head
+    assert git(repo, 'rev-parse', 'HEAD') == head
+    assert git(repo, 'status', '--porcelain') == ' D Client/AppDelegate.swift\n'
+
+
+@pytest.mark.parametrize('option', [['--branch', 'trial'], ['--message', 'Trial']])
+def test_tree_options_are_rejected_without_tree(tmp_path, option):
+    """
+    GIVEN --branch or --message without --tree
+    WHEN the tool is run
+    THEN it should refuse the options instead of silently ignoring them
+    """
+    # Act
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).parent / 'apply-ecosia-customizations.py'),
+         '--catalog', str(tmp_path / 'catalog.json'), '--target', str(tmp_path), *option],
+        capture_output=True, text=True
+    )
+
+    # Assert
+    assert result.returncode == 2
+    assert '--branch and --message require --tree' in result.stderr
+
+
+# ============================================================================
+# Run tests
+# ============================================================================
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -5,11 +5,19 @@ Test-driven approach:
 - Given: Ecosia customization in catalog
 - Given: Git conflict in file with that customization
 - Expect: Tool suggests correct resolution
+- Expect: Conflict markers are parsed in one pass (diff3, CRLF, malformed markers)
+- Expect: Conflict sides are read from the git index stages when available
+- Expect: Index-stage conflicts are exactly the ones git wrote to the working file
+- Expect: Conflicts with a known merge base are three-way merged when possible
+- Expect: Resolutions are spliced into each file by position in one write
 """
 
 import pytest
 import json
+import random
+import shutil
 import tempfile
+import subprocess
 from pathlib import Path
 from typing import Dict
 
@@ -18,11 +26,18 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from ecosia_matching import default_matcher
+from ecosia_merge import split_lines
 from ecosia_conflict_helper import (
+    CatalogIndex,
     ConflictRegion,
     ConflictType,
     ResolutionStrategy,
+    apply_resolutions,
     extract_conflicts,
+    merge_index_stages,
+    parse_conflicts,
+    read_index_conflicts,
     find_customization_in_conflict,
     analyze_conflict,
     generate_removal_resolution,
@@ -159,6 +174,259 @@ class Example {
     assert len(conflicts) == 2
 
 
+def test_extract_conflicts_reads_diff3_base_and_line_range(temp_conflict_file):
+    """
+    GIVEN a conflict written with merge.conflictStyle=diff3
+    WHEN extract_conflicts is called
+    THEN the base section should be captured separately with the marker line range
+    """
+    # Arrange
+    file_content = """class Example {
+<<<<<<< HEAD
+    let value = "ecosia"
+||||||| merged common ancestors
+    let value = "base"
+=======
+    let value = "firefox"
+>>>>>>> firefox-v141.0
+}
+"""
+    file_path = temp_conflict_file(file_content)
+    
+    # Act
+    conflicts = extract_conflicts(str(file_path))
+    
+    # Assert
+    assert len(conflicts) == 1
+    conflict = conflicts[0]
+    assert (conflict.start_line, conflict.end_line) == (2, 8)
+    assert conflict.ecosia_version == '    let value = "ecosia"'
+    assert conflict.base_version == '    let value = "base"'
+    assert conflict.firefox_version == '    let value = "firefox"'
+
+
+def test_extract_conflicts_handles_crlf_and_empty_sides(temp_conflict_file):
+    """
+    GIVEN a CRLF file with conflicts where one side is empty
+    WHEN extract_conflicts is called
+    THEN versions should have no carriage returns and empty sides should be ''
+    """
+    # Arrange
+    file_content = (
+        'import Foundation\r\n'
+        '<<<<<<< HEAD\r\n'
+        '=======\r\n'
+        'import Glean\r\n'
+        '>>>>>>> firefox-v141.0\r\n'
+        '<<<<<<< HEAD\r\n'
+        'import Ecosia\r\n'
+        '=======\r\n'
+        '>>>>>>> firefox-v141.0\r\n'
+    )
+    file_path = temp_conflict_file('')
+    file_path.write_bytes(file_content.encode())
+    
+    # Act
+    conflicts = extract_conflicts(str(file_path))
+    
+    # Assert
+    assert [(c.start_line, c.ecosia_version, c.firefox_version, c.firefox_branch) for c in conflicts] == [
+        (2, '', 'import Glean', 'firefox-v141.0'),
+        (6, 'import Ecosia', '', 'firefox-v141.0'),
+    ]
+
+
+def test_extract_conflicts_skips_malformed_markers(temp_conflict_file):
+    """
+    GIVEN an unterminated conflict, stray markers and a longer inner marker run
+    WHEN extract_conflicts is called
+    THEN only the well-formed conflict should be returned, with its own line numbers
+    """
+    # Arrange
+    file_content = """<<<<<<< HEAD
+    let broken = true
+=======
+>>>>>>>>> not a marker at this level
+<<<<<<< HEAD
+    let value = "ecosia"
+=======
+    let value = "firefox"
+>>>>>>> firefox-v141.0
+=======
+>>>>>>> stray
+"""
+    file_path = temp_conflict_file(file_content)
+    
+    # Act
+    conflicts = extract_conflicts(str(file_path))
+    
+    # Assert
+    assert len(conflicts) == 1
+    assert (conflicts[0].start_line, conflicts[0].end_line) == (5, 9)
+    assert conflicts[0].ecosia_version == '    let value = "ecosia"'
+
+
+# ============================================================================
+# Test: Read Conflicts from the Git Index
+# ============================================================================
+
+def git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+        cwd=repo, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def merge_conflict(repo: Path, base: str, ecosia: str, firefox: str) -> Path:
+    """Commit AppDelegate.swift on both branches and merge Firefox's, leaving it conflicted."""
+    path = repo / 'AppDelegate.swift'
+    git(repo, 'init', '-q', '-b', 'ecosia')
+    path.write_text(base)
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'base')
+    git(repo, 'branch', 'firefox')
+    path.write_text(ecosia)
+    git(repo, 'commit', '-q', '-am', 'ecosia')
+    git(repo, 'checkout', '-q', 'firefox')
+    path.write_text(firefox)
+    git(repo, 'commit', '-q', '-am', 'firefox')
+    git(repo, 'tag', 'firefox-v141.0')
+    git(repo, 'checkout', '-q', 'ecosia')
+    with pytest.raises(subprocess.CalledProcessError):  # conflicted
+        git(repo, 'merge', '-q', 'firefox-v141.0')
+    return path
+
+
+# Both sides rewrote lines 5-8; they agree on all but the middle ones
+REWRITE_BASE = (
+    'import Foundation\n\nclass AppDelegate {\n    func setup() {\n'
+    '        let a = 1\n        let b = 2\n        let c = 3\n        let d = 4\n    }\n}\n'
+)
+REWRITE_ECOSIA = REWRITE_BASE.replace(
+    '        let a = 1\n        let b = 2\n        let c = 3\n        let d = 4\n',
+    '        let a = 10\n        let b = 20\n'
+    '        // Ecosia: Searches counter\n        private let searchesCounter = SearchesCounter()\n'
+    '        let d = 40\n'
+)
+REWRITE_FIREFOX = REWRITE_BASE.replace(
+    '        let a = 1\n        let b = 2\n        let c = 3\n        let d = 4\n',
+    '        let a = 10\n        let b = 20\n        let c = 30\n        let d = 40\n'
+)
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_read_index_conflicts_ignores_edited_markers(tmp_path, monkeypatch):
+    """
+    GIVEN a merge conflict whose markers another tool already mangled in the working file
+    WHEN conflicts are read from the index stages
+    THEN the regions should come from the base, Ecosia and Firefox blobs with git's line numbers
+    """
+    # Arrange
+    base = 'import Foundation\n\nclass AppDelegate {\n    let themeManager = DefaultThemeManager()\n}\n'
+    merge_conflict(tmp_path, base, base.replace('DefaultThemeManager()', 'EcosiaThemeManager()'),
+                   base.replace('DefaultThemeManager()', 'DefaultThemeManager(uuid)'))
+    monkeypatch.chdir(tmp_path)
+    marker_lines = [n for n, line in enumerate((tmp_path / 'AppDelegate.swift').read_text().splitlines(), 1)
+                    if line.startswith(('<<<<<<<', '>>>>>>>'))]
+    (tmp_path / 'AppDelegate.swift').write_text('mangled by another tool\n')
+    
+    # Act
+    merged = read_index_conflicts(['AppDelegate.swift'])
+    
+    # Assert
+    lines, conflicts = merged['AppDelegate.swift']
+    assert len(conflicts) == 1
+    conflict = conflicts[0]
+    assert [conflict.start_line, conflict.end_line] == marker_lines
+    assert conflict.ecosia_version == '    let themeManager = EcosiaThemeManager()'
+    assert conflict.firefox_version == '    let themeManager = DefaultThemeManager(uuid)'
+    assert conflict.base_version == '    let themeManager = DefaultThemeManager()'
+    assert conflict.firefox_branch == 'firefox-v141.0'
+    assert lines[conflict.start_line - 1] == '<<<<<<< HEAD\n'
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_read_index_conflicts_trims_lines_both_sides_share_like_git(tmp_path, monkeypatch):
+    """
+    GIVEN a multi-line conflict where both sides rewrote the same lines and agree on most of them
+    WHEN conflicts are read from the index stages
+    THEN they should be the regions git wrote to the working file, at the same lines
+    """
+    # Arrange
+    path = merge_conflict(tmp_path, REWRITE_BASE, REWRITE_ECOSIA, REWRITE_FIREFOX)
+    monkeypatch.chdir(tmp_path)
+    
+    # Act
+    lines, conflicts = read_index_conflicts(['AppDelegate.swift'])['AppDelegate.swift']
+    
+    # Assert
+    in_working_file = extract_conflicts('AppDelegate.swift')
+    assert [(c.start_line, c.end_line, c.ecosia_version, c.firefox_version) for c in conflicts] == \
+        [(c.start_line, c.end_line, c.ecosia_version, c.firefox_version) for c in in_working_file]
+    assert conflicts[0].start_line == 7
+    assert conflicts[0].firefox_version == '        let c = 30'
+    assert ''.join(lines) == path.read_text()
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_read_index_conflicts_reports_conflicts_git_reports(tmp_path, monkeypatch):
+    """
+    GIVEN sides whose lines repeat, where a difflib-based merge would have merged cleanly
+    WHEN conflicts are read from the index stages
+    THEN they should be the conflicts git wrote to the working file
+    """
+    # Arrange
+    path = merge_conflict(tmp_path, 'e\n\nc\nc\nb\nc\nd\n\nf\n', 'e\n\nc\nb\nc\nd\nX3\nf\n',
+                          'Y1\ne\n\nc\nc\nX0\nc\nd\n\nf\n')
+    monkeypatch.chdir(tmp_path)
+    
+    # Act
+    lines, conflicts = read_index_conflicts(['AppDelegate.swift'])['AppDelegate.swift']
+    
+    # Assert
+    in_working_file = extract_conflicts('AppDelegate.swift')
+    assert conflicts
+    assert [(c.start_line, c.end_line, c.ecosia_version, c.firefox_version) for c in conflicts] == \
+        [(c.start_line, c.end_line, c.ecosia_version, c.firefox_version) for c in in_working_file]
+    assert ''.join(lines) == path.read_text()
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_merge_index_stages_matches_git_merge_file(tmp_path, monkeypatch):
+    """
+    GIVEN random edits of a file with many repeated lines
+    WHEN the three versions are merged as index stages
+    THEN content and regions should be those of `git merge-file`
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(7)
+    
+    def edit(lines):
+        lines = list(lines)
+        for _ in range(rng.randint(1, 3)):
+            at = rng.randrange(len(lines) + 1)
+            lines[at:at + rng.randint(0, 2)] = [f"X{rng.randrange(3)}\n"] * rng.randint(0, 2)
+        return lines
+    
+    for _ in range(60):
+        base = [rng.choice(['c\n', 'b\n', '}\n', '\n', 'd\n']) for _ in range(rng.randint(3, 12))]
+        ours, theirs = edit(base), edit(base)
+        for name, lines in (('ours', ours), ('base', base), ('theirs', theirs)):
+            (tmp_path / name).write_text(''.join(lines))
+        
+        # Act
+        lines, conflicts = merge_index_stages('Test.swift', ''.join(base).encode(), ''.join(ours).encode(),
+                                              ''.join(theirs).encode(), 'firefox')
+        
+        # Assert
+        expected = subprocess.run(['git', 'merge-file', '-p', '-L', 'HEAD', '-L', 'base', '-L', 'firefox',
+                                   'ours', 'base', 'theirs'], capture_output=True, text=True).stdout
+        assert ''.join(lines) == expected
+        assert [(c.start_line, c.end_line) for c in conflicts] == \
+            [(c.start_line, c.end_line) for c in parse_conflicts(split_lines(expected), 'Test.swift')]
+
+
 # ============================================================================
 # Test: Find Customization in Conflict
 # ============================================================================
@@ -211,6 +479,61 @@ def test_find_customization_detects_substitution(sample_catalog):
     assert "Swap Theme Manager" in customization['comment']
 
 
+def test_find_customization_detects_slightly_edited_ecosia_code(sample_catalog):
+    """
+    GIVEN a conflict whose Ecosia side has the replacement code slightly edited
+    WHEN find_customization_in_conflict is called
+    THEN it should still find the substitution through fuzzy line matching
+    """
+    # Arrange
+    conflict = ConflictRegion(
+        file_path='AppDelegate.swift',
+        start_line=35,
+        ecosia_version='    lazy var themeManager = EcosiaThemeManager(window)',
+        firefox_version='    lazy var themeManager = DefaultThemeManager(window)',
+        firefox_branch='firefox-v141.0'
+    )
+    
+    # Act
+    customization = find_customization_in_conflict(conflict, sample_catalog)
+    
+    # Assert
+    assert customization is not None
+    assert customization['type'] == 'substitution'
+
+
+def test_fuzzy_fallback_only_compares_lines_of_similar_length():
+    """
+    GIVEN a file with many customizations whose Ecosia lines have all kinds of lengths
+    WHEN a conflict is attributed by fuzzy matching
+    THEN it should find the edited line while comparing only lines of similar length
+    """
+    # Arrange
+    customizations = [
+        {'file': 'Big.swift', 'line': n, 'type': 'addition', 'comment': f'Change {n}',
+         'firefox_code': [], 'ecosia_code': ['x' * n]}
+        for n in range(1, 200)
+    ]
+    customizations.append({'file': 'Big.swift', 'line': 500, 'type': 'addition', 'comment': 'Track searches',
+                           'firefox_code': [], 'ecosia_code': ['private let searchesCounter = SearchesCounter()']})
+    index = CatalogIndex({'customizations': customizations})
+    conflict = ConflictRegion(
+        file_path='Big.swift',
+        start_line=1,
+        ecosia_version='private let searchesCounter = SearchesCounter(id)',
+        firefox_version='',
+        firefox_branch='firefox-v141.0'
+    )
+    before = sum(default_matcher.counters.values())
+    
+    # Act
+    customization = find_customization_in_conflict(conflict, index)
+    
+    # Assert
+    assert customization['comment'] == 'Track searches'
+    assert sum(default_matcher.counters.values()) - before < 30  # not all 200 Ecosia lines
+
+
 def test_find_customization_returns_none_for_standard_conflict(sample_catalog):
     """
     GIVEN a conflict with no Ecosia customization
@@ -233,6 +556,43 @@ def test_find_customization_returns_none_for_standard_conflict(sample_catalog):
     assert customization is None
 
 
+def test_catalog_index_attributes_to_first_matching_customization(sample_catalog):
+    """
+    GIVEN an indexed catalog and conflicts mentioning several customizations
+    WHEN find_customization_in_conflict is called with the index
+    THEN it should pick the first one in catalog order, matching comments on
+         either side but Ecosia code only on Ecosia's side
+    """
+    # Arrange
+    index = CatalogIndex(sample_catalog)
+    both = ConflictRegion(
+        file_path='AppDelegate.swift',
+        start_line=50,
+        ecosia_version='    private let searchesCounter = SearchesCounter()\n    // Ecosia: Remove Glean',
+        firefox_version='',
+        firefox_branch='firefox-v141.0'
+    )
+    code_on_firefox_side = ConflictRegion(
+        file_path='AppDelegate.swift',
+        start_line=50,
+        ecosia_version='let x = 1',
+        firefox_version='private let searchesCounter = SearchesCounter()',
+        firefox_branch='firefox-v141.0'
+    )
+    comment_on_firefox_side = ConflictRegion(
+        file_path='AppDelegate.swift',
+        start_line=50,
+        ecosia_version='let x = 1',
+        firefox_version='// Ecosia: Searches counter',
+        firefox_branch='firefox-v141.0'
+    )
+    
+    # Act / Assert
+    assert find_customization_in_conflict(both, index)['type'] == 'removal'
+    assert find_customization_in_conflict(code_on_firefox_side, index) is None
+    assert find_customization_in_conflict(comment_on_firefox_side, index)['type'] == 'addition'
+
+
 # ============================================================================
 # Test: Analyze Conflict
 # ============================================================================
@@ -306,6 +666,61 @@ def test_analyze_conflict_identifies_addition_type(sample_catalog):
     assert analyzed.resolution_strategy == ResolutionStrategy.MERGE_BOTH
 
 
+def test_analyze_conflict_three_way_merges_addition_with_base(sample_catalog):
+    """
+    GIVEN an addition conflict whose merge base is known, with Firefox's change on another line
+    WHEN analyze_conflict is called
+    THEN it should reapply the Ecosia addition onto Firefox's new code
+    """
+    # Arrange
+    conflict = ConflictRegion(
+        file_path='AppDelegate.swift',
+        start_line=52,
+        ecosia_version='// Ecosia: Searches counter\nprivate let searchesCounter = SearchesCounter()\nlet tabManager = TabManager()',
+        firefox_version='let tabManager = TabManager(windowUUID: uuid)',
+        firefox_branch='firefox-v141.0',
+        base_version='let tabManager = TabManager()',
+    )
+    
+    # Act
+    analyzed = analyze_conflict(conflict, sample_catalog)
+    
+    # Assert
+    assert analyzed.conflict_type == ConflictType.ADDITION_MOVED
+    assert analyzed.resolution_strategy == ResolutionStrategy.THREE_WAY_MERGE
+    assert analyzed.suggested_resolution == (
+        '// Ecosia: Searches counter\n'
+        'private let searchesCounter = SearchesCounter()\n'
+        'let tabManager = TabManager(windowUUID: uuid)'
+    )
+
+
+def test_analyze_conflict_falls_back_when_both_sides_changed_a_line(sample_catalog):
+    """
+    GIVEN a substitution conflict with a base where Firefox changed the line Ecosia replaced
+    WHEN analyze_conflict is called
+    THEN the three-way merge should give up and the comment update should be suggested
+    """
+    # Arrange
+    conflict = ConflictRegion(
+        file_path='AppDelegate.swift',
+        start_line=35,
+        ecosia_version="// Ecosia: Swap Theme Manager with Ecosia's\n"
+                       "// lazy var themeManager = DefaultThemeManager()\n"
+                       "lazy var themeManager = EcosiaThemeManager()",
+        firefox_version='lazy var themeManager = DefaultThemeManager(uuid)',
+        firefox_branch='firefox-v141.0',
+        base_version='lazy var themeManager = DefaultThemeManager()',
+    )
+    
+    # Act
+    analyzed = analyze_conflict(conflict, sample_catalog)
+    
+    # Assert
+    assert analyzed.resolution_strategy == ResolutionStrategy.UPDATE_COMMENT
+    assert '// lazy var themeManager = DefaultThemeManager(uuid)' in analyzed.suggested_resolution
+
+
 # ============================================================================
 # Test: Generate Resolutions
 # ============================================================================
@@ -395,6 +810,68 @@ def test_generate_addition_resolution_merges_both():
     assert 'private let searchesCounter = SearchesCounter()' in resolution  # Ecosia code
 
 
+# ============================================================================
+# Test: Applying resolutions
+# ============================================================================
+
+def test_apply_resolutions_splices_each_region_in_place(temp_conflict_file):
+    """
+    GIVEN a CRLF file with two identical conflicts and a diff3 conflict
+    WHEN resolutions for the second identical one and the diff3 one are applied
+    THEN exactly those regions should be replaced, keeping CRLF line endings,
+         and the untouched conflict should stay as it was
+    """
+    # Arrange
+    conflict = ['<<<<<<< HEAD', 'let a = 1', '=======', 'let a = 2', '>>>>>>> firefox-v141.0']
+    diff3 = ['<<<<<<< HEAD', 'let b = 1', '||||||| base', 'let b = 0', '=======', 'let b = 2', '>>>>>>> firefox-v141.0']
+    file_path = temp_conflict_file('')
+    file_path.write_bytes('\r\n'.join(['top'] + conflict + ['middle'] + conflict + diff3 + ['end']).encode())
+    first, second, third = extract_conflicts(str(file_path))
+    second.suggested_resolution = 'let a = 3'
+    third.suggested_resolution = '// Ecosia: b\nlet b = 3'
+    
+    # Act
+    applied = apply_resolutions(str(file_path), [second, third])
+    
+    # Assert
+    assert applied == 2
+    expected = ['top'] + conflict + ['middle', 'let a = 3', '// Ecosia: b', 'let b = 3', 'end']
+    assert file_path.read_bytes() == '\r\n'.join(expected).encode()
+    assert [c.start_line for c in extract_conflicts(str(file_path))] == [first.start_line]
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_apply_resolutions_resolves_conflicts_read_from_the_index(tmp_path, monkeypatch):
+    """
+    GIVEN a real merge conflict read from the index stages
+    WHEN it is analyzed and its resolution applied
+    THEN the working file should be resolved in place
+    """
+    # Arrange
+    path = merge_conflict(tmp_path, REWRITE_BASE, REWRITE_ECOSIA, REWRITE_FIREFOX)
+    monkeypatch.chdir(tmp_path)
+    catalog = {'customizations': [{
+        'file': 'AppDelegate.swift',
+        'line': 7,
+        'type': 'addition',
+        'comment': 'Searches counter',
+        'firefox_code': [],
+        'ecosia_code': ['        private let searchesCounter = SearchesCounter()'],
+    }]}
+    _, conflicts = read_index_conflicts(['AppDelegate.swift'])['AppDelegate.swift']
+    analyzed = [analyze_conflict(conflict, catalog) for conflict in conflicts]
+    
+    # Act
+    applied = apply_resolutions('AppDelegate.swift', analyzed)
+    
+    # Assert
+    assert applied == 1
+    content = path.read_text()
+    assert '<<<<<<<' not in content and '>>>>>>>' not in content
+    assert 'let c = 30\n' in content
+    assert 'private let searchesCounter = SearchesCounter()\n        let d = 40\n' in content
+
+
 # ============================================================================
 # Integration Test: End-to-End
 # ============================================================================
@@ -0,0 +1,572 @@
+"""
+Test suite for ecosia-customizations-catalog.py
+
+Covers the single-pass marker tokenizer:
+- Given: Swift source with Ecosia markers
+- Expect: removal, substitution and addition records with correct context
+- Expect: same catalog as the per-line reference scanner on the current tree
+- Expect: overlapping inline records each run to their own end
+- Expect: linear behaviour on pathological inputs
+- Expect: parallel scans produce exactly the serial catalog
+- Expect: the scan cache skips files whose blob is unchanged
+- Expect: pre-filtered scans produce exactly the unfiltered catalog
+- Expect: per-revision timeline read from git objects
+- Expect: an empty scan leaves an existing catalog alone
+"""
+
+import re
+import shutil
+import subprocess
+import importlib.util
+import pytest
+from pathlib import Path
+from typing import List
+
+# Import the module we're testing (its file name isn't a valid module name)
+import sys
+sys.path.insert(0, str(Path(__file__).parent))
+
+_spec = importlib.util.spec_from_file_location(
+    'ecosia_customizations_catalog',
+    Path(__file__).parent / 'ecosia-customizations-catalog.py'
+)
+catalog_tool = importlib.util.module_from_spec(_spec)
+# Registered so worker processes can unpickle its functions
+sys.modules[_spec.name] = catalog_tool
+_spec.loader.exec_module(catalog_tool)
+
+EcosiaCustomization = catalog_tool.EcosiaCustomization
+tokenize_customizations = catalog_tool.tokenize_customizations
+
+FIREFOX_IOS_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_EXCLUDES = ['Ecosia', 'EcosiaTests', 'Derived', 'build', '.build']
+
+
+def tokenize(source: str) -> List[EcosiaCustomization]:
+    return tokenize_customizations(source.splitlines(keepends=True), 'Test.swift')
+
+
+@pytest.fixture
+def swift_tree(tmp_path) -> Path:
+    """A small source tree: files with and without markers, nested and excluded."""
+    root = tmp_path / 'src'
+    for n in range(6):
+        folder = root / f'Module{n % 3}' / ('Nested' if n % 2 else '')
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f'File{n}.swift').write_text(f"""import Foundation
+
+class File{n} {{
+    // Ecosia: Counter {n}
+    let counter = SearchesCounter({n})
+    /* Ecosia: Remove tracking {n}
+    Tracker.start()
+    */
+    func run() {{}}
+}}
+""")
+    (root / 'Module0' / 'Plain.swift').write_text('let x = 1\n')
+    (root / 'Ecosia').mkdir()
+    (root / 'Ecosia' / 'Excluded.swift').write_text('// Ecosia: excluded\nlet y = 2\n')
+    return root
+
+
+def git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+        cwd=repo, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def scan(root: Path, **kwargs) -> List[dict]:
+    customizations, _ = catalog_tool.scan_directory(root, exclude_dirs=DEFAULT_EXCLUDES, **kwargs)
+    return [c.to_dict() for c in customizations]
+
+
+# ============================================================================
+# Reference scanner
+# ============================================================================
+
+def reference_scan(lines: List[str], file_path: str) -> List[EcosiaCustomization]:
+    """
+    The original per-line scanner (re.search on every line, rescanning forward
+    from each marker), with the removal skip fixed to resume after the closing */.
+    """
+    def context_before(start):
+        return [lines[i].rstrip() for i in range(max(0, start - 2), start)]
+
+    customizations = []
+    i = 0
+    while i < len(lines):
+        if re.search(r'/\*\s*Ecosia:', lines[i]):
+            start = i
+            comment = re.search(r'/\*\s*Ecosia:\s*(.*)', lines[start].strip()).group(1).strip()
+            firefox_code = []
+            i = start + 1
+            while i < len(lines) and '*/' not in lines[i]:
+                if lines[i].rstrip():
+                    firefox_code.append(lines[i].rstrip())
+                i += 1
+            customizations.append(EcosiaCustomization(
+                file_path, start + 1, 'removal', comment, firefox_code, [],
+                context_before(start), [lines[j].rstrip() for j in range(i + 1, min(i + 3, len(lines)))],
+            ))
+            i += 1
+            continue
+
+        if re.search(r'//\s*Ecosia:', lines[i]):
+            start = i
+            comment = re.search(r'//\s*Ecosia:\s*(.*)', lines[start].strip()).group(1).strip()
+            firefox_code, ecosia_code = [], []
+            j = start + 1
+            while j < len(lines):
+                stripped = lines[j].strip()
+                if not (stripped.startswith('//') and not stripped.startswith('// Ecosia')):
+                    break
+                firefox_code.append(stripped[2:].strip())
+                j += 1
+            while j < len(lines):
+                stripped = lines[j].strip()
+                if not stripped or stripped.startswith('//') or (stripped == '}' and ecosia_code):
+                    break
+                ecosia_code.append(lines[j].rstrip())
+                j += 1
+            customizations.append(EcosiaCustomization(
+                file_path, start + 1, 'substitution' if firefox_code else 'addition', comment,
+                firefox_code, ecosia_code,
+                context_before(start), [lines[k].rstrip() for k in range(j, min(j + 2, len(lines)))],
+            ))
+        i += 1
+
+    return customizations
+
+
+# ============================================================================
+# Test: Tokenizer records
+# ============================================================================
+
+def test_tokenizer_extracts_removal():
+    """
+    GIVEN a /* Ecosia: */ block
+    WHEN the file is tokenized
+    THEN it should emit a removal with the commented code and surrounding context
+    """
+    # Arrange
+    source = """import Foundation
+import Shared
+/* Ecosia: Remove Glean
+import Glean
+
+import GleanMetrics
+ */
+import Common
+import Storage
+"""
+
+    # Act
+    customizations = tokenize(source)
+
+    # Assert
+    assert len(customizations) == 1
+    removal = customizations[0]
+    assert removal.customization_type == 'removal'
+    assert removal.line_number == 3
+    assert removal.comment == 'Remove Glean'
+    assert removal.firefox_code == ['import Glean', 'import GleanMetrics']
+    assert removal.context_before == ['import Foundation', 'import Shared']
+    assert removal.context_after == ['import Common', 'import Storage']
+
+
+def test_tokenizer_extracts_substitution_and_addition():
+    """
+    GIVEN inline // Ecosia: markers with and without commented Firefox code
+    WHEN the file is tokenized
+    THEN it should emit a substitution and an addition
+    """
+    # Arrange
+    source = """class AppDelegate {
+    // Ecosia: Swap Theme Manager with Ecosia's
+    // lazy var themeManager = DefaultThemeManager()
+    lazy var themeManager = EcosiaThemeManager()
+
+    // Ecosia: Searches counter
+    private let searchesCounter = SearchesCounter()
+}
+"""
+
+    # Act
+    customizations = tokenize(source)
+
+    # Assert
+    assert [c.customization_type for c in customizations] == ['substitution', 'addition']
+    substitution, addition = customizations
+    assert substitution.firefox_code == ['lazy var themeManager = DefaultThemeManager()']
+    assert substitution.ecosia_code == ['    lazy var themeManager = EcosiaThemeManager()']
+    assert substitution.context_after == ['', '    // Ecosia: Searches counter']
+    assert addition.line_number == 6
+    assert addition.ecosia_code == ['    private let searchesCounter = SearchesCounter()']
+    assert addition.context_after == ['}']
+
+
+def test_tokenizer_finds_marker_right_after_removal_block():
+    """
+    GIVEN a removal block containing blank lines, directly followed by another marker
+    WHEN the file is tokenized
+    THEN both customizations should be found (no lines skipped after the closing */)
+    """
+    # Arrange
+    source = """func setup() {
+    /* Ecosia: Remove telemetry
+    TelemetryWrapper.start()
+
+    Glean.shared.start()
+    */
+    // Ecosia: Start Ecosia analytics
+    Analytics.shared.start()
+}
+"""
+
+    # Act
+    customizations = tokenize(source)
+
+    # Assert
+    assert [c.customization_type for c in customizations] == ['removal', 'addition']
+    assert customizations[1].line_number == 7
+    assert customizations[1].ecosia_code == ['    Analytics.shared.start()']
+
+
+def test_tokenizer_ignores_markers_inside_removal_block():
+    """
+    GIVEN a removal block whose commented code contains an inline marker
+    WHEN the file is tokenized
+    THEN only the removal should be emitted
+    """
+    # Arrange
+    source = """/* Ecosia: Remove old onboarding
+// Ecosia: nested marker in removed code
+showOnboarding()
+*/
+"""
+
+    # Act
+    customizations = tokenize(source)
+
+    # Assert
+    assert len(customizations) == 1
+    assert customizations[0].customization_type == 'removal'
+
+
+def test_generate_catalog_emits_v2_fingerprints():
+    """
+    GIVEN scanned customizations
+    WHEN the catalog is generated
+    THEN it should be a v2 catalog with fingerprints for every entry
+    """
+    # Arrange
+    customizations = tokenize("""// Ecosia: Searches counter
+private let searchesCounter = SearchesCounter()
+""")
+
+    # Act
+    catalog = catalog_tool.generate_catalog(customizations)
+
+    # Assert
+    assert catalog['version'] == '2.0'
+    fingerprints = catalog['customizations'][0]['fingerprints']
+    assert len(fingerprints['ecosia_code']) == 1
+    assert fingerprints['block']
+
+
+# ============================================================================
+# Test: Equivalence with the reference scanner
+# ============================================================================
+
+@pytest.mark.skipif(not (FIREFOX_IOS_DIR / 'Client').is_dir(), reason='firefox-ios tree not available')
+def test_tokenizer_matches_reference_scanner_on_current_tree():
+    """
+    GIVEN every Swift file in the firefox-ios tree
+    WHEN it is scanned by the tokenizer and by the reference scanner
+    THEN both should produce exactly the same catalog entries
+    """
+    scanned = 0
+    for swift_file in FIREFOX_IOS_DIR.rglob('*.swift'):
+        if any(excluded in swift_file.parts for excluded in DEFAULT_EXCLUDES):
+            continue
+        try:
+            lines = swift_file.read_text(encoding='utf-8').splitlines(keepends=True)
+        except UnicodeDecodeError:
+            continue
+        if not any('Ecosia:' in line for line in lines):
+            continue
+
+        expected = reference_scan(lines, str(swift_file))
+        actual = tokenize_customizations(lines, str(swift_file))
+        assert [c.to_dict() for c in actual] == [c.to_dict() for c in expected], swift_file
+        scanned += 1
+
+    assert scanned > 0
+
+
+OVERLAPPING_LINES = {
+    'trailing_markers': [f"let a{n} = 1 // Ecosia: x{n}\n" for n in range(7)] + ['}\n', '\n', 'let end = 0\n'],
+    'comment_markers': ['func f() {\n'] + [f"//Ecosia: x{n}\n" for n in range(7)] + ['let b = 2\n', '}\n', '}\n'],
+    'mixed': ['// Ecosia: outer\n', '// let old = 0\n', 'let a = 1 // Ecosia: inner\n',
+              '}\n', '/* Ecosia: block\n', 'let c = 3\n', '*/\n', 'let d = 4 // Ecosia: last\n'],
+}
+
+
+@pytest.mark.parametrize('lines', OVERLAPPING_LINES.values(), ids=OVERLAPPING_LINES.keys())
+def test_tokenizer_matches_reference_scanner_on_overlapping_records(lines):
+    """
+    GIVEN runs of markers whose records overlap
+    WHEN they are scanned by the tokenizer and by the reference scanner
+    THEN every record should run to its own end, exactly as in the reference
+    """
+    # Act
+    expected = reference_scan(lines, 'Test.swift')
+    actual = tokenize_customizations(lines, 'Test.swift')
+
+    # Assert
+    assert [c.to_dict() for c in actual] == [c.to_dict() for c in expected]
+
+
+# ============================================================================
+# Test: Linear time on pathological inputs
+# ============================================================================
+
+# An unbroken run of n overlapping inline records holds ~n²/2 lines by
+# definition, so those runs are broken up every few markers here
+PATHOLOGICAL_LINES = {
+    'unterminated_removal': lambda n: ['/* Ecosia: never closed\n'] + ['let x = 1\n'] * n,
+    'comment_markers': lambda n: (['//Ecosia: no space\n'] * 7 + ['\n']) * (n // 8),
+    'trailing_markers': lambda n: (['foo() // Ecosia: trailing\n'] * 7 + ['}\n']) * (n // 8),
+    'removal_openers': lambda n: ['/* Ecosia: a\n', '*/ // Ecosia: b\n'] * (n // 2),
+}
+
+
+class CountingLines(list):
+    """Lines that count how many times one of them is read."""
+
+    reads = 0
+
+    def __getitem__(self, key):
+        result = super().__getitem__(key)
+        self.reads += len(result) if isinstance(key, slice) else 1
+        return result
+
+    def __iter__(self):
+        for line in super().__iter__():
+            self.reads += 1
+            yield line
+
+
+class CountingPattern:
+    """A compiled pattern that counts its searches."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.searches = 0
+
+    def search(self, text):
+        self.searches += 1
+        return self.pattern.search(text)
+
+
+@pytest.mark.parametrize('make_lines', PATHOLOGICAL_LINES.values(), ids=PATHOLOGICAL_LINES.keys())
+def test_tokenizer_is_linear_on_pathological_input(make_lines, monkeypatch):
+    """
+    GIVEN inputs that make a rescanning scanner quadratic
+    WHEN they are tokenized at 1x and 4x size
+    THEN line reads, regex searches and the captured output should all grow linearly
+    """
+    patterns = [CountingPattern(catalog_tool.REMOVAL_MARKER), CountingPattern(catalog_tool.INLINE_MARKER)]
+    monkeypatch.setattr(catalog_tool, 'REMOVAL_MARKER', patterns[0])
+    monkeypatch.setattr(catalog_tool, 'INLINE_MARKER', patterns[1])
+
+    def run(n):
+        lines = CountingLines(make_lines(n))
+        searches_before = sum(pattern.searches for pattern in patterns)
+        customizations = tokenize_customizations(lines, 'Test.swift')
+        searches = sum(pattern.searches for pattern in patterns) - searches_before
+        captured = sum(
+            len(c.firefox_code) + len(c.ecosia_code) + len(c.context_before) + len(c.context_after)
+            for c in customizations
+        )
+        return len(lines), lines.reads, searches, captured
+
+    small_size, small_reads, small_searches, small_captured = run(2000)
+    large_size, large_reads, large_searches, large_captured = run(8000)
+
+    # Every line is read once and searched at most three times (removal,
+    # inline, comment); a rescanning scanner reads and captures ~16x at 4x size
+    assert (small_reads, large_reads) == (small_size, large_size)
+    assert large_searches <= 3 * large_size
+    assert large_captured <= 4.1 * small_captured
+    assert large_captured <= 16 * large_size
+
+
+# ============================================================================
+# Test: Directory scans
+# ============================================================================
+
+def test_parallel_scan_matches_serial_scan(swift_tree):
+    """
+    GIVEN a tree of several Swift files
+    WHEN it is scanned serially and with a process pool
+    THEN both scans should produce the same catalog, in the same order
+    """
+    # Act
+    serial = scan(swift_tree, jobs=1)
+    parallel = scan(swift_tree, jobs=3)
+
+    # Assert
+    assert len(serial) == 12
+    assert parallel == serial
+
+
+def test_scan_cache_only_rescans_changed_files(swift_tree, tmp_path, monkeypatch):
+    """
+    GIVEN a tree scanned once with a scan cache
+    WHEN it is rescanned unchanged, and again after one file is edited
+    THEN the unchanged rescan should tokenize nothing, and the second only the edited file
+    """
+    # Arrange
+    cache_path = tmp_path / 'scan-cache.json'
+    first = scan(swift_tree, cache=catalog_tool.ScanCache(cache_path))
+    parsed = []
+    scan_file = catalog_tool.scan_file_for_customizations
+    monkeypatch.setattr(catalog_tool, 'scan_file_for_customizations',
+                        lambda path: parsed.append(path) or scan_file(path))
+
+    # Act
+    cache = catalog_tool.ScanCache(cache_path)
+    unchanged = scan(swift_tree, cache=cache)
+    parsed_unchanged = list(parsed)
+    edited = swift_tree / 'Module1' / 'Nested' / 'File1.swift'
+    edited.write_text(edited.read_text().replace('Counter 1', 'Counter one'))
+    parsed.clear()
+    rescanned = scan(swift_tree, cache=catalog_tool.ScanCache(cache_path))
+
+    # Assert
+    assert unchanged == first
+    assert parsed_unchanged == []
+    assert cache.hits == 7  # every candidate, including the file without markers
+    assert parsed == [edited]
+    assert [c['comment'] for c in rescanned if c['file'] == str(edited)] == ['Counter one', 'Remove tracking 1']
+
+
+def test_file_contains_marker_checks_bytes(tmp_path):
+    """
+    GIVEN files with a marker, without one, and empty
+    WHEN they are checked with the memory-mapped search
+    THEN only the file with the marker should be kept
+    """
+    (tmp_path / 'Marked.swift').write_text('let x = 1 // Ecosia: tweak\n')
+    (tmp_path / 'Plain.swift').write_text('let x = 1 // Ecosia tweak\n')
+    (tmp_path / 'Empty.swift').write_text('')
+
+    assert catalog_tool.file_contains_marker(tmp_path / 'Marked.swift')
+    assert not catalog_tool.file_contains_marker(tmp_path / 'Plain.swift')
+    assert not catalog_tool.file_contains_marker(tmp_path / 'Empty.swift')
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+@pytest.mark.parametrize('prefilter', ['mmap', 'git-grep'])
+def test_prefiltered_scan_matches_unfiltered_scan(swift_tree, prefilter):
+    """
+    GIVEN a git working tree with tracked, untracked and gitignored Swift files
+    WHEN it is scanned with a pre-filter
+    THEN the catalog should be exactly the one of an unfiltered scan
+    """
+    # Arrange
+    git(swift_tree, 'init', '-q')
+    (swift_tree / '.gitignore').write_text('Module2/\n')
+    git(swift_tree, 'add', 'Module0', '.gitignore')
+    git(swift_tree, 'commit', '-q', '-m', 'tracked')
+
+    # Act
+    filtered = scan(swift_tree, prefilter=prefilter)
+
+    # Assert
+    assert filtered == scan(swift_tree)
+    assert any('Module2' in c['file'] for c in filtered)
+
+
+# ============================================================================
+# Test: Timeline across git revisions
+# ============================================================================
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git not available')
+def test_timeline_counts_customizations_per_revision(tmp_path):
+    """
+    GIVEN a repository whose customizations change between two tags
+    WHEN the timeline is built for both tags
+    THEN each revision should be summarized from git objects, not the working tree
+    """
+    # Arrange
+    repo = tmp_path / 'repo'
+    client = repo / 'firefox-ios' / 'Client'
+    client.mkdir(parents=True)
+    git(repo, 'init', '-q')
+    (client / 'App.swift').write_text("""// Ecosia: Searches counter
+let counter = SearchesCounter()
+""")
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'first')
+    git(repo, 'tag', 'v1')
+    (client / 'Theme.swift').write_text("""/* Ecosia: Remove Glean
+import Glean
+*/
+// Ecosia: Swap theme
+// let theme = DefaultTheme()
+let theme = EcosiaTheme()
+""")
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'second')
+    git(repo, 'tag', 'v2')
+    (client / 'App.swift').write_text("// Ecosia: uncommitted\nlet x = 1\n")
+
+    # Act
+    timeline = catalog_tool.build_timeline(['v1', 'v2'], repo / 'firefox-ios', DEFAULT_EXCLUDES)
+
+    # Assert
+    assert [entry['revision'] for entry in timeline] == ['v1', 'v2']
+    assert timeline[0]['summary']['total'] == 1
+    assert timeline[1]['summary'] == {
+        'total': 3, 'removals': 1, 'substitutions': 1, 'additions': 1, 'files_affected': 2,
+    }
+    assert timeline[1]['by_file'] == {'firefox-ios/Client/App.swift': 1, 'firefox-ios/Client/Theme.swift': 2}
+
+
+# ============================================================================
+# Test: Catalog output
+# ============================================================================
+
+def test_empty_jsonl_scan_keeps_existing_catalog(tmp_path, monkeypatch):
+    """
+    GIVEN an existing JSONL catalog and a scan directory without customizations
+    WHEN the catalog is regenerated into it
+    THEN the scan should fail and the existing catalog stay untouched
+    """
+    # Arrange
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'Plain.swift').write_text('let x = 1\n')
+    output = tmp_path / 'catalog.jsonl'
+    output.write_text('existing catalog\n')
+    monkeypatch.setattr(sys, 'argv', ['ecosia-customizations-catalog.py', '--scan', str(tmp_path / 'src'),
+                                      '--output', str(output)])
+
+    # Act
+    status = catalog_tool.main()
+
+    # Assert
+    assert status == 1
+    assert output.read_text() == 'existing catalog\n'
+    assert sorted(tmp_path.iterdir()) == [output, tmp_path / 'src']  # no temporary file left behind
+
+
+# ============================================================================
+# Run tests
+# ============================================================================
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
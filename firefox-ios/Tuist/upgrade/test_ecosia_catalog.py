@@ -0,0 +1,444 @@
+"""
+Test suite for ecosia_catalog.py
+
+- Given: v1 and v2 catalogs
+- Expect: both load with line and block fingerprints available
+- Expect: JSON, JSONL and SQLite stores answer queries identically
+- Expect: SQLite file lookups search an index
+"""
+
+import json
+import time
+import pytest
+from pathlib import Path
+from typing import Dict
+
+# Import the module we're testing
+import sys
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ecosia_catalog import (
+    CATALOG_VERSION,
+    JsonCatalog,
+    JsonlCatalog,
+    JsonlCatalogWriter,
+    SqliteCatalog,
+    block_fingerprint,
+    build_sqlite,
+    diff_catalogs,
+    fingerprint_customization,
+    line_fingerprint,
+    load_catalog,
+    open_catalog,
+)
+from ecosia_catalog import main as catalog_main
+
+
+# ============================================================================
+# Test Fixtures
+# ============================================================================
+
+@pytest.fixture
+def v1_customization() -> Dict:
+    """A customization as written by the v1 catalog tool."""
+    return {
+        'file': 'AppDelegate.swift',
+        'line': 35,
+        'type': 'substitution',
+        'comment': "Swap Theme Manager with Ecosia's",
+        'firefox_code': ['lazy var themeManager = DefaultThemeManager()'],
+        'ecosia_code': ['    lazy var themeManager = EcosiaThemeManager()'],
+        'context_before': ['class AppDelegate {', '    let logger = DefaultLogger.shared'],
+        'context_after': ['', '    func application() {'],
+    }
+
+
+@pytest.fixture
+def write_catalog(tmp_path):
+    """Write a catalog dictionary to a temporary JSON file."""
+    def _write(catalog: Dict) -> Path:
+        path = tmp_path / 'catalog.json'
+        path.write_text(json.dumps(catalog))
+        return path
+    return _write
+
+
+def write_jsonl(path: Path, catalog: Dict) -> Dict:
+    writer = JsonlCatalogWriter(str(path), {'generated_at': '2024-01-01T00:00:00'})
+    for customization in catalog['customizations']:
+        writer.write(customization)
+    return writer.close()
+
+
+# ============================================================================
+# Test: Fingerprints
+# ============================================================================
+
+def test_line_fingerprint_ignores_surrounding_whitespace():
+    """
+    GIVEN the same line with different indentation
+    WHEN fingerprinted
+    THEN the fingerprints should be equal
+    """
+    assert line_fingerprint('    let x = 1\n') == line_fingerprint('let x = 1')
+    assert line_fingerprint('let x = 1') != line_fingerprint('let x = 2')
+
+
+def test_block_fingerprint_is_stable_when_customization_moves(v1_customization):
+    """
+    GIVEN a customization that moved to another line with different context
+    WHEN its block fingerprint is computed
+    THEN it should not change, but editing its code should
+    """
+    moved = dict(v1_customization, line=120, context_before=['}', ''], context_after=[])
+    edited = dict(v1_customization, ecosia_code=['lazy var themeManager = EcosiaThemeManager(v2)'])
+
+    assert block_fingerprint(moved) == block_fingerprint(v1_customization)
+    assert block_fingerprint(edited) != block_fingerprint(v1_customization)
+
+
+# ============================================================================
+# Test: Loading
+# ============================================================================
+
+def test_load_v1_catalog_adds_fingerprints(write_catalog, v1_customization):
+    """
+    GIVEN a v1 catalog without fingerprints
+    WHEN it is loaded
+    THEN every customization should carry v2 fingerprints
+    """
+    path = write_catalog({'version': '1.0', 'customizations': [v1_customization]})
+
+    catalog = load_catalog(str(path))
+
+    fingerprints = catalog['customizations'][0]['fingerprints']
+    assert fingerprints['context_before'] == [line_fingerprint(l) for l in v1_customization['context_before']]
+    assert fingerprints['block'] == block_fingerprint(v1_customization)
+
+
+def test_load_v2_catalog_keeps_stored_fingerprints(write_catalog, v1_customization):
+    """
+    GIVEN a v2 catalog with precomputed fingerprints
+    WHEN it is loaded
+    THEN the stored fingerprints should be used as-is
+    """
+    entry = dict(v1_customization, fingerprints=fingerprint_customization(v1_customization))
+    path = write_catalog({'version': CATALOG_VERSION, 'customizations': [entry]})
+
+    catalog = load_catalog(str(path))
+
+    assert catalog['customizations'][0]['fingerprints'] == entry['fingerprints']
+
+
+# ============================================================================
+# Test: SQLite backend
+# ============================================================================
+
+@pytest.fixture
+def catalog_with_two_files(v1_customization) -> Dict:
+    """Catalog with customizations in two files."""
+    removal = dict(v1_customization, line=10, type='removal', comment='Remove Glean',
+                   firefox_code=['import Glean'], ecosia_code=[])
+    other = dict(v1_customization, file='Client/Frontend/Other.swift', line=3)
+    return {'version': '1.0', 'customizations': [removal, v1_customization, other]}
+
+
+def test_sqlite_catalog_round_trips(tmp_path, catalog_with_two_files):
+    """
+    GIVEN a JSON catalog
+    WHEN it is converted to SQLite and loaded again
+    THEN the customizations should be identical and in the same order
+    """
+    db_path = tmp_path / 'catalog.sqlite'
+
+    build_sqlite(catalog_with_two_files, str(db_path))
+
+    assert isinstance(open_catalog(str(db_path)), SqliteCatalog)
+    assert load_catalog(str(db_path))['customizations'] == catalog_with_two_files['customizations']
+
+
+def test_both_backends_answer_queries_identically(tmp_path, write_catalog, catalog_with_two_files):
+    """
+    GIVEN the same catalog as JSON and as SQLite
+    WHEN queried by file suffix, type, text and line fingerprint
+    THEN both backends should return the same customizations
+    """
+    db_path = tmp_path / 'catalog.sqlite'
+    build_sqlite(catalog_with_two_files, str(db_path))
+    sqlite_store = open_catalog(str(db_path))
+    json_store = open_catalog(str(write_catalog(catalog_with_two_files)))
+    assert isinstance(json_store, JsonCatalog)
+
+    for query in [{'file': 'AppDelegate.swift'}, {'file': 'Other.swift'}, {'type': 'removal'},
+                  {'grep': 'EcosiaThemeManager'}, {'file': 'AppDelegate.swift', 'type': 'substitution'}]:
+        expected = [(c['file'], c['line']) for c in json_store.customizations(**query)]
+        actual = [(c['file'], c['line']) for c in sqlite_store.customizations(**query)]
+        assert actual == expected, query
+
+    assert [c['line'] for c in sqlite_store.with_line_fingerprint(line_fingerprint('import Glean'))] == [10]
+    assert sqlite_store.files() == json_store.files()
+
+
+def test_all_backends_match_file_suffixes_case_sensitively(tmp_path, write_catalog, v1_customization):
+    """
+    GIVEN files whose paths share a suffix or differ only in case, as JSON, SQLite and JSONL
+    WHEN each store is queried by the same file paths
+    THEN every backend should return the same customizations: all exact and
+         suffix matches, and none that only match ignoring case
+    """
+    # Arrange
+    files = ['Client/AppDelegate.swift', 'Foo/Client/AppDelegate.swift', 'Foo/client/appdelegate.swift',
+             'Foo/XClient/AppDelegate.swift']
+    catalog = {'customizations': [dict(v1_customization, file=file, line=n) for n, file in enumerate(files, 1)]}
+    build_sqlite(catalog, str(tmp_path / 'catalog.sqlite'))
+    write_jsonl(tmp_path / 'catalog.jsonl', catalog)
+    stores = [open_catalog(str(write_catalog(catalog))), open_catalog(str(tmp_path / 'catalog.sqlite')),
+              open_catalog(str(tmp_path / 'catalog.jsonl'))]
+
+    for query, expected in [
+        ('Client/AppDelegate.swift', [1, 2]),
+        ('AppDelegate.swift', [1, 2, 4]),
+        ('appdelegate.swift', [3]),
+        ('client/AppDelegate.swift', []),
+    ]:
+        for store in stores:
+            # Act
+            lines = [c['line'] for c in store.customizations(file=query)]
+
+            # Assert
+            assert lines == expected, (type(store).__name__, query)
+
+    for store in stores:
+        store.close()
+
+
+def test_all_backends_grep_line_by_line(tmp_path, write_catalog, catalog_with_two_files):
+    """
+    GIVEN the same catalog as JSON, SQLite and JSONL
+    WHEN it is searched for text spanning two code lines, and for text within one
+    THEN no backend should match across lines, and all should match within one
+    """
+    # Arrange
+    catalog = dict(catalog_with_two_files, customizations=[
+        dict(catalog_with_two_files['customizations'][1], firefox_code=['let a = 1', 'let b = 2'])
+    ])
+    build_sqlite(catalog, str(tmp_path / 'catalog.sqlite'))
+    write_jsonl(tmp_path / 'catalog.jsonl', catalog)
+    stores = [open_catalog(str(write_catalog(catalog))), open_catalog(str(tmp_path / 'catalog.sqlite')),
+              open_catalog(str(tmp_path / 'catalog.jsonl'))]
+
+    for store in stores:
+        # Act
+        across = list(store.customizations(grep='1\nlet b'))
+        within = list(store.customizations(grep='let b'))
+
+        # Assert
+        assert (len(across), len(within)) == (0, 1), type(store).__name__
+        store.close()
+
+
+def test_sqlite_file_lookup_uses_file_name_index(tmp_path, catalog_with_two_files):
+    """
+    GIVEN a SQLite catalog
+    WHEN it is queried by file path suffix
+    THEN SQLite should search the file name index instead of scanning the table
+    """
+    # Arrange
+    build_sqlite(catalog_with_two_files, str(tmp_path / 'catalog.sqlite'))
+    store = SqliteCatalog(str(tmp_path / 'catalog.sqlite'))
+    statements = []
+    store.conn.set_trace_callback(statements.append)
+
+    # Act
+    lines = [c['line'] for c in store.customizations(file='Frontend/Other.swift')]
+    plan = store.conn.execute('EXPLAIN QUERY PLAN ' + statements[-1]).fetchall()
+
+    # Assert
+    assert lines == [3]
+    assert any('USING INDEX idx_customizations_name' in row[-1] for row in plan), plan
+    store.close()
+
+
+def test_sqlite_catalog_opens_paths_with_uri_characters(tmp_path, catalog_with_two_files):
+    """
+    GIVEN a SQLite catalog whose path contains '?', '#' and '%'
+    WHEN it is opened
+    THEN it should be read from that path
+    """
+    # Arrange
+    db_path = tmp_path / 'v1?2#3%20' / 'catalog.sqlite'
+    db_path.parent.mkdir()
+    build_sqlite(catalog_with_two_files, str(db_path))
+
+    # Act
+    with open_catalog(str(db_path)) as store:
+        files = store.files()
+
+    # Assert
+    assert files == ['AppDelegate.swift', 'Client/Frontend/Other.swift']
+
+
+# ============================================================================
+# Test: JSONL backend
+# ============================================================================
+
+def test_jsonl_catalog_streams_and_filters_by_file(tmp_path, write_catalog, catalog_with_two_files):
+    """
+    GIVEN the same catalog as JSON and as streamed JSON Lines
+    WHEN both are opened and queried
+    THEN the JSONL store should return the same customizations and summary
+    """
+    # Arrange
+    jsonl_path = tmp_path / 'catalog.jsonl'
+    json_store = open_catalog(str(write_catalog(catalog_with_two_files)))
+
+    # Act
+    meta = write_jsonl(jsonl_path, catalog_with_two_files)
+    jsonl_store = open_catalog(str(jsonl_path))
+
+    # Assert
+    assert isinstance(jsonl_store, JsonlCatalog)
+    assert meta['summary'] == {'total': 3, 'removals': 1, 'substitutions': 2, 'additions': 0, 'files_affected': 2}
+    for query in [{'file': 'AppDelegate.swift'}, {'file': 'Other.swift'}, {'type': 'removal'},
+                  {'grep': 'EcosiaThemeManager'}, {'file': 'Delegate.swift'}]:
+        expected = [(c['file'], c['line']) for c in json_store.customizations(**query)]
+        actual = [(c['file'], c['line']) for c in jsonl_store.customizations(**query)]
+        assert actual == expected, query
+    assert jsonl_store.files() == json_store.files()
+    assert load_catalog(str(jsonl_path))['customizations'] == json_store.to_dict()['customizations']
+    assert load_catalog(str(jsonl_path))['by_file'] == {'AppDelegate.swift': 2, 'Client/Frontend/Other.swift': 1}
+
+
+def test_jsonl_catalog_is_detected_without_suffix(tmp_path, catalog_with_two_files):
+    """
+    GIVEN a JSONL catalog saved under a .json name
+    WHEN it is opened
+    THEN it should still be read as JSON Lines
+    """
+    path = tmp_path / 'catalog.json'
+    jsonl_path = tmp_path / 'catalog.jsonl'
+    write_jsonl(jsonl_path, catalog_with_two_files)
+    jsonl_path.rename(path)
+
+    assert isinstance(open_catalog(str(path)), JsonlCatalog)
+    assert len(load_catalog(str(path))['customizations']) == 3
+
+
+# ============================================================================
+# Test: Catalog diff
+# ============================================================================
+
+def test_catalog_diff_classifies_changes(v1_customization):
+    """
+    GIVEN two snapshots where customizations stayed, moved, changed, appeared and disappeared
+    WHEN the catalogs are diffed
+    THEN each customization should land in the right category
+    """
+    unchanged = dict(v1_customization, line=5, comment='Unchanged', ecosia_code=['a()'])
+    moved = dict(v1_customization, line=20, comment='Moved', ecosia_code=['b()'])
+    edited = dict(v1_customization, line=40, comment='Edited', ecosia_code=['c()'])
+    removed = dict(v1_customization, line=60, comment='Removed', ecosia_code=['d()'], context_before=['d'])
+    added = dict(v1_customization, line=80, comment='Added', ecosia_code=['e()'], context_before=['e'])
+
+    old = {'customizations': [unchanged, moved, edited, removed]}
+    new = {'customizations': [
+        dict(unchanged),
+        dict(moved, line=27, context_before=['// new upstream code']),
+        dict(edited, ecosia_code=['c(updated: true)']),
+        added,
+    ]}
+
+    diff = diff_catalogs(old, new)
+
+    assert [n['comment'] for _, n in diff['unchanged']] == ['Unchanged']
+    assert [(o['line'], n['line']) for o, n in diff['moved']] == [(20, 27)]
+    assert [n['comment'] for _, n in diff['changed']] == ['Edited']
+    assert [c['comment'] for c in diff['added']] == ['Added']
+    assert [c['comment'] for c in diff['removed']] == ['Removed']
+
+
+def test_catalog_diff_detects_move_to_another_file(v1_customization):
+    """
+    GIVEN a customization that moved to a renamed file
+    WHEN the catalogs are diffed
+    THEN it should be reported as moved, not as removed plus added
+    """
+    old = {'customizations': [dict(v1_customization)]}
+    new = {'customizations': [dict(v1_customization, file='Client/Application/AppDelegate.swift', line=12)]}
+
+    diff = diff_catalogs(old, new)
+
+    assert len(diff['moved']) == 1
+    assert not diff['added'] and not diff['removed']
+
+
+def test_catalog_diff_does_not_pair_entries_by_empty_context(v1_customization):
+    """
+    GIVEN a customization removed and an unrelated one added at the top of the same file
+    WHEN the catalogs are diffed
+    THEN their empty contexts shouldn't pair them up as changed
+    """
+    old = {'customizations': [dict(v1_customization, line=1, comment='Removed', ecosia_code=['d()'],
+                                   context_before=[])]}
+    new = {'customizations': [dict(v1_customization, line=1, comment='Added', ecosia_code=['e()'],
+                                   context_before=[])]}
+
+    diff = diff_catalogs(old, new)
+
+    assert not diff['changed']
+    assert [c['comment'] for c in diff['removed']] == ['Removed']
+    assert [c['comment'] for c in diff['added']] == ['Added']
+
+
+def test_catalog_diff_closes_old_store_when_new_one_fails(tmp_path, catalog_with_two_files, monkeypatch):
+    """
+    GIVEN an existing SQLite catalog and a missing one
+    WHEN they are compared on the command line
+    THEN the command should fail and still close the catalog it opened
+    """
+    # Arrange
+    build_sqlite(catalog_with_two_files, str(tmp_path / 'old.sqlite'))
+    closed = []
+    close = SqliteCatalog.close
+    monkeypatch.setattr(SqliteCatalog, 'close', lambda self: closed.append(self) or close(self))
+    monkeypatch.setattr(sys, 'argv', ['ecosia_catalog.py', 'catalog-diff',
+                                      str(tmp_path / 'old.sqlite'), str(tmp_path / 'missing.json')])
+
+    # Act
+    status = catalog_main()
+
+    # Assert
+    assert status == 1
+    assert len(closed) == 1
+
+
+def test_catalog_diff_is_fast_on_large_catalogs(v1_customization):
+    """
+    GIVEN two catalogs with thousands of customizations
+    WHEN they are diffed
+    THEN it should finish well under a second
+    """
+    def snapshot(shift):
+        return {'customizations': [
+            dict(v1_customization, file=f'File{i % 300}.swift', line=i + shift,
+                 comment=f'Customization {i}', ecosia_code=[f'call{i}()'])
+            for i in range(5000)
+        ]}
+    old, new = snapshot(0), snapshot(3)
+    new['customizations'][10]['ecosia_code'] = ['changed()']
+
+    start = time.perf_counter()
+    diff = diff_catalogs(old, new)
+    elapsed = time.perf_counter() - start
+
+    assert len(diff['moved']) == 4999
+    assert len(diff['changed']) == 1
+    assert elapsed < 1.0
+
+
+# ============================================================================
+# Run tests
+# ============================================================================
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,123 @@
+"""
+Test suite for ecosia_matching.py
+
+- Given: pairs of lines
+- Expect: the tiered matcher agrees with SequenceMatcher.ratio()
+- Expect: cheap tiers decide most comparisons, and repeats are memoized
+- Expect: the Aho-Corasick automaton finds the same patterns as `in`
+"""
+
+import random
+import pytest
+from difflib import SequenceMatcher
+from pathlib import Path
+
+# Import the module we're testing
+import sys
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ecosia_matching import AhoCorasick, LineMatcher
+
+
+# ============================================================================
+# Test: Tiered matching
+# ============================================================================
+
+def test_tiered_matcher_agrees_with_ratio():
+    """
+    GIVEN random pairs of short code-like lines, many of them near-duplicates
+    WHEN they are compared with the tiered matcher and with ratio() directly
+    THEN both should give the same answer for every pair
+    """
+    # Arrange
+    rng = random.Random(42)
+    alphabet = 'abcdefgh (){}.=_'
+    matcher = LineMatcher()
+
+    for _ in range(3000):
+        a = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        b = list(a)
+        for _ in range(rng.randint(0, 4)):
+            if b and rng.random() < 0.5:
+                del b[rng.randrange(len(b))]
+            else:
+                b.insert(rng.randint(0, len(b)), rng.choice(alphabet))
+        b = ''.join(b)
+        if not a and not b:
+            continue
+
+        # Act
+        actual = matcher.similar(a, b)
+
+        # Assert
+        assert actual == (SequenceMatcher(None, a, b).ratio() >= 0.9), (a, b)
+
+
+def test_counters_show_which_tier_decided():
+    """
+    GIVEN comparisons that each tier should decide
+    WHEN they are run through the matcher
+    THEN the counters should attribute each one to its tier
+    """
+    matcher = LineMatcher()
+
+    matcher.similar('let x = 1', 'let x = 1')                          # equal
+    matcher.similar('return', 'return someVeryLongExpression()')        # length
+    matcher.similar('abcdefghij', 'klmnopqrst')                         # quick_ratio
+    matcher.similar('let value = compute()', 'let value = computed()')  # ratio
+    matcher.similar('let value = compute()', 'let value = computed()')  # memoized
+
+    assert matcher.counters == {
+        'memoized': 1, 'equal': 1, 'length': 1, 'quick_ratio': 1, 'ratio_rejected': 0, 'ratio_accepted': 1,
+    }
+    assert matcher.report().startswith('5 line comparison(s)')
+
+
+def test_could_match_counts_what_it_rules_out():
+    """
+    GIVEN a caller that filters pairs with could_match() before similar()
+    WHEN one pair is ruled out by length and another is compared
+    THEN each should be counted exactly once, by the tier that decided it
+    """
+    matcher = LineMatcher()
+
+    for actual, expected in [('return', 'return someVeryLongExpression()'), ('let x = 1', 'let x = 1')]:
+        if matcher.could_match(actual, expected):
+            matcher.similar(actual, expected)
+
+    assert matcher.counters['length'] == 1
+    assert matcher.counters['equal'] == 1
+    assert sum(matcher.counters.values()) == 2
+
+
+# ============================================================================
+# Test: Multi-pattern search
+# ============================================================================
+
+def test_aho_corasick_agrees_with_substring_search():
+    """
+    GIVEN random overlapping patterns (including empty and duplicate ones)
+    WHEN a random text is searched with the automaton
+    THEN it should find exactly the patterns `in` finds
+    """
+    rng = random.Random(7)
+
+    for _ in range(2000):
+        # Arrange
+        patterns = [''.join(rng.choice('abc') for _ in range(rng.randint(0, 5)))
+                    for _ in range(rng.randint(0, 8))]
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 30)))
+
+        # Act
+        found = AhoCorasick(patterns).search(text)
+
+        # Assert
+        assert found == {i for i, pattern in enumerate(patterns) if pattern in text}, (patterns, text)
+
+
+# ============================================================================
+# Run tests
+# ============================================================================
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
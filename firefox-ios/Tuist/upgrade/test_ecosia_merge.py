@@ -0,0 +1,60 @@
+"""
+Test suite for ecosia_merge.py
+
+- Given: a base file and two edited descendants
+- Expect: merge_lines reapplies non-overlapping changes, even on adjacent lines
+- Expect: merge_lines refuses changes to the same lines
+"""
+
+import pytest
+from pathlib import Path
+
+# Import the module we're testing
+import sys
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ecosia_merge import merge_lines
+
+
+# ============================================================================
+# Test: merge_lines
+# ============================================================================
+
+def test_merge_lines_reapplies_ecosia_addition_next_to_firefox_change():
+    """
+    GIVEN Ecosia inserted lines right above a line Firefox changed (a conflict for git)
+    WHEN the sides are merged line by line
+    THEN the Ecosia lines should land above Firefox's new line
+    """
+    # Arrange
+    base = ['func setup() {', '    start()', '}']
+    ours = ['func setup() {', '    // Ecosia: Track launches', '    Analytics.shared.launch()', '    start()', '}']
+    theirs = ['func setup() {', '    start(windowUUID: uuid)', '}']
+
+    # Act
+    merged = merge_lines(base, ours, theirs)
+
+    # Assert
+    assert merged == ['func setup() {', '    // Ecosia: Track launches', '    Analytics.shared.launch()',
+                      '    start(windowUUID: uuid)', '}']
+
+
+def test_merge_lines_refuses_overlapping_changes():
+    """
+    GIVEN both sides changed the same line differently
+    WHEN the sides are merged line by line
+    THEN no merge should be produced
+    """
+    base = ['let manager = DefaultThemeManager()']
+    ours = ['// let manager = DefaultThemeManager()', 'let manager = EcosiaThemeManager()']
+    theirs = ['let manager = DefaultThemeManager(uuid)']
+
+    assert merge_lines(base, ours, theirs) is None
+
+
+# ============================================================================
+# Run tests
+# ============================================================================
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])